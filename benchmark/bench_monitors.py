@@ -0,0 +1,145 @@
+import argparse
+import copy
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from benchmark.fake_tendermint import CHAIN_ID, validator_address
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.monitor_utils.live_check import live_check
+from src.monitoring.monitors.network import NetworkMonitor
+from src.monitoring.monitors.node import NodeMonitor
+from src.node.node import Node, NodeType
+from src.utils.config_parsers.internal import InternalConfig
+from src.utils.config_parsers.internal_parsed import InternalConf
+from src.utils.logging import DUMMY_LOGGER
+
+# Alerts are raised as usual, but are not sent anywhere
+CHANNELS = ChannelSet([])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def fake_tendermint(validators: int, height: int, latency: float,
+                    missed_rate: float) -> Iterator[str]:
+    # The server runs in its own process, so that it does not compete with
+    # the monitors for the GIL
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmark.fake_tendermint',
+         '--validators', str(validators), '--height', str(height),
+         '--latency', str(latency), '--missed-rate', str(missed_rate),
+         '--port', str(port)], stdout=subprocess.DEVNULL)
+    url = 'http://127.0.0.1:{}'.format(port)
+    try:
+        deadline = time.monotonic() + 10
+        while not live_check(url + '/health', DUMMY_LOGGER):
+            if time.monotonic() > deadline:
+                raise RuntimeError('Fake Tendermint did not start.')
+            time.sleep(0.05)
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def pipeline_conf(max_blocks_per_round: int) -> InternalConfig:
+    internal_conf = copy.copy(InternalConf)
+    internal_conf.block_pipeline_max_blocks_per_round = max_blocks_per_round
+    return internal_conf
+
+
+def bench_network_monitor(chain_validators: int, monitored: int,
+                          blocks: int, latency: float, missed_rate: float,
+                          internal_conf: InternalConfig) -> float:
+    with fake_tendermint(chain_validators, blocks + 1, latency,
+                         missed_rate) as url:
+        full_node = Node('full_node', url, NodeType.NON_VALIDATOR_FULL_NODE,
+                         None, CHAIN_ID, None)
+        validators = [Node('validator_{}'.format(i), None,
+                           NodeType.VALIDATOR_FULL_NODE, validator_address(i),
+                           CHAIN_ID, None) for i in range(monitored)]
+        monitor = NetworkMonitor('Network monitor (bench)', CHANNELS,
+                                 DUMMY_LOGGER, blocks + 1, None, [full_node],
+                                 validators, internal_conf)
+
+        # Start from the first block, and run rounds until it catches up
+        monitor._last_height_checked = 0
+        start = time.perf_counter()
+        while monitor._last_height_checked < blocks:
+            monitor.monitor()
+        return blocks / (time.perf_counter() - start)
+
+
+def bench_node_monitors(nodes: int, duration: float, latency: float) \
+        -> float:
+    with fake_tendermint(1, 1, latency, 0) as url:
+        monitors = [NodeMonitor(
+            'Node monitor (bench {})'.format(i), CHANNELS, DUMMY_LOGGER, None,
+            Node('node_{}'.format(i), url, NodeType.VALIDATOR_FULL_NODE,
+                 validator_address(0), CHAIN_ID, None))
+            for i in range(nodes)]
+
+        # Each monitor runs in its own thread, as in the alerter
+        ticks = [0] * nodes
+        deadline = time.monotonic() + duration
+
+        def run(index: int) -> None:
+            while time.monotonic() < deadline:
+                monitors[index].monitor()
+                ticks[index] += 1
+
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(nodes)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sum(ticks) / duration
+
+
+def parse_counts(counts: str) -> List[int]:
+    return [int(c) for c in counts.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the monitors against a fake Tendermint RPC.')
+    parser.add_argument('--chain-validators', type=parse_counts,
+                        default=[10, 100, 1000])
+    parser.add_argument('--monitored-validators', type=parse_counts,
+                        default=[1, 10, 100])
+    parser.add_argument('--nodes', type=parse_counts, default=[1, 10, 50])
+    parser.add_argument('--blocks', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=3)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--missed-rate', type=float, default=0.01)
+    a = parser.parse_args()
+
+    print('NetworkMonitor ({} blocks, {}s latency)'.format(a.blocks,
+                                                         a.latency))
+    for n in a.chain_validators:
+        for m in [m for m in a.monitored_validators if m <= n]:
+            # A block per round, and then as many as the pipeline is given
+            for name, conf in [('one block per round', pipeline_conf(1)),
+                               ('pipelined', InternalConf)]:
+                rate = bench_network_monitor(n, m, a.blocks, a.latency,
+                                             a.missed_rate, conf)
+                print('  {:>5} chain validators, {:>4} monitored, {:<19}: '
+                      '{:>8.1f} blocks/s'.format(n, m, name, rate))
+
+    print('NodeMonitor ({}s per run, {}s latency)'.format(a.duration,
+                                                        a.latency))
+    for n in a.nodes:
+        rate = bench_node_monitors(n, a.duration, a.latency)
+        print('  {:>5} nodes: {:>8.1f} ticks/s ({:.1f} ticks/s per node)'
+              ''.format(n, rate, rate / n))
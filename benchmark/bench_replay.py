@@ -0,0 +1,115 @@
+import argparse
+import time
+from typing import Tuple
+
+from requests.exceptions import ConnectionError as ReqConnectionError, \
+    ReadTimeout
+
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.monitor_utils.get_json import get_cosmos_json
+from src.monitoring.monitor_utils.rpc_transport import \
+    RecordingRpcTransport, ReplayRpcTransport, set_rpc_transport
+from src.monitoring.monitors.network import NetworkMonitor
+from src.monitoring.monitors.node import NodeMonitor
+from src.node.node import Node, NodeType
+from src.utils.logging import DUMMY_LOGGER
+
+# Alerts are raised as usual, but are not sent anywhere
+CHANNELS = ChannelSet([])
+
+
+def create_monitors(rpc_url: str, catch_up_blocks: int) \
+        -> Tuple[NodeMonitor, NetworkMonitor]:
+    # The same requests are made when recording and when replaying, so the
+    # validators are those that signed the latest block
+    status = get_cosmos_json(rpc_url + '/status', DUMMY_LOGGER)
+    network = status['node_info']['network']
+    tip = int(status['sync_info']['latest_block_height'])
+    block = get_cosmos_json(rpc_url + '/block?height=' + str(tip),
+                            DUMMY_LOGGER)
+    last_commit = block['block']['last_commit']
+    signatures = last_commit.get('signatures') or \
+        [p for p in last_commit.get('precommits', []) if p]
+    addresses = [s['validator_address'] for s in signatures
+                 if s.get('validator_address')]
+
+    full_node = Node('full_node', rpc_url, NodeType.NON_VALIDATOR_FULL_NODE,
+                     None, network, None)
+    validators = [Node('validator_{}'.format(i), None,
+                       NodeType.VALIDATOR_FULL_NODE, a, network, None)
+                  for i, a in enumerate(addresses)]
+    node_monitor = NodeMonitor('Node monitor (replay)', CHANNELS,
+                               DUMMY_LOGGER, None, full_node)
+    network_monitor = NetworkMonitor('Network monitor (replay)', CHANNELS,
+                                     DUMMY_LOGGER, catch_up_blocks + 1, None,
+                                     [full_node], validators)
+
+    # Start behind the tip, so that every round checks a block
+    network_monitor._last_height_checked = max(0, tip - catch_up_blocks)
+    return node_monitor, network_monitor
+
+
+def run_round(node_monitor: NodeMonitor,
+              network_monitor: NetworkMonitor) -> int:
+    # The monitors run one after the other, so that the requests are made in
+    # the same order when recording and when replaying. Returns the number
+    # of errors.
+    errors = 0
+    for monitor in [node_monitor, network_monitor]:
+        try:
+            monitor.monitor()
+        except (ReqConnectionError, ReadTimeout):
+            errors += 1
+    return errors
+
+
+def record(rpc_url: str, capture_file: str, rounds: int) -> None:
+    transport = RecordingRpcTransport(capture_file)
+    set_rpc_transport(transport)
+    node_monitor, network_monitor = create_monitors(rpc_url, rounds)
+
+    errors = 0
+    for _ in range(rounds):
+        errors += run_round(node_monitor, network_monitor)
+    transport.close()
+    print('Recorded {} rounds ({} errors) to {}.'.format(rounds, errors,
+                                                         capture_file))
+
+
+def replay(capture_file: str, rpc_url: str, rounds: int,
+           as_fast_as_possible: bool) -> None:
+    transport = ReplayRpcTransport(capture_file, as_fast_as_possible)
+    set_rpc_transport(transport)
+    node_monitor, network_monitor = create_monitors(rpc_url, rounds)
+
+    errors = 0
+    replayed = 0
+    start = time.perf_counter()
+    while not transport.exhausted.is_set() and replayed < rounds:
+        errors += run_round(node_monitor, network_monitor)
+        replayed += 1
+    elapsed = time.perf_counter() - start
+
+    print('Replayed {} rounds ({} errors, {} responses not replayed) in '
+          '{:.3f}s: {:.1f} rounds/s.'.format(replayed, errors,
+                                             transport.remaining, elapsed,
+                                             replayed / elapsed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Record the RPC traffic of a node and network monitor, '
+                    'or replay it to benchmark the monitors.')
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('rpc_url', help='e.g. http://127.0.0.1:26657')
+    parser.add_argument('capture_file')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--recorded-speed', action='store_true',
+                        help='replay responses as slowly as they were '
+                             'recorded')
+    a = parser.parse_args()
+
+    if a.mode == 'record':
+        record(a.rpc_url, a.capture_file, a.rounds)
+    else:
+        replay(a.capture_file, a.rpc_url, a.rounds, not a.recorded_speed)
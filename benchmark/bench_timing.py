@@ -0,0 +1,69 @@
+import timeit
+from datetime import datetime, timedelta
+from queue import Queue
+
+from src.utils.timing import TimedOccurrenceTracker, TimedTaskLimiter
+
+MAX_OCCURRENCES = 10
+TIME_INTERVAL = timedelta(minutes=10)
+NUMBER = 100000
+
+
+class QueueTimedOccurrenceTracker:
+    # The previous, Queue-based implementation, kept here for comparison
+
+    def __init__(self, max_occurrences: int, time_interval: timedelta) -> None:
+        self._max_occurrences = max_occurrences
+        self._time_interval = time_interval
+        self._last_occurrences = Queue(maxsize=max_occurrences)
+        self.reset()
+
+    def action_happened(self, at_time: datetime) -> None:
+        self._last_occurrences.get()
+        self._last_occurrences.put(at_time)
+
+    def too_many_occurrences(self, from_time: datetime) -> bool:
+        oldest_occurrence = self._last_occurrences.queue[0]
+        return (from_time - oldest_occurrence) < self._time_interval
+
+    def reset(self) -> None:
+        while not self._last_occurrences.empty():
+            self._last_occurrences.get()
+        for i in range(self._max_occurrences):
+            self._last_occurrences.put(datetime.min)
+
+
+def report(name: str, seconds: float) -> None:
+    print('{:<62} {:>8.3f} us/op'.format(name, seconds / NUMBER * 1e6))
+
+
+def bench_tracker(name: str, tracker) -> None:
+    block_time = datetime(2020, 1, 1)
+
+    # What the node does for every missed block
+    def missed_block():
+        tracker.action_happened(block_time)
+        tracker.too_many_occurrences(block_time)
+
+    report(name + ': action_happened + too_many_occurrences',
+           timeit.timeit(missed_block, number=NUMBER))
+    report(name + ': reset', timeit.timeit(tracker.reset, number=NUMBER))
+
+
+def bench_limiter() -> None:
+    limiter = TimedTaskLimiter(TIME_INTERVAL)
+
+    def check_and_do():
+        if limiter.can_do_task():
+            limiter.did_task()
+
+    report('TimedTaskLimiter: can_do_task + did_task',
+           timeit.timeit(check_and_do, number=NUMBER))
+
+
+if __name__ == '__main__':
+    bench_tracker('TimedOccurrenceTracker',
+                  TimedOccurrenceTracker(MAX_OCCURRENCES, TIME_INTERVAL))
+    bench_tracker('Queue-based tracker',
+                  QueueTimedOccurrenceTracker(MAX_OCCURRENCES, TIME_INTERVAL))
+    bench_limiter()
@@ -0,0 +1,67 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.backtest import BacktestNetworkMonitor
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.node.node import Node, NodeType
+from src.utils.clock import VirtualClock
+from src.utils.config_parsers.internal_parsed import InternalConf
+from src.utils.logging import DUMMY_LOGGER
+
+# Alerts are raised as usual, but are not sent anywhere
+CHANNELS = ChannelSet([])
+
+
+def dummy_blocks(addresses: List[str], count: int,
+                 missed_rate: float) -> List[BlockSummary]:
+    # Each validator misses each block independently, at the given rate
+    rng = random.Random(0)
+    start = datetime(2020, 1, 1)
+    blocks = []
+    for height in range(1, count + 1):
+        signers = {a for a in addresses if rng.random() >= missed_rate}
+        blocks.append(BlockSummary(
+            height, start + timedelta(seconds=height * 6), addresses[0],
+            signers, len(addresses), len(addresses) - len(signers)))
+    return blocks
+
+
+def bench_blocks(validators: int, blocks: int, missed_rate: float) -> float:
+    # Only the evaluation of the blocks (including recording the signed
+    # blocks that are left to be recorded in bulk) is timed, so no requests
+    # are made
+    clock = VirtualClock()
+    addresses = ['{:040X}'.format(i) for i in range(validators)]
+    nodes = [Node('validator_{}'.format(i), None,
+                  NodeType.VALIDATOR_FULL_NODE, a, 'bench', None,
+                  InternalConf, clock) for i, a in enumerate(addresses)]
+    monitor = BacktestNetworkMonitor('Network monitor (bench)', CHANNELS,
+                                     DUMMY_LOGGER, nodes, InternalConf, clock)
+    summaries = dummy_blocks(addresses, blocks, missed_rate)
+
+    start = time.perf_counter()
+    for summary in summaries:
+        clock.advance_to(summary.time)
+        monitor.check_summary(summary)
+    monitor._validator_table.flush_signed_blocks()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the evaluation of blocks for many validators.')
+    parser.add_argument('--validators', type=int, nargs='+',
+                        default=[10, 150, 1000])
+    parser.add_argument('--blocks', type=int, default=3000)
+    parser.add_argument('--missed-rate', type=float, default=0.01)
+    a = parser.parse_args()
+
+    for v in a.validators:
+        seconds = bench_blocks(v, a.blocks, a.missed_rate)
+        print('{:>5} validators: {:>9.1f} us/block, {:.2f} us per validator '
+              'per block'.format(v, seconds / a.blocks * 1e6,
+                                 seconds / a.blocks / v * 1e6))
@@ -0,0 +1,237 @@
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+GENESIS_TIME = datetime(2020, 1, 1)
+CHAIN_ID = 'fake-chain'
+
+
+def validator_address(index: int) -> str:
+    return '{:040X}'.format(index + 1)
+
+
+class FakeTendermint:
+    # A local stand-in for a Tendermint RPC server, which synthesises the
+    # /health, /status, /net_info and /block responses of a chain with a
+    # number of validators. Blocks are generated deterministically from their
+    # height, with each validator missing a block with the given probability.
+    #
+    # The chain height either grows by one every block_time seconds or, if
+    # block_time is 0, stays at the height that it is set to. Every request
+    # is delayed by the latency (in seconds), and fails (by the connection
+    # being dropped) with the given probability.
+
+    def __init__(self, validators: int, block_time: float = 0,
+                 height: int = 1, latency: float = 0,
+                 failure_rate: float = 0, missed_rate: float = 0,
+                 signatures_format: bool = True, seed: int = 0,
+                 host: str = '127.0.0.1', port: int = 0) -> None:
+        self.validators = [validator_address(i) for i in range(validators)]
+        self.block_time = block_time
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.missed_rate = missed_rate
+        self.signatures_format = signatures_format
+        self.seed = seed
+
+        self._height = height
+        self._started = time.monotonic()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        handler = type('FakeTendermintRequestHandler',
+                       (_FakeTendermintRequestHandler,), {'fake': self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def height(self) -> int:
+        if self.block_time <= 0:
+            return self._height
+        return self._height + int(
+            (time.monotonic() - self._started) / self.block_time)
+
+    @height.setter
+    def height(self, height: int) -> None:
+        self._height = height
+        self._started = time.monotonic()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> 'FakeTendermint':
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeTendermint':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def should_fail(self) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.failure_rate
+
+    def _missed(self, height: int, index: int) -> bool:
+        # Deterministic, so that a block is the same every time it is served
+        if self.missed_rate <= 0:
+            return False
+        x = (height * 0x9E3779B1 + index * 0x85EBCA77 + self.seed) \
+            & 0xFFFFFFFF
+        x = ((x ^ (x >> 16)) * 0x45D9F3B) & 0xFFFFFFFF
+        return (x ^ (x >> 16)) / 0x100000000 < self.missed_rate
+
+    def block_time_at(self, height: int) -> str:
+        block_time = self.block_time if self.block_time > 0 else 5
+        at = GENESIS_TIME + timedelta(seconds=height * block_time)
+        return at.strftime('%Y-%m-%dT%H:%M:%S.%f') + '123Z'
+
+    def status(self) -> Dict:
+        return {
+            'node_info': {'network': CHAIN_ID, 'moniker': 'fake'},
+            'sync_info': {'latest_block_height': str(self.height),
+                          'latest_block_time': self.block_time_at(
+                              self.height),
+                          'catching_up': False},
+            'validator_info': {'address': self.validators[0]
+                               if len(self.validators) > 0 else '',
+                               'voting_power': '100'},
+        }
+
+    def net_info(self) -> Dict:
+        return {'listening': True, 'listeners': [], 'n_peers': '10',
+                'peers': []}
+
+    def block(self, height: int) -> Optional[Dict]:
+        if height < 1 or height > self.height:
+            return None
+
+        signed = [not self._missed(height - 1, i)
+                  for i in range(len(self.validators))]
+        if self.signatures_format:  # tendermint v0.33+
+            last_commit = {'height': str(height - 1), 'signatures': [{
+                'block_id_flag': 2 if s else 1,
+                'validator_address': a if s else '',
+                'timestamp': self.block_time_at(height - 1),
+                'signature': 'c2lnbmF0dXJl' if s else None,
+            } for a, s in zip(self.validators, signed)]}
+        else:  # tendermint <v0.33
+            last_commit = {'precommits': [{
+                'type': 2, 'height': str(height - 1),
+                'validator_address': a, 'validator_index': str(i),
+                'timestamp': self.block_time_at(height - 1),
+                'signature': 'c2lnbmF0dXJl',
+            } if s else None for i, (a, s) in enumerate(
+                zip(self.validators, signed))]}
+
+        proposer = self.validators[height % len(self.validators)] \
+            if len(self.validators) > 0 else ''
+        return {'block_id': {'hash': '{:064X}'.format(height)}, 'block': {
+            'header': {'chain_id': CHAIN_ID, 'height': str(height),
+                       'time': self.block_time_at(height),
+                       'proposer_address': proposer},
+            'data': {'txs': None},
+            'last_commit': last_commit,
+        }}
+
+
+class _FakeTendermintRequestHandler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = 'HTTP/1.1'
+
+    def _delay_or_fail(self) -> bool:
+        if self.fake.latency > 0:
+            time.sleep(self.fake.latency)
+        if self.fake.should_fail():
+            # Dropping the connection results in a ConnectionError
+            self.close_connection = True
+            return True
+        return False
+
+    def _reply(self, result: Optional[Dict], head: bool = False) -> None:
+        if result is None:
+            body = {'jsonrpc': '2.0', 'id': -1, 'error': {
+                'code': -32603, 'message': 'Internal error'}}
+        else:
+            body = {'jsonrpc': '2.0', 'id': -1, 'result': result}
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200 if result is not None else 500)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(content)
+
+    def _result(self) -> Optional[Dict]:
+        url = urlparse(self.path)
+        if url.path == '/health':
+            return {}
+        elif url.path == '/status':
+            return self.fake.status()
+        elif url.path == '/net_info':
+            return self.fake.net_info()
+        elif url.path == '/block':
+            query = parse_qs(url.query)
+            height = int(query['height'][0]) if 'height' in query \
+                else self.fake.height
+            return self.fake.block(height)
+        return None
+
+    def do_GET(self) -> None:
+        if not self._delay_or_fail():
+            self._reply(self._result())
+
+    def do_HEAD(self) -> None:
+        if not self._delay_or_fail():
+            self._reply(self._result(), head=True)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Serve a fake Tendermint RPC for benchmarking.')
+    parser.add_argument('--validators', type=int, default=100)
+    parser.add_argument('--block-time', type=float, default=0)
+    parser.add_argument('--height', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--missed-rate', type=float, default=0)
+    parser.add_argument('--precommits', action='store_true',
+                        help='use the pre-v0.33 precommits format')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=26657)
+    return parser.parse_args(args)
+
+
+if __name__ == '__main__':
+    a = parse_args()
+    fake = FakeTendermint(a.validators, a.block_time, a.height, a.latency,
+                          a.failure_rate, a.missed_rate, not a.precommits,
+                          host=a.host, port=a.port)
+    print('Serving a fake Tendermint RPC with {} validators on {}.'.format(
+        a.validators, fake.url), flush=True)
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,15 +1,22 @@
 import concurrent.futures
+import logging
+import queue
+import signal
 import sys
-from typing import List, Tuple
+import threading
+from typing import Callable, Hashable, List, Tuple
 
-from src.alerting.alert_utils.get_channel_set import get_full_channel_set
+from src.alerting.alert_utils.get_channel_set import get_alert_outbox, \
+    get_full_channel_set
 from src.alerting.alert_utils.get_channel_set import \
     get_periodic_alive_reminder_channel_set
 from src.alerting.alerts.alerts import TerminatedDueToExceptionAlert, \
     NodeInaccessibleDuringStartup, RepoInaccessibleDuringStartup
 from src.alerting.periodic.periodic import PeriodicAliveReminder
-from src.commands.handlers.telegram import TelegramCommands
+from src.monitoring.monitor_utils.block_cache import BlockCache
 from src.monitoring.monitor_utils.get_json import get_cosmos_json, get_json
+from src.monitoring.monitor_utils.rpc_transport import \
+    RecordingRpcTransport, ReplayRpcTransport, set_rpc_transport
 from src.monitoring.monitors.github import GitHubMonitor
 from src.monitoring.monitors.monitor_starters import start_node_monitor, \
     start_network_monitor, start_github_monitor
@@ -18,12 +25,19 @@ from src.monitoring.monitors.node import NodeMonitor
 from src.node.node import Node, NodeType
 from src.utils.config_parsers.internal_parsed import InternalConf, \
     INTERNAL_CONFIG_FILE_FOUND, INTERNAL_CONFIG_FILE
-from src.utils.config_parsers.user import NodeConfig, RepoConfig
+from src.utils.config_parsers.config_diff import diff_configs, \
+    node_config_key, repo_config_key
+from src.utils.config_parsers.user import NodeConfig, RepoConfig, UserConfig
 from src.utils.config_parsers.user_parsed import UserConf, \
-    MISSING_USER_CONFIG_FILES
+    MISSING_USER_CONFIG_FILES, USER_CONFIG_FILE_MAIN, \
+    USER_CONFIG_FILE_NODES, USER_CONFIG_FILE_REPOS
 from src.utils.exceptions import InitialisationException
-from src.utils.logging import create_logger
+from src.utils.logging import create_logger, \
+    create_shared_monitor_logger, enable_async_logging
+from src.utils.metrics import start_metrics_server
+from src.utils.profiling import Profiler
 from src.utils.redis_api import RedisApi
+from src.utils.state_store import MemoryStateStore, SqliteStateStore
 
 
 def log_and_print(text: str):
@@ -85,34 +99,45 @@ def test_connection_to_github_page(repo: RepoConfig):
                                       ''.format(releases_page))
 
 
-def run_monitor_nodes(node: Node):
+def create_monitor_logger(monitor: str, name: str, log_file: str) \
+        -> logging.Logger:
+    if InternalConf.monitors_shared_log_enabled:
+        return create_shared_monitor_logger(
+            InternalConf.monitors_shared_log_file, monitor, name,
+            InternalConf.logging_level)
+    return create_logger(log_file, name, InternalConf.logging_level,
+                         rotating=True)
+
+
+def run_monitor_nodes(node: Node, stop_event: threading.Event):
     # Monitor name based on node
     monitor_name = 'Node monitor ({})'.format(node.name)
 
     # Logger initialisation
-    logger_monitor_node = create_logger(
-        InternalConf.node_monitor_general_log_file_template.format(node.name),
-        node.name, InternalConf.logging_level, rotating=True)
+    logger_monitor_node = create_monitor_logger(
+        'node_monitor', node.name,
+        InternalConf.node_monitor_general_log_file_template.format(node.name))
 
     # Initialise monitor
     node_monitor = NodeMonitor(monitor_name, full_channel_set,
                                logger_monitor_node, REDIS, node)
 
-    while True:
+    while not stop_event.is_set():
         # Start
         log_and_print('{} started.'.format(monitor_name))
         sys.stdout.flush()
         try:
             start_node_monitor(node_monitor,
                                InternalConf.node_monitor_period_seconds,
-                               logger_monitor_node)
+                               logger_monitor_node, stop_event)
         except Exception as e:
             full_channel_set.alert_error(
                 TerminatedDueToExceptionAlert(monitor_name, e))
         log_and_print('{} stopped.'.format(monitor_name))
 
 
-def run_monitor_network(network_nodes_tuple: Tuple[str, List[Node]]):
+def run_monitor_network(network_nodes_tuple: Tuple[str, List[Node]],
+                        stop_event: threading.Event):
     # Get network and nodes
     network = network_nodes_tuple[0]
     nodes = network_nodes_tuple[1]
@@ -123,9 +148,10 @@ def run_monitor_network(network_nodes_tuple: Tuple[str, List[Node]]):
     # Initialisation
     try:
         # Logger initialisation
-        logger_monitor_network = create_logger(
+        logger_monitor_network = create_monitor_logger(
+            'network_monitor', network,
             InternalConf.network_monitor_general_log_file_template.format(
-                network), network, InternalConf.logging_level, rotating=True)
+                network))
 
         # Organize as validators and full nodes
         validators = [n for n in nodes if n.is_validator]
@@ -137,18 +163,29 @@ def run_monitor_network(network_nodes_tuple: Tuple[str, List[Node]]):
                           'validator and 1 full node!!!'.format(monitor_name))
             return
 
+        # Block cache initialisation
+        if InternalConf.block_cache_enabled:
+            block_cache = BlockCache(
+                InternalConf.block_cache_file_template.format(network),
+                InternalConf.block_cache_capacity_blocks,
+                InternalConf.block_cache_max_validators,
+                logger_monitor_network)
+        else:
+            block_cache = None
+
         # Initialise monitor
         network_monitor = NetworkMonitor(monitor_name, full_channel_set,
                                          logger_monitor_network,
                                          InternalConf.
                                          network_monitor_max_catch_up_blocks,
-                                         REDIS, full_nodes, validators)
+                                         REDIS, full_nodes, validators,
+                                         block_cache=block_cache)
     except Exception as e:
         msg = '!!! Error when initialising {}: {} !!!'.format(monitor_name, e)
         log_and_print(msg)
         raise InitialisationException(msg)
 
-    while True:
+    while not stop_event.is_set():
         # Start
         log_and_print('{} started with {} validator(s) and {} full node(s).'
                       ''.format(monitor_name, len(validators), len(full_nodes)))
@@ -156,11 +193,16 @@ def run_monitor_network(network_nodes_tuple: Tuple[str, List[Node]]):
         try:
             start_network_monitor(network_monitor,
                                   InternalConf.network_monitor_period_seconds,
-                                  logger_monitor_network)
+                                  logger_monitor_network, stop_event)
         except Exception as e:
             full_channel_set.alert_error(
                 TerminatedDueToExceptionAlert(monitor_name, e))
         log_and_print('{} stopped.'.format(monitor_name))
+    network_monitor.close()
+
+    # The network's monitor may be restarted with a new cache after a reload
+    if block_cache is not None:
+        block_cache.close()
 
 
 def run_commands_telegram():
@@ -171,6 +213,9 @@ def run_commands_telegram():
     if not UserConf.telegram_cmds_enabled:
         return
 
+    # Imported here since python-telegram-bot is slow to import
+    from src.commands.handlers.telegram import TelegramCommands
+
     while True:
         # Start
         log_and_print('{} started.'.format(monitor_name))
@@ -185,6 +230,7 @@ def run_commands_telegram():
                 InternalConf.redis_node_monitor_alive_key_prefix,
                 InternalConf.redis_network_monitor_alive_key_prefix,
                 InternalConf.redis_network_monitor_last_height_key_prefix,
+                reload_callback=request_reload, profiler=PROFILER,
             ).start_listening()
         except Exception as e:
             full_channel_set.alert_error(
@@ -192,17 +238,17 @@ def run_commands_telegram():
         log_and_print('{} stopped.'.format(monitor_name))
 
 
-def run_monitor_github(repo_config: RepoConfig):
+def run_monitor_github(repo_config: RepoConfig, stop_event: threading.Event):
     # Monitor name based on repository
     monitor_name = 'GitHub monitor ({})'.format(repo_config.repo_name)
 
     # Initialisation
     try:
         # Logger initialisation
-        logger_monitor_github = create_logger(
+        logger_monitor_github = create_monitor_logger(
+            'github_monitor', repo_config.repo_page,
             InternalConf.github_monitor_general_log_file_template.format(
-                repo_config.repo_page.replace('/', '_')), repo_config.repo_page,
-            InternalConf.logging_level, rotating=True)
+                repo_config.repo_page.replace('/', '_')))
 
         # Get releases page
         releases_page = InternalConf.github_releases_template.format(
@@ -218,14 +264,15 @@ def run_monitor_github(repo_config: RepoConfig):
         log_and_print(msg)
         raise InitialisationException(msg)
 
-    while True:
+    while not stop_event.is_set():
         # Start
         log_and_print('{} started.'.format(monitor_name))
         sys.stdout.flush()
         try:
             start_github_monitor(github_monitor,
                                  InternalConf.github_monitor_period_seconds,
-                                 logger_monitor_github)
+                                 logger_monitor_github,
+                                 stop_event=stop_event)
         except Exception as e:
             full_channel_set.alert_error(
                 TerminatedDueToExceptionAlert(monitor_name, e))
@@ -255,6 +302,158 @@ def run_periodic_alive_reminder():
         log_and_print('{} stopped.'.format(name))
 
 
+def start_thread(target: Callable, *args) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_monitor(key: Hashable, target: Callable, arg) -> None:
+    stop_event = threading.Event()
+    monitors[key] = (start_thread(target, arg, stop_event), stop_event)
+
+
+def stop_monitors(keys: List[Hashable]) -> None:
+    # All of the monitors are told to stop before waiting for any of them,
+    # so that they stop in parallel
+    stopped = [monitors.pop(key) for key in keys]
+    for _, stop_event in stopped:
+        stop_event.set()
+    for thread, _ in stopped:
+        thread.join()
+
+
+def start_node_monitor(future: concurrent.futures.Future, key: Hashable,
+                       n: NodeConfig) -> None:
+    try:
+        nodes_by_key[key] = future.result()
+    except InitialisationException as ie:
+        log_and_print(str(ie))
+        if n.node_is_validator:
+            full_channel_set.alert_major(
+                NodeInaccessibleDuringStartup(n.node_name))
+        else:
+            full_channel_set.alert_minor(
+                NodeInaccessibleDuringStartup(n.node_name))
+        return
+
+    if n.include_in_node_monitor:
+        start_monitor(('node', key), run_monitor_nodes, nodes_by_key[key])
+
+
+def start_network_monitors(node_configs: List[NodeConfig]) -> None:
+    # Group nodes by network. Network monitors need all of the network's
+    # nodes, so they are started once all of the nodes were reached (or
+    # not), and restarted if the network's nodes changed.
+    network_node_keys = {}
+    for n in node_configs:
+        k = node_config_key(n)
+        if n.include_in_network_monitor and k in nodes_by_key:
+            network_node_keys.setdefault(
+                nodes_by_key[k].network, []).append(k)
+    network_keys = {('network', net, frozenset(keys)): keys
+                    for net, keys in network_node_keys.items()}
+    stop_monitors([k for k in list(monitors)
+                   if k[0] == 'network' and k not in network_keys])
+    for key, keys in network_keys.items():
+        if key not in monitors:
+            start_monitor(key, run_monitor_network,
+                          (key[1], [nodes_by_key[k] for k in keys]))
+
+
+def start_github_monitor(future: concurrent.futures.Future, key: Hashable,
+                         r: RepoConfig) -> None:
+    try:
+        future.result()
+    except InitialisationException as ie:
+        log_and_print(str(ie))
+        full_channel_set.alert_minor(
+            RepoInaccessibleDuringStartup(r.repo_name))
+        return
+
+    start_monitor(('github', key), run_monitor_github, r)
+
+
+def update_monitors(node_configs: List[NodeConfig],
+                    repo_configs: List[RepoConfig]) -> None:
+    # Starts the monitors of nodes and repos that are not monitored yet and
+    # stops the monitors of nodes and repos that were removed or changed.
+    # Monitors of nodes and repos that did not change are left running.
+    node_diff = diff_configs(nodes_by_key.keys(), node_configs,
+                             node_config_key)
+    repo_diff = diff_configs([k[1] for k in monitors if k[0] == 'github'],
+                             repo_configs, repo_config_key)
+
+    # Network monitors of removed nodes are stopped first, so that they do
+    # not save the state of a node while it is being reloaded
+    stop_monitors([k for k in list(monitors) if k[0] == 'network'
+                   and not k[2].isdisjoint(node_diff.removed)])
+    stop_monitors([('node', k) for k in node_diff.removed
+                   if ('node', k) in monitors])
+    stop_monitors([('github', k) for k in repo_diff.removed])
+    for k in node_diff.removed:
+        del nodes_by_key[k]
+
+    # Nodes and GitHub pages are reached concurrently, so that a few
+    # unreachable ones do not hold back the start-up of the others. Each
+    # node and GitHub monitor is started as soon as its own node or page is
+    # reached, whichever of them is reached first.
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=InternalConf.startup_max_workers) as initialiser:
+        futures = {initialiser.submit(node_from_node_config, n): ('node', k, n)
+                   for k, n in node_diff.added.items()}
+        futures.update({
+            initialiser.submit(test_connection_to_github_page, r):
+                ('github', k, r)
+            for k, r in repo_diff.added.items()})
+
+        nodes_pending = len(node_diff.added)
+        if nodes_pending == 0:
+            start_network_monitors(node_configs)
+        for future in concurrent.futures.as_completed(futures):
+            kind, k, config = futures[future]
+            if kind == 'node':
+                start_node_monitor(future, k, config)
+                nodes_pending -= 1
+                if nodes_pending == 0:
+                    start_network_monitors(node_configs)
+            else:
+                start_github_monitor(future, k, config)
+
+    # Inaccessible nodes and repos are left out, until the next reload
+    UserConf.filtered_nodes[:] = [n for n in node_configs
+                                  if node_config_key(n) in nodes_by_key]
+    UserConf.filtered_repos[:] = [
+        r for r in repo_configs if ('github', repo_config_key(r)) in monitors]
+
+
+def request_reload(*_) -> None:
+    # Called from a signal handler, so it only queues the request
+    reload_requests.put(None)
+
+
+def request_profile(*_) -> None:
+    if not PROFILER.start(InternalConf.profiling_default_duration):
+        logger_general.info('Not profiling since a profile is already being '
+                            'captured.')
+
+
+def reload_monitors() -> None:
+    log_and_print('Reloading the node and repo configuration.')
+    try:
+        user_conf = UserConfig(USER_CONFIG_FILE_MAIN, USER_CONFIG_FILE_NODES,
+                               USER_CONFIG_FILE_REPOS)
+    except Exception as e:
+        log_and_print('!!! Could not reload the configuration: {} !!!'
+                      ''.format(e))
+        return
+
+    update_monitors(user_conf.filtered_nodes, user_conf.filtered_repos)
+    log_and_print('Reloaded the node and repo configuration. Any other '
+                  'changes only take effect after a restart.')
+    sys.stdout.flush()
+
+
 if __name__ == '__main__':
     if not INTERNAL_CONFIG_FILE_FOUND:
         sys.exit('Config file {} is missing.'.format(INTERNAL_CONFIG_FILE))
@@ -264,6 +463,9 @@ if __name__ == '__main__':
                  ''.format(MISSING_USER_CONFIG_FILES[0]))
 
     # Global loggers initialisation
+    if InternalConf.logging_asynchronous:
+        enable_async_logging(InternalConf.logging_flush_interval,
+                             InternalConf.logging_max_batch_size)
     logger_redis = create_logger(
         InternalConf.redis_log_file, 'redis',
         InternalConf.logging_level)
@@ -275,8 +477,15 @@ if __name__ == '__main__':
         InternalConf.logging_level, rotating=True)
     log_file_alerts = InternalConf.alerts_log_file
 
-    # Redis initialisation
-    if UserConf.redis_enabled:
+    # State store (Redis, SQLite or memory) initialisation
+    if InternalConf.state_store_backend == 'sqlite':
+        REDIS = SqliteStateStore(
+            InternalConf.state_store_sqlite_file, logger_redis,
+            namespace=UserConf.unique_alerter_identifier)
+    elif InternalConf.state_store_backend == 'memory':
+        REDIS = MemoryStateStore(
+            logger_redis, namespace=UserConf.unique_alerter_identifier)
+    elif UserConf.redis_enabled:
         REDIS = RedisApi(
             logger_redis, InternalConf.redis_database, UserConf.redis_host,
             UserConf.redis_port, password=UserConf.redis_password,
@@ -284,83 +493,63 @@ if __name__ == '__main__':
     else:
         REDIS = None
 
+    # Metrics endpoint initialisation
+    if InternalConf.metrics_enabled:
+        start_metrics_server(InternalConf.metrics_host,
+                             InternalConf.metrics_port, logger_general)
+
+    # RPC capture initialisation
+    if InternalConf.rpc_capture_mode == 'record':
+        log_and_print('Recording RPC traffic to {}.'.format(
+            InternalConf.rpc_capture_file))
+        set_rpc_transport(RecordingRpcTransport(InternalConf.rpc_capture_file))
+    elif InternalConf.rpc_capture_mode == 'replay':
+        log_and_print('Replaying RPC traffic from {}.'.format(
+            InternalConf.rpc_capture_file))
+        set_rpc_transport(ReplayRpcTransport(
+            InternalConf.rpc_capture_file,
+            InternalConf.rpc_replay_as_fast_as_possible))
+
+    # Profiler initialisation
+    PROFILER = Profiler(InternalConf.profiling_directory,
+                        InternalConf.profiling_sampling_interval,
+                        InternalConf.profiling_max_duration, logger_general)
+
     # Alerters initialisation
     alerter_name = 'PANIC'
+    alert_outbox = get_alert_outbox(logger_general)
     full_channel_set = get_full_channel_set(
-        alerter_name, logger_general, REDIS, log_file_alerts)
+        alerter_name, logger_general, REDIS, log_file_alerts,
+        outbox=alert_outbox)
     log_and_print('Enabled alerting channels (general): {}'.format(
         full_channel_set.enabled_channels_list()))
     periodic_alive_reminder_channel_set = \
         get_periodic_alive_reminder_channel_set(alerter_name, logger_general,
-                                                REDIS, log_file_alerts)
+                                                REDIS, log_file_alerts,
+                                                outbox=alert_outbox)
     log_and_print('Enabled alerting channels (periodic alive reminder): {}'
                   ''.format(periodic_alive_reminder_channel_set.
                             enabled_channels_list()))
     sys.stdout.flush()
 
-    # Nodes initialisation
-    nodes = []
-    nodes_inaccessible = []
-    for n in UserConf.filtered_nodes:
-        try:
-            nodes.append(node_from_node_config(n))
-        except InitialisationException as ie:
-            log_and_print(str(ie))
-            nodes_inaccessible.append(n)
-            if n.node_is_validator:
-                full_channel_set.alert_major(
-                    NodeInaccessibleDuringStartup(n.node_name))
-            else:
-                full_channel_set.alert_minor(
-                    NodeInaccessibleDuringStartup(n.node_name))
-
-    # Remove inaccessible nodes
-    for ni in nodes_inaccessible:
-        UserConf.filtered_nodes.remove(ni)
-
-    # Organize nodes into lists according to how they will be monitored
-    node_monitor_nodes = []
-    network_monitor_nodes = []
-    for node, node_conf in zip(nodes, UserConf.filtered_nodes):
-        if node_conf.include_in_node_monitor:
-            node_monitor_nodes.append(node)
-        if node_conf.include_in_network_monitor:
-            network_monitor_nodes.append(node)
-
-    # Get unique networks and group nodes by network
-    unique_networks = {n.network for n in network_monitor_nodes}
-    nodes_by_network = {net: [node for node in network_monitor_nodes
-                              if node.network == net]
-                        for net in unique_networks}
-
-    # Test connection to GitHub pages
-    repos_inaccessible = []
-    for r in UserConf.filtered_repos:
-        try:
-            test_connection_to_github_page(r)
-        except InitialisationException as ie:
-            log_and_print(str(ie))
-            repos_inaccessible.append(r)
-            full_channel_set.alert_minor(
-                RepoInaccessibleDuringStartup(r.repo_name))
-
-    # Remove inaccessible repos
-    for ri in repos_inaccessible:
-        UserConf.filtered_repos.remove(ri)
-
-    # Run monitors
-    monitor_node_count = len(node_monitor_nodes)
-    monitor_network_count = len(unique_networks)
-    monitor_github_count = len(UserConf.filtered_repos)
-    commands_telegram_count = 1
-    periodic_alive_reminder_count = 1
-    total_count = sum([monitor_node_count, monitor_network_count,
-                       monitor_github_count, commands_telegram_count,
-                       periodic_alive_reminder_count])
-    with concurrent.futures.ThreadPoolExecutor(max_workers=total_count) \
-            as executor:
-        executor.map(run_monitor_nodes, node_monitor_nodes)
-        executor.map(run_monitor_network, nodes_by_network.items())
-        executor.map(run_monitor_github, UserConf.filtered_repos)
-        executor.submit(run_commands_telegram)
-        executor.submit(run_periodic_alive_reminder)
+    # Running monitors (with their stop events) by key, and the nodes that
+    # were reached by the key of their configuration
+    monitors = {}
+    nodes_by_key = {}
+
+    # Reload requests, from a signal handler or the Telegram commands
+    reload_requests = queue.SimpleQueue()
+
+    start_thread(run_commands_telegram)
+    start_thread(run_periodic_alive_reminder)
+    update_monitors(UserConf.filtered_nodes, UserConf.filtered_repos)
+
+    # The node and repo configuration is reloaded on SIGHUP (or /reload),
+    # and a profile is captured on SIGUSR1 (or /profile)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, request_reload)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, request_profile)
+    while True:
+        reload_requests.get()
+        reload_monitors()
@@ -0,0 +1,113 @@
+import argparse
+import os
+from typing import List, Optional
+
+from src.monitoring.backtest import BacktestData, BacktestResult, \
+    read_capture, run_backtest
+from src.monitoring.monitor_utils.block_cache import BlockCache
+from src.utils.config_parsers.internal import InternalConfig
+from src.utils.config_parsers.internal_parsed import INTERNAL_CONFIG_FILE
+from src.utils.logging import DUMMY_LOGGER
+
+
+def read_block_cache(cache_file: str, from_height: Optional[int],
+                     to_height: Optional[int]) -> Optional[BacktestData]:
+    # The cache is opened with its own layout, so that it is not cleared
+    layout = BlockCache.layout(cache_file)
+    if layout is None:
+        return None
+    cache = BlockCache(cache_file, layout[0], layout[1], DUMMY_LOGGER)
+    try:
+        to_height = to_height if to_height is not None \
+            else cache.latest_height or 0
+        blocks = list(cache.summaries(from_height or 0, to_height))
+    finally:
+        cache.close()
+    return BacktestData(blocks, [])
+
+
+def in_range(data: BacktestData, from_height: Optional[int],
+             to_height: Optional[int]) -> BacktestData:
+    blocks = [b for b in data.blocks
+              if (from_height is None or b.height >= from_height) and
+              (to_height is None or b.height <= to_height)]
+    return BacktestData(blocks, data.snapshots)
+
+
+def validators_in(data: BacktestData) -> List[str]:
+    # All validators that signed any of the blocks or that had voting power
+    addresses = set()
+    for b in data.blocks:
+        addresses.update(b.signers)
+    addresses.update(s.address for s in data.snapshots
+                     if s.is_up and s.voting_power > 0)
+    return sorted(addresses)
+
+
+def print_result(result: BacktestResult, list_alerts: bool) -> None:
+    print('{}: {} alerts in {:.2f}s'.format(
+        result.name, len(result.alerts), result.duration))
+    counts = result.counts()
+    for (alert_type, severity), count in sorted(
+            counts.items(), key=lambda c: (-c[1], c[0])):
+        print('{:>8}  {:<6} {}'.format(count, severity, alert_type))
+    if list_alerts:
+        for severity, alert in result.alerts:
+            print('  [{}] {}'.format(severity.upper(), alert.message))
+    print()
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(
+        description='Run the alerts over a range of cached or recorded '
+                    'blocks and node snapshots, for one or more sets of '
+                    'thresholds, and report the alerts that would have been '
+                    'raised.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--cache', help='a block cache file')
+    source.add_argument('--capture', help='an RPC capture file')
+    parser.add_argument('--from', dest='from_height', type=int)
+    parser.add_argument('--to', dest='to_height', type=int)
+    parser.add_argument('--validators',
+                        help='comma-separated addresses of the validators to '
+                             'alert on (default: all validators)')
+    parser.add_argument('--thresholds', action='append', default=[],
+                        help='a file overriding any of the internal config, '
+                             'such as [alert_intervals_and_limits]; can be '
+                             'given more than once')
+    parser.add_argument('--alerts', action='store_true',
+                        help='list every alert')
+    a = parser.parse_args()
+
+    if a.cache is not None:
+        data = read_block_cache(a.cache, a.from_height, a.to_height)
+        if data is None:
+            print('Block cache {} not found.'.format(a.cache))
+            return
+    else:
+        if not os.path.isfile(a.capture):
+            print('RPC capture {} not found.'.format(a.capture))
+            return
+        data = in_range(read_capture(a.capture), a.from_height, a.to_height)
+
+    validators = a.validators.split(',') if a.validators is not None \
+        else validators_in(data)
+    heights = 'heights {} to {}'.format(
+        data.blocks[0].height, data.blocks[-1].height) \
+        if len(data.blocks) > 0 else 'no heights'
+    print('Backtesting {} blocks ({}) and {} node snapshots, alerting on {} '
+          'validators.'.format(len(data.blocks), heights,
+                               len(data.snapshots), len(validators)))
+    print()
+
+    threshold_sets = [('current', InternalConfig(INTERNAL_CONFIG_FILE))]
+    threshold_sets += [
+        (os.path.basename(f), InternalConfig(INTERNAL_CONFIG_FILE, [f]))
+        for f in a.thresholds]
+    for name, internal_conf in threshold_sets:
+        print_result(run_backtest(name, internal_conf, data, validators,
+                                  DUMMY_LOGGER), a.alerts)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,62 @@
+import argparse
+import os
+from typing import Optional
+
+from src.utils.config_parsers.internal_parsed import InternalConf
+from src.utils.log_demux import MonitorLogDemultiplexer
+
+
+def log_file_for(monitor: str, node: str) -> Optional[str]:
+    if monitor == 'node_monitor':
+        return InternalConf.node_monitor_general_log_file_template.format(
+            node)
+    elif monitor == 'network_monitor':
+        return InternalConf.network_monitor_general_log_file_template.format(
+            node)
+    elif monitor == 'github_monitor':
+        return InternalConf.github_monitor_general_log_file_template.format(
+            node.replace('/', '_'))
+    else:
+        return None
+
+
+def run(output_directory: str) -> None:
+    shared_log_file = InternalConf.monitors_shared_log_file
+
+    # Rotated logs (.3 being the oldest) are read first, so that the records
+    # end up in the per-monitor log files in order
+    files = ['{}.{}'.format(shared_log_file, i) for i in range(3, 0, -1)]
+    files.append(shared_log_file)
+    files = [f for f in files if os.path.isfile(f)]
+
+    if len(files) == 0:
+        print('Shared monitors log {} not found.'.format(shared_log_file))
+        return
+
+    # The per-monitor log files are written to their own directory, since
+    # they would otherwise replace those that the monitors write to
+    os.makedirs(output_directory, exist_ok=True)
+    demux = MonitorLogDemultiplexer(output_directory, log_file_for)
+    try:
+        for file in files:
+            print('Splitting up {}.'.format(file))
+            with open(file) as f:
+                for line in f:
+                    demux.write(line)
+    finally:
+        demux.close()
+
+    print('Done. Wrote {} records to {}, skipped {}.'.format(
+        demux.lines_written, output_directory, demux.lines_skipped))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Split up the shared monitors log into one log file per '
+                    'monitor and node.')
+    parser.add_argument('--output', default='logs/demux',
+                        help='the directory to write the log files to '
+                             '(default: logs/demux)')
+    a = parser.parse_args()
+
+    run(a.output)
@@ -0,0 +1,30 @@
+import sys
+
+from src.utils.import_time import measure_import_times
+
+DEFAULT_MODULE = 'run_alerter'
+DEFAULT_TOP = 20
+
+
+def run() -> None:
+    module = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODULE
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TOP
+
+    times = measure_import_times(module)
+    if len(times) == 0:
+        print('Could not measure the import time of {}.'.format(module))
+        return
+
+    total = next((t for t in times if t.module == module), times[-1])
+    print('Importing {} took {:.1f}ms.'.format(
+        module, total.cumulative_us / 1000))
+    print()
+    print('Slowest {} modules (including their imports):'.format(top))
+    print('{:>12} {:>12}  {}'.format('cumulative', 'self', 'module'))
+    for t in sorted(times, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        print('{:>10.1f}ms {:>10.1f}ms  {}'.format(
+            t.cumulative_us / 1000, t.self_us / 1000, t.module))
+
+
+if __name__ == '__main__':
+    run()
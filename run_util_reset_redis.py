@@ -1,3 +1,4 @@
+import argparse
 import sys
 
 from src.utils.config_parsers.internal_parsed import InternalConf
@@ -7,7 +8,36 @@ from src.utils.logging import create_logger
 from src.utils.redis_api import RedisApi
 
 
+def print_progress(deleted: int) -> None:
+    print('\r  Deleted {} keys so far.'.format(deleted), end='', flush=True)
+
+
+def reset(redis: RedisApi, db: int, flush: bool, batch_size: int) -> None:
+    if flush:
+        print('Deleting all keys in database {}.'.format(db))
+        redis.delete_all_unsafe()
+        return
+
+    print('Deleting the keys of {} in database {}.'.format(
+        UserConf.unique_alerter_identifier, db))
+    deleted = redis.delete_namespace_unsafe(batch_size, print_progress)
+    if deleted > 0:
+        print()
+    print('  Deleted {} keys.'.format(deleted))
+
+
 def run() -> None:
+    parser = argparse.ArgumentParser(
+        description='Delete the keys of this alerter (as identified by its '
+                    'unique_alerter_identifier) from Redis, incrementally and '
+                    'without blocking Redis.')
+    parser.add_argument('--flush', action='store_true',
+                        help='delete all keys in the databases, including '
+                             'those of any other alerter (FLUSHDB)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='number of keys deleted at a time')
+    a = parser.parse_args()
+
     # Check if Redis enabled
     if not UserConf.redis_enabled:
         raise InitialisationException('Redis is not set up. Run the setup '
@@ -16,29 +46,18 @@ def run() -> None:
     logger = create_logger(InternalConf.redis_log_file, 'redis',
                            InternalConf.logging_level)
 
-    print('Deleting all Redis keys.')
+    # Redis database and Redis test database
+    for db in [InternalConf.redis_database, InternalConf.redis_test_database]:
+        try:
+            reset(RedisApi(
+                logger, db, UserConf.redis_host, UserConf.redis_port,
+                password=UserConf.redis_password,
+                namespace=UserConf.unique_alerter_identifier
+            ), db, a.flush, a.batch_size)
+        except Exception as e:
+            sys.exit(e)
 
-    # Redis database
-    try:
-        RedisApi(
-            logger, InternalConf.redis_database, UserConf.redis_host,
-            UserConf.redis_port, password=UserConf.redis_password,
-            namespace=UserConf.unique_alerter_identifier
-        ).delete_all_unsafe()
-    except Exception as e:
-        sys.exit(e)
-
-    # Redis test database
-    try:
-        RedisApi(
-            logger, InternalConf.redis_test_database, UserConf.redis_host,
-            UserConf.redis_port, password=UserConf.redis_password,
-            namespace=UserConf.unique_alerter_identifier
-        ).delete_all_unsafe()
-    except Exception as e:
-        sys.exit(e)
-
-    print('Done deleting all Redis keys.')
+    print('Done deleting Redis keys.')
 
 
 if __name__ == '__main__':
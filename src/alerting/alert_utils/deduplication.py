@@ -0,0 +1,84 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional
+
+from src.alerting.alerts.alerts import Alert
+from src.utils.clock import Clock, SYSTEM_CLOCK
+from src.utils.state_store import StateStore
+
+
+class AlertDeduplicator:
+
+    def __init__(self, window: timedelta, logger: logging.Logger,
+                 redis: Optional[StateStore] = None,
+                 redis_key_prefix: str = '',
+                 clock: Clock = SYSTEM_CLOCK) -> None:
+        self._window = window
+        self._logger = logger
+        self._redis = redis
+        self._redis_enabled = redis is not None
+        self._redis_key_prefix = redis_key_prefix
+        self._clock = clock
+
+        # Maps a severity-qualified fingerprint to [expiry, duplicates]. Since
+        # the window is fixed and is not extended by duplicates, insertion
+        # order is also expiry order, so expired entries are always at the
+        # front. The lock is needed since channel sets are shared by monitors.
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> timedelta:
+        return self._window
+
+    def _remove_expired(self, now: float) -> None:
+        while len(self._seen) > 0:
+            key, (expiry, _) = next(iter(self._seen.items()))
+            if expiry > now:
+                break
+            del self._seen[key]
+
+    def is_duplicate(self, alert: Alert, severity: str) -> bool:
+        key = severity + '_' + alert.fingerprint
+        now = self._clock.monotonic()
+
+        with self._lock:
+            self._remove_expired(now)
+
+            # Seen recently by this alerter instance
+            if key in self._seen:
+                self._seen[key][1] += 1
+                duplicates = self._seen[key][1]
+            else:
+                # The alert is taken to be seen already, so that concurrent
+                # occurrences are duplicates while Redis is checked
+                self._seen[key] = [now + self._window.total_seconds(), 0]
+                duplicates = 0
+
+        if duplicates > 0:
+            self._logger.info(
+                'Suppressed duplicate %s alert (%s so far in window): %s',
+                severity, duplicates, alert)
+            return True
+        if not self._redis_enabled:
+            return False
+
+        # Otherwise, the alert might have been sent before a restart. The
+        # Redis key expires by itself at the end of the window, so there is
+        # no need to clean up after it. Redis is accessed without holding the
+        # lock, so that other alerts are not held up by it.
+        redis_key = self._redis_key_prefix + key
+        if self._redis.exists(redis_key):
+            with self._lock:
+                if key in self._seen:
+                    self._seen[key][1] += 1
+            self._logger.info(
+                'Suppressed duplicate %s alert sent before restart: %s',
+                severity, alert)
+            return True
+
+        # First occurrence in window
+        self._redis.set_for(redis_key, 1, self._window)
+        return False
@@ -1,21 +1,18 @@
 import logging
 from typing import Optional
 
-from src.alerting.alert_utils.email_sending import EmailSender
-from src.alerting.alert_utils.telegram_bot_api import TelegramBotApi
-from src.alerting.alert_utils.twilio_api import TwilioApi
-from src.alerting.channels.channel import ChannelSet
+from src.alerting.alert_utils.deduplication import AlertDeduplicator
+from src.alerting.alert_utils.outbox import AlertOutbox
+from src.alerting.channels.channel import Channel, ChannelSet
 from src.alerting.channels.console import ConsoleChannel
-from src.alerting.channels.email import EmailChannel
 from src.alerting.channels.log import LogChannel
-from src.alerting.channels.telegram import TelegramChannel
-from src.alerting.channels.twilio import TwilioChannel
+from src.alerting.channels.outbox import OutboxChannel
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
 from src.utils.config_parsers.user import UserConfig
 from src.utils.config_parsers.user_parsed import UserConf
 from src.utils.logging import create_logger
-from src.utils.redis_api import RedisApi
+from src.utils.state_store import StateStore
 
 
 def _get_log_channel(alerts_log_file: str, channel_name: str,
@@ -34,9 +31,13 @@ def _get_console_channel(channel_name: str,
 
 
 def _get_telegram_channel(channel_name: str, logger_general: logging.Logger,
-                          redis: Optional[RedisApi],
+                          redis: Optional[StateStore],
                           backup_channels_for_telegram: ChannelSet,
-                          user_conf: UserConfig = UserConf) -> TelegramChannel:
+                          user_conf: UserConfig = UserConf) -> Channel:
+    # Channel backends are only imported if they are enabled
+    from src.alerting.alert_utils.telegram_bot_api import TelegramBotApi
+    from src.alerting.channels.telegram import TelegramChannel
+
     telegram_bot = TelegramBotApi(user_conf.telegram_alerts_bot_token,
                                   user_conf.telegram_alerts_bot_chat_id)
     telegram_channel = TelegramChannel(
@@ -46,8 +47,11 @@ def _get_telegram_channel(channel_name: str, logger_general: logging.Logger,
 
 
 def _get_email_channel(channel_name: str, logger_general: logging.Logger,
-                       redis: Optional[RedisApi],
-                       user_conf: UserConfig = UserConf) -> EmailChannel:
+                       redis: Optional[StateStore],
+                       user_conf: UserConfig = UserConf) -> Channel:
+    from src.alerting.alert_utils.email_sending import EmailSender
+    from src.alerting.channels.email import EmailChannel
+
     email = EmailSender(user_conf.email_smtp, user_conf.email_from,
                         user_conf.email_user, user_conf.email_pass)
     email_channel = EmailChannel(channel_name, logger_general,
@@ -56,10 +60,13 @@ def _get_email_channel(channel_name: str, logger_general: logging.Logger,
 
 
 def _get_twilio_channel(channel_name: str, logger_general: logging.Logger,
-                        redis: Optional[RedisApi],
+                        redis: Optional[StateStore],
                         backup_channels_for_twilio: ChannelSet,
                         internal_conf: InternalConfig = InternalConf,
-                        user_conf: UserConfig = UserConf) -> TwilioChannel:
+                        user_conf: UserConfig = UserConf) -> Channel:
+    from src.alerting.alert_utils.twilio_api import TwilioApi
+    from src.alerting.channels.twilio import TwilioChannel
+
     twilio = TwilioApi(user_conf.twilio_account_sid,
                        user_conf.twilio_auth_token)
     twilio_channel = TwilioChannel(channel_name, logger_general,
@@ -69,14 +76,49 @@ def _get_twilio_channel(channel_name: str, logger_general: logging.Logger,
                                    internal_conf.twiml,
                                    internal_conf.twiml_is_url,
                                    internal_conf.redis_twilio_snooze_key,
-                                   backup_channels_for_twilio)
+                                   backup_channels_for_twilio,
+                                   internal_conf.twilio_call_coalescing_window)
     return twilio_channel
 
 
+def _get_deduplicator(logger_general: logging.Logger,
+                      redis: Optional[StateStore],
+                      internal_conf: InternalConfig = InternalConf) \
+        -> Optional[AlertDeduplicator]:
+    # A zero-length window disables deduplication
+    window = internal_conf.alert_deduplication_window
+    if window.total_seconds() <= 0:
+        return None
+    return AlertDeduplicator(window, logger_general, redis,
+                             internal_conf.redis_alert_fingerprint_key_prefix)
+
+
+def _through_outbox(channel: Channel, outbox: Optional[AlertOutbox],
+                    outbox_key_prefix: str) -> Channel:
+    if outbox is None:
+        return channel
+    return OutboxChannel(channel, outbox,
+                         outbox_key_prefix + channel.type_name)
+
+
+def get_alert_outbox(logger_general: logging.Logger,
+                     internal_conf: InternalConfig = InternalConf) \
+        -> Optional[AlertOutbox]:
+    if not internal_conf.alert_outbox_enabled:
+        return None
+    return AlertOutbox(internal_conf.alert_outbox_file, logger_general,
+                       internal_conf.alert_outbox_flush_interval,
+                       internal_conf.alert_outbox_max_batch_size,
+                       internal_conf.alert_outbox_retry_initial_delay,
+                       internal_conf.alert_outbox_retry_max_delay,
+                       internal_conf.alert_outbox_max_age)
+
+
 def get_full_channel_set(channel_name: str, logger_general: logging.Logger,
-                         redis: Optional[RedisApi], alerts_log_file: str,
+                         redis: Optional[StateStore], alerts_log_file: str,
                          internal_conf: InternalConfig = InternalConf,
-                         user_conf: UserConfig = UserConf) -> ChannelSet:
+                         user_conf: UserConfig = UserConf,
+                         outbox: Optional[AlertOutbox] = None) -> ChannelSet:
     # Initialise list of channels with default channels
     channels = [
         _get_console_channel(channel_name, logger_general),
@@ -93,7 +135,7 @@ def get_full_channel_set(channel_name: str, logger_general: logging.Logger,
         telegram_channel = _get_telegram_channel(
             channel_name, logger_general, redis,
             backup_channels_for_telegram, user_conf)
-        channels.append(telegram_channel)
+        channels.append(_through_outbox(telegram_channel, outbox, 'full_'))
     else:
         telegram_channel = None
 
@@ -101,7 +143,7 @@ def get_full_channel_set(channel_name: str, logger_general: logging.Logger,
     if user_conf.email_alerts_enabled:
         email_channel = _get_email_channel(channel_name, logger_general,
                                            redis, user_conf)
-        channels.append(email_channel)
+        channels.append(_through_outbox(email_channel, outbox, 'full_'))
     else:
         email_channel = None
 
@@ -110,7 +152,7 @@ def get_full_channel_set(channel_name: str, logger_general: logging.Logger,
         twilio_channel = _get_twilio_channel(channel_name, logger_general,
                                              redis, backup_channels_for_twilio,
                                              internal_conf, user_conf)
-        channels.append(twilio_channel)
+        channels.append(_through_outbox(twilio_channel, outbox, 'full_'))
     else:
         # noinspection PyUnusedLocal
         twilio_channel = None
@@ -124,16 +166,19 @@ def get_full_channel_set(channel_name: str, logger_general: logging.Logger,
     if telegram_channel is not None:
         backup_channels_for_twilio.add_channel(telegram_channel)
 
-    return ChannelSet(channels)
+    return ChannelSet(channels, _get_deduplicator(logger_general, redis,
+                                                  internal_conf))
 
 
 def get_periodic_alive_reminder_channel_set(channel_name: str,
                                             logger_general: logging.Logger,
-                                            redis: Optional[RedisApi],
+                                            redis: Optional[StateStore],
                                             alerts_log_file: str,
                                             internal_conf:
                                             InternalConfig = InternalConf,
-                                            user_conf: UserConfig = UserConf) \
+                                            user_conf: UserConfig = UserConf,
+                                            outbox:
+                                            Optional[AlertOutbox] = None) \
         -> ChannelSet:
     # Initialise list of channels with default channels
     channels = [
@@ -152,14 +197,16 @@ def get_periodic_alive_reminder_channel_set(channel_name: str,
                                                  redis,
                                                  backup_channels_for_telegram,
                                                  user_conf)
-        channels.append(telegram_channel)
+        channels.append(_through_outbox(telegram_channel, outbox,
+                                        'periodic_alive_reminder_'))
 
     # Add email alerts to channel set if they are enabled from config file
     if user_conf.email_alerts_enabled and \
             user_conf.email_enabled:
         email_channel = _get_email_channel(channel_name, logger_general,
                                            redis, user_conf)
-        channels.append(email_channel)
+        channels.append(_through_outbox(email_channel, outbox,
+                                        'periodic_alive_reminder_'))
     else:
         email_channel = None
 
@@ -0,0 +1,214 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from typing import Callable
+
+from src.alerting.alerts import alerts
+from src.alerting.alerts.alerts import Alert
+from src.utils.metrics import OUTBOX_DELIVERY_DURATION
+
+# A deliverer receives the severity of a journalled alert and the alert
+# itself, and raises an exception if the alert could not be delivered
+Deliverer = Callable[[str, Alert], None]
+
+
+def restore_alert(alert_type: str, message: str, key_fields: str) -> Alert:
+    # Rebuilds a journalled alert as an instance of its original class with
+    # the same message and key fields, and hence the same fingerprint. The
+    # key fields are journalled as strings, which is all the fingerprint
+    # uses. Alerts whose class is no longer known are restored as an Alert.
+    alert_class = getattr(alerts, alert_type, None)
+    if not isinstance(alert_class, type) or \
+            not issubclass(alert_class, Alert):
+        alert_class = Alert
+    alert = alert_class.__new__(alert_class)
+    Alert.__init__(alert, message, *json.loads(key_fields))
+    return alert
+
+
+class AlertOutbox:
+
+    def __init__(self, outbox_file: str, logger: logging.Logger,
+                 flush_interval: timedelta, max_batch_size: int,
+                 retry_initial_delay: timedelta, retry_max_delay: timedelta,
+                 max_age: timedelta) -> None:
+        self._outbox_file = outbox_file
+        self._logger = logger
+        self._flush_interval = flush_interval.total_seconds()
+        self._max_batch_size = max_batch_size
+        self._retry_initial_delay = retry_initial_delay.total_seconds()
+        self._retry_max_delay = retry_max_delay.total_seconds()
+        self._max_age = max_age.total_seconds()
+
+        # Alerts are handed over to the writer through an in-memory queue so
+        # that the monitors never wait for the journal to be written to disk
+        self._pending = queue.Queue()
+        self._wake_events = {}
+        self._deliverers = {}
+        self._register_lock = threading.Lock()
+
+        connection = self._connect()
+        connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'channel TEXT NOT NULL, severity TEXT NOT NULL, '
+                'alert_type TEXT NOT NULL, message TEXT NOT NULL, '
+                'key_fields TEXT NOT NULL DEFAULT \'[]\', '
+                'created REAL NOT NULL, attempts INTEGER NOT NULL, '
+                'next_attempt REAL NOT NULL)')
+            # Outboxes journalled before key fields were kept are upgraded
+            columns = [row[1] for row in connection.execute(
+                'PRAGMA table_info(outbox)')]
+            if 'key_fields' not in columns:
+                connection.execute(
+                    'ALTER TABLE outbox ADD COLUMN '
+                    'key_fields TEXT NOT NULL DEFAULT \'[]\'')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS outbox_channel '
+                'ON outbox (channel, id)')
+        connection.close()
+
+        threading.Thread(target=self._write_forever, daemon=True,
+                         name='alert-outbox-writer').start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections cannot be shared across threads, so each thread of the
+        # outbox uses its own connection
+        connection = sqlite3.connect(self._outbox_file, timeout=30)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def pending_alerts(self, channel: str) -> int:
+        connection = self._connect()
+        try:
+            return connection.execute(
+                'SELECT COUNT(*) FROM outbox WHERE channel = ?',
+                (channel,)).fetchone()[0]
+        finally:
+            connection.close()
+
+    def append(self, channel: str, severity: str, alert: Alert) -> None:
+        self._pending.put((channel, severity, alert, time.time()))
+
+    def register(self, channel: str, deliverer: Deliverer) -> None:
+        # Any alerts journalled for this channel before a restart are
+        # picked up by the delivery worker as soon as it starts. A channel
+        # has a single delivery worker, so registering the channel again
+        # only replaces its deliverer.
+        with self._register_lock:
+            registered = channel in self._deliverers
+            self._deliverers[channel] = deliverer
+            if registered:
+                return
+            self._wake_events[channel] = threading.Event()
+            threading.Thread(target=self._deliver_forever, args=(channel,),
+                             daemon=True,
+                             name='alert-outbox-' + channel).start()
+
+    def _next_batch(self) -> list:
+        # Block until there is at least one alert, and then wait for more
+        # alerts for up to the flush interval so that they are written at once
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_forever(self) -> None:
+        connection = self._connect()
+        while True:
+            batch = self._next_batch()
+            try:
+                with connection:
+                    connection.executemany(
+                        'INSERT INTO outbox (channel, severity, alert_type, '
+                        'message, key_fields, created, attempts, '
+                        'next_attempt) VALUES (?, ?, ?, ?, ?, ?, 0, ?)',
+                        [(c, s, type(a).__name__, a.message,
+                          json.dumps([str(f) for f in a.key_fields]),
+                          created, created)
+                         for c, s, a, created in batch])
+            except sqlite3.Error as e:
+                # Rather than losing the alerts, try delivering them directly
+                self._logger.error('Error when journalling %s alerts in the '
+                                   'outbox: %s', len(batch), e)
+                for c, s, a, _ in batch:
+                    try:
+                        self._deliverers[c](s, a)
+                    except Exception as de:
+                        self._logger.error('Error when delivering alert to '
+                                           '%s: %s', c, de)
+                continue
+
+            for channel in {c for c, _, _, _ in batch}:
+                if channel in self._wake_events:
+                    self._wake_events[channel].set()
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self._retry_max_delay,
+                   self._retry_initial_delay * 2 ** (attempts - 1))
+
+    def _deliver_forever(self, channel: str) -> None:
+        connection = self._connect()
+        wake_event = self._wake_events[channel]
+        delivery_duration = OUTBOX_DELIVERY_DURATION.labels(channel)
+
+        while True:
+            # Cleared before reading, so that no newly written alert is missed
+            wake_event.clear()
+            rows = connection.execute(
+                'SELECT id, severity, alert_type, message, key_fields, '
+                'created, attempts, next_attempt FROM outbox '
+                'WHERE channel = ? ORDER BY id LIMIT ?',
+                (channel, self._max_batch_size)).fetchall()
+
+            # Alerts are delivered in order, so a failure holds back the rest
+            wait_seconds = None if len(rows) == 0 else 0
+            for alert_id, severity, alert_type, message, key_fields, \
+                    created, attempts, next_attempt in rows:
+                now = time.time()
+                if now - created > self._max_age:
+                    self._logger.error(
+                        'Dropping %s alert for %s after %s attempts since it '
+                        'is too old to be delivered: %s', severity, channel,
+                        attempts, message)
+                elif next_attempt > now:
+                    wait_seconds = next_attempt - now
+                    break
+                else:
+                    try:
+                        self._deliverers[channel](severity, restore_alert(
+                            alert_type, message, key_fields))
+                        delivery_duration.observe(time.time() - now)
+                    except Exception as e:
+                        attempts += 1
+                        wait_seconds = self._retry_delay(attempts)
+                        self._logger.warning(
+                            'Error when delivering %s alert to %s (attempt '
+                            '%s), retrying in %s seconds: %s', severity,
+                            channel, attempts, wait_seconds, e)
+                        with connection:
+                            connection.execute(
+                                'UPDATE outbox SET attempts = ?, '
+                                'next_attempt = ? WHERE id = ?',
+                                (attempts, now + wait_seconds, alert_id))
+                        break
+
+                with connection:
+                    connection.execute('DELETE FROM outbox WHERE id = ?',
+                                       (alert_id,))
+
+            if wait_seconds != 0:
+                wake_event.wait(wait_seconds)
@@ -1,15 +1,33 @@
+import hashlib
 from datetime import datetime
 
 
 class Alert:
 
-    def __init__(self, message: str) -> None:
+    def __init__(self, message: str, *key_fields) -> None:
         self._message = message
 
+        # The key fields identify the event that the alert is about. Volatile
+        # details such as a running downtime are left out so that repeats of
+        # the same event share the same fingerprint.
+        self._key_fields = key_fields
+
     @property
     def message(self) -> str:
         return self._message
 
+    @property
+    def key_fields(self) -> tuple:
+        return self._key_fields
+
+    @property
+    def fingerprint(self) -> str:
+        # Alerts without key fields are identified by their message
+        fields = self._key_fields if len(self._key_fields) > 0 \
+            else (self._message,)
+        identity = '|'.join([type(self).__name__] + [str(f) for f in fields])
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
     def __str__(self) -> str:
         return self.message
 
@@ -18,7 +36,7 @@ class ExperiencingDelaysAlert(Alert):
 
     def __init__(self, node: str) -> None:
         super().__init__(
-            'Experiencing delays when trying to access {}.'.format(node))
+            'Experiencing delays when trying to access {}.'.format(node), node)
 
 
 class CannotAccessNodeAlert(Alert):
@@ -28,7 +46,7 @@ class CannotAccessNodeAlert(Alert):
         super().__init__(
             'I cannot access {}. Node became inaccessible at {} '
             'and has been inaccessible for (at most) {}.'.format(
-                node, went_down_at, downtime))
+                node, went_down_at, downtime), node, went_down_at)
 
 
 class StillCannotAccessNodeAlert(Alert):
@@ -38,7 +56,7 @@ class StillCannotAccessNodeAlert(Alert):
         super().__init__(
             'I still cannot access {}. Node became inaccessible at {} '
             'and has been inaccessible for (at most) {}.'.format(
-                node, went_down_at, downtime))
+                node, went_down_at, downtime), node, went_down_at)
 
 
 class NowAccessibleAlert(Alert):
@@ -48,14 +66,15 @@ class NowAccessibleAlert(Alert):
         super().__init__(
             '{} is now accessible. Node became inaccessible '
             'at {} and was inaccessible for (at most) {}.'
-            ''.format(node, went_down_at, downtime))
+            ''.format(node, went_down_at, downtime), node, went_down_at)
 
 
 class CouldNotFindLiveFullNodeAlert(Alert):
 
     def __init__(self, network_monitor: str) -> None:
         super().__init__('{} could not find a live full node to use as a '
-                         'data source.'.format(network_monitor))
+                         'data source.'.format(network_monitor),
+                         network_monitor)
 
 
 class MissedBlocksAlert(Alert):
@@ -64,7 +83,8 @@ class MissedBlocksAlert(Alert):
                  missing_validators: int) -> None:
         super().__init__(
             '{} missed {} blocks in a row (height: {}, total validators '
-            'missing: {}).'.format(node, blocks, height, missing_validators))
+            'missing: {}).'.format(node, blocks, height, missing_validators),
+            node, blocks, height)
 
 
 class TimedMissedBlocksAlert(Alert):
@@ -74,7 +94,8 @@ class TimedMissedBlocksAlert(Alert):
         super().__init__(
             '{} missed {} blocks in time interval {} (height: {}, '
             'total validators missing: {}).'.format(
-                node, blocks, time_interval, height, missing_validators))
+                node, blocks, time_interval, height, missing_validators),
+            node, height)
 
 
 class NoLongerMissingBlocksAlert(Alert):
@@ -82,7 +103,27 @@ class NoLongerMissingBlocksAlert(Alert):
     def __init__(self, node: str, consecutive_blocks: int) -> None:
         super().__init__(
             '{} is no longer missing blocks (Total missed in a row: {}).'
-            ''.format(node, consecutive_blocks))
+            ''.format(node, consecutive_blocks), node, consecutive_blocks)
+
+
+class LowUptimeAlert(Alert):
+
+    def __init__(self, node: str, uptime: float, blocks: int,
+                 danger_boundary: float) -> None:
+        super().__init__(
+            '{} signed only {:.2f}% of the last {} blocks observed, which is '
+            'below {}%.'.format(node, uptime, blocks, danger_boundary),
+            node, danger_boundary)
+
+
+class UptimeBackAboveDangerBoundaryAlert(Alert):
+
+    def __init__(self, node: str, uptime: float, blocks: int,
+                 danger_boundary: float) -> None:
+        super().__init__(
+            '{} signed {:.2f}% of the last {} blocks observed, which is back '
+            'above {}%.'.format(node, uptime, blocks, danger_boundary),
+            node, danger_boundary)
 
 
 class VotingPowerIncreasedAlert(Alert):
@@ -90,7 +131,7 @@ class VotingPowerIncreasedAlert(Alert):
     def __init__(self, node: str, old_power: int, new_power: int) -> None:
         super().__init__(
             '{} voting power INCREASED from {} to {}.'.format(
-                node, old_power, new_power))
+                node, old_power, new_power), node, old_power, new_power)
 
 
 class VotingPowerDecreasedAlert(Alert):
@@ -98,7 +139,7 @@ class VotingPowerDecreasedAlert(Alert):
     def __init__(self, node: str, old_power: int, new_power: int) -> None:
         super().__init__(
             '{} voting power DECREASED from {} to {}.'.format(
-                node, old_power, new_power))
+                node, old_power, new_power), node, old_power, new_power)
 
 
 class VotingPowerIncreasedByAlert(Alert):
@@ -107,7 +148,8 @@ class VotingPowerIncreasedByAlert(Alert):
         change = new_power - old_power
         super().__init__(
             '{} voting power INCREASED by {} from {} to {}.'.format(
-                node, change, old_power, new_power))
+                node, change, old_power, new_power),
+            node, old_power, new_power)
 
 
 class VotingPowerDecreasedByAlert(Alert):
@@ -116,7 +158,8 @@ class VotingPowerDecreasedByAlert(Alert):
         change = old_power - new_power
         super().__init__(
             '{} voting power DECREASED by {} from {} to {}.'.format(
-                node, change, old_power, new_power))
+                node, change, old_power, new_power),
+            node, old_power, new_power)
 
 
 class PeersIncreasedAlert(Alert):
@@ -124,7 +167,7 @@ class PeersIncreasedAlert(Alert):
     def __init__(self, node: str, old_peers: int, new_peers: int) -> None:
         super().__init__(
             '{} peers INCREASED from {} to {}.'.format(
-                node, old_peers, new_peers))
+                node, old_peers, new_peers), node, old_peers, new_peers)
 
 
 class PeersIncreasedOutsideDangerRangeAlert(Alert):
@@ -133,7 +176,7 @@ class PeersIncreasedOutsideDangerRangeAlert(Alert):
         super().__init__(
             '{} peers INCREASED to more than {} peers. No further peer change '
             'alerts will be sent unless the number of peers goes below {}.'
-            ''.format(node, danger, danger))
+            ''.format(node, danger, danger), node, danger)
 
 
 class PeersIncreasedOutsideSafeRangeAlert(Alert):
@@ -142,7 +185,7 @@ class PeersIncreasedOutsideSafeRangeAlert(Alert):
         super().__init__(
             '{} peers INCREASED to more than {} peers. No further peer change'
             ' alerts will be sent unless the number of peers goes below {}.'
-            ''.format(node, safe, safe))
+            ''.format(node, safe, safe), node, safe)
 
 
 class PeersDecreasedAlert(Alert):
@@ -150,26 +193,27 @@ class PeersDecreasedAlert(Alert):
     def __init__(self, node: str, old_peers: int, new_peers: int) -> None:
         super().__init__(
             '{} peers DECREASED from {} to {}.'.format(
-                node, old_peers, new_peers))
+                node, old_peers, new_peers), node, old_peers, new_peers)
 
 
 class IsCatchingUpAlert(Alert):
 
     def __init__(self, node: str) -> None:
-        super().__init__('{} is in a catching-up state.'.format(node))
+        super().__init__('{} is in a catching-up state.'.format(node), node)
 
 
 class IsNoLongerCatchingUpAlert(Alert):
 
     def __init__(self, node: str) -> None:
-        super().__init__('{} is no longer catching-up.'.format(node))
+        super().__init__('{} is no longer catching-up.'.format(node), node)
 
 
 class ProblemWhenDialingNumberAlert(Alert):
 
     def __init__(self, number: str, exception: Exception) -> None:
         super().__init__(
-            'Problem encountered when dialing {}: {}'.format(number, exception))
+            'Problem encountered when dialing {}: {}'.format(number, exception),
+            number, exception)
 
 
 class ProblemWhenCheckingIfCallsAreSnoozedAlert(Alert):
@@ -183,13 +227,14 @@ class NewGitHubReleaseAlert(Alert):
 
     def __init__(self, release_name: str, repo_name: str) -> None:
         super().__init__(
-            '{} of {} has just been released.'.format(release_name, repo_name))
+            '{} of {} has just been released.'.format(release_name, repo_name),
+            release_name, repo_name)
 
 
 class CannotAccessGitHubPageAlert(Alert):
 
     def __init__(self, page: str) -> None:
-        super().__init__('I cannot access GitHub page {}.'.format(page))
+        super().__init__('I cannot access GitHub page {}.'.format(page), page)
 
 
 class ErrorWhenReadingDataFromNode(Alert):
@@ -197,21 +242,23 @@ class ErrorWhenReadingDataFromNode(Alert):
     def __init__(self, node: str) -> None:
         super().__init__(
             'Error when reading data from {}. Alerter '
-            'will continue running normally.'.format(node))
+            'will continue running normally.'.format(node), node)
 
 
 class TerminatedDueToExceptionAlert(Alert):
 
     def __init__(self, component: str, exception: Exception) -> None:
         super().__init__(
-            '{} terminated due to exception: {}'.format(component, exception))
+            '{} terminated due to exception: {}'.format(component, exception),
+            component, type(exception).__name__, exception)
 
 
 class ProblemWithTelegramBot(Alert):
 
     def __init__(self, description: str) -> None:
         super().__init__(
-            'Problem encountered with telegram bot: {}'.format(description))
+            'Problem encountered with telegram bot: {}'.format(description),
+            description)
 
 
 class AlerterAliveAlert(Alert):
@@ -226,7 +273,8 @@ class NodeInaccessibleDuringStartup(Alert):
         super().__init__(
             'Node {} was not accessible during PANIC startup. {} will NOT be '
             'monitored until it is accessible and PANIC restarted afterwards. '
-            'Some features of PANIC might be affected.'.format(node, node))
+            'Some features of PANIC might be affected.'.format(node, node),
+            node)
 
 
 class RepoInaccessibleDuringStartup(Alert):
@@ -235,4 +283,46 @@ class RepoInaccessibleDuringStartup(Alert):
         super().__init__(
             'Repo {} was not accessible during PANIC startup. {} will NOT be '
             'monitored until it is accessible and PANIC restarted afterwards. '
-            ''.format(repo, repo))
+            ''.format(repo, repo), repo)
+
+
+class NetworkWideMissedBlocksAlert(Alert):
+
+    def __init__(self, network_monitor: str, height: int,
+                 missing_validators: int, total_validators: int,
+                 own_missing_validators: int) -> None:
+        super().__init__(
+            '{} detected a network-wide incident at height {}: {} of {} '
+            'validators missed the block ({} of ours). Individual missed '
+            'blocks alerts are paused until the incident is over.'.format(
+                network_monitor, height, missing_validators, total_validators,
+                own_missing_validators), network_monitor, height)
+
+
+class NetworkWideMissedBlocksOverAlert(Alert):
+
+    def __init__(self, network_monitor: str, start_height: int,
+                 end_height: int) -> None:
+        super().__init__(
+            'The network-wide incident detected by {} from height {} is over '
+            'at height {}. Individual missed blocks alerts are resumed.'
+            ''.format(network_monitor, start_height, end_height),
+            network_monitor, start_height)
+
+
+class NoNewBlocksAlert(Alert):
+
+    def __init__(self, network_monitor: str, height: int,
+                 duration: str) -> None:
+        super().__init__(
+            '{} has not seen a new block for (at least) {}. The chain might '
+            'be halted at height {}.'.format(network_monitor, duration, height),
+            network_monitor, height)
+
+
+class NewBlocksAgainAlert(Alert):
+
+    def __init__(self, network_monitor: str, height: int) -> None:
+        super().__init__(
+            '{} is seeing new blocks again (height: {}).'.format(
+                network_monitor, height), network_monitor, height)
@@ -1,14 +1,18 @@
 import logging
+import time
 from typing import Optional, List
 
+from src.alerting.alert_utils.deduplication import AlertDeduplicator
 from src.alerting.alerts.alerts import Alert
-from src.utils.redis_api import RedisApi
+from src.utils.metrics import ALERTS_RAISED, ALERTS_SUPPRESSED, \
+    CHANNEL_SEND_DURATION
+from src.utils.state_store import StateStore
 
 
 class Channel:
 
     def __init__(self, channel_name: str, logger: logging.Logger,
-                 redis: Optional[RedisApi]) -> None:
+                 redis: Optional[StateStore]) -> None:
         self._channel_name = channel_name
         self._logger = logger
         self._redis = redis
@@ -29,12 +33,22 @@ class Channel:
     def channel_name(self) -> str:
         return self._channel_name
 
+    @property
+    def type_name(self) -> str:
+        return type(self).__name__
+
+    @property
+    def receives_duplicates(self) -> bool:
+        # Whether duplicate alerts are sent to this channel rather than being
+        # suppressed, such as for a log of every alert raised
+        return False
+
     @property
     def logger(self) -> logging.Logger:
         return self._logger
 
     @property
-    def redis(self) -> RedisApi:
+    def redis(self) -> StateStore:
         return self._redis
 
     @property
@@ -44,64 +58,82 @@ class Channel:
 
 class ChannelSet:
 
-    def __init__(self, channels: List[Channel]) -> None:
+    def __init__(self, channels: List[Channel],
+                 deduplicator: Optional[AlertDeduplicator] = None) -> None:
         # self._channels is not set to channels to disallow adding more
         # channels to the set by appending to the channels list directly
         self._channels = []
         for c in channels:
             self.add_channel(c)
 
+        # Duplicates are dropped once here, before reaching any channel
+        self._deduplicator = deduplicator
+
     def enabled_channels_list(self) -> str:
-        return ', '.join([type(c).__name__ for c in self._channels]) \
+        return ', '.join([c.type_name for c in self._channels]) \
             if len(self._channels) > 0 else 'None'
 
     def add_channel(self, channel: Channel) -> None:
         self._channels.append(channel)
 
+    def _is_duplicate(self, alert: Alert, severity: str) -> bool:
+        return self._deduplicator is not None and \
+               self._deduplicator.is_duplicate(alert, severity)
+
+    def _channels_to_send_to(self, alert: Alert, severity: str) \
+            -> List[Channel]:
+        # Duplicates only reach the channels that receive every alert
+        if self._is_duplicate(alert, severity):
+            if len(self._channels) > 0:
+                ALERTS_SUPPRESSED.labels(type(alert).__name__,
+                                         severity).inc()
+            return [c for c in self._channels if c.receives_duplicates]
+        # Alerts to an empty set (such as muted alerts) are not counted
+        if len(self._channels) > 0:
+            ALERTS_RAISED.labels(type(alert).__name__, severity).inc()
+        return self._channels
+
+    @staticmethod
+    def _send(channel: Channel, alert: Alert, severity: str) -> None:
+        start = time.perf_counter()
+        try:
+            getattr(channel, 'alert_' + severity)(alert)
+        finally:
+            CHANNEL_SEND_DURATION.labels(channel.type_name).observe(
+                time.perf_counter() - start)
+
+    def _unsafe_alert(self, alert: Alert, severity: str) -> None:
+        for a in self._channels_to_send_to(alert, severity):
+            self._send(a, alert, severity)
+
+    def _alert(self, alert: Alert, severity: str) -> None:
+        for c in self._channels_to_send_to(alert, severity):
+            try:
+                self._send(c, alert, severity)
+            except Exception as e:
+                c.logger.error('Error in alert_%s of %s (%s): %s', severity,
+                               type(c).__name__, c.channel_name, e)
+
     def unsafe_alert_info(self, alert: Alert) -> None:
-        for a in self._channels:
-            a.alert_info(alert)
+        self._unsafe_alert(alert, 'info')
 
     def unsafe_alert_minor(self, alert: Alert) -> None:
-        for a in self._channels:
-            a.alert_minor(alert)
+        self._unsafe_alert(alert, 'minor')
 
     def unsafe_alert_major(self, alert: Alert) -> None:
-        for a in self._channels:
-            a.alert_major(alert)
+        self._unsafe_alert(alert, 'major')
 
     def unsafe_alert_error(self, alert: Alert) -> None:
-        for a in self._channels:
-            a.alert_error(alert)
+        self._unsafe_alert(alert, 'error')
 
     def alert_info(self, alert: Alert) -> None:
-        for c in self._channels:
-            try:
-                c.alert_info(alert)
-            except Exception as e:
-                c.logger.error('Error in alert_info of %s (%s): %s',
-                               type(c).__name__, c.channel_name, e)
+        self._alert(alert, 'info')
 
     def alert_minor(self, alert: Alert) -> None:
-        for c in self._channels:
-            try:
-                c.alert_minor(alert)
-            except Exception as e:
-                c.logger.error('Error in alert_minor of %s (%s): %s',
-                               type(c).__name__, c.channel_name, e)
+        self._alert(alert, 'minor')
 
     def alert_major(self, alert: Alert) -> None:
-        for c in self._channels:
-            try:
-                c.alert_major(alert)
-            except Exception as e:
-                c.logger.error('Error in alert_major of %s (%s): %s',
-                               type(c).__name__, c.channel_name, e)
+        self._alert(alert, 'major')
 
     def alert_error(self, alert: Alert) -> None:
-        for c in self._channels:
-            try:
-                c.alert_error(alert)
-            except Exception as e:
-                c.logger.error('Error in alert_error of %s (%s): %s',
-                               type(c).__name__, c.channel_name, e)
+        self._alert(alert, 'error')
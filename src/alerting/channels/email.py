@@ -1,16 +1,22 @@
 import logging
+import threading
+from collections import OrderedDict
 from typing import Optional, List
 
 from src.alerting.alert_utils.email_sending import EmailSender
 from src.alerting.alerts.alerts import Alert
 from src.alerting.channels.channel import Channel
-from src.utils.redis_api import RedisApi
+from src.utils.state_store import StateStore
+
+# The number of alerts which could not be sent to every recipient for which
+# the recipients that did get them are remembered
+_MAX_PARTLY_SENT_ALERTS = 100
 
 
 class EmailChannel(Channel):
 
     def __init__(self, channel_name: str, logger: logging.Logger,
-                 redis: Optional[RedisApi], email: EmailSender,
+                 redis: Optional[StateStore], email: EmailSender,
                  email_to: List[str]) -> None:
         super().__init__(channel_name, logger, redis)
 
@@ -18,42 +24,49 @@ class EmailChannel(Channel):
         self._email_to = email_to
         self._space = ' ' if self.channel_name != '' else ''
 
-    def alert_info(self, alert: Alert) -> None:
+        # The recipients that already got each alert which could not be sent
+        # to all of them, so that a retry only sends it to the rest
+        self._partly_sent = OrderedDict()
+        self._partly_sent_lock = threading.Lock()
+
+    def _alert(self, alert: Alert, subject: str) -> None:
+        key = (subject, alert.message)
+        with self._partly_sent_lock:
+            sent_to = self._partly_sent.pop(key, set())
+
+        errors = []
         for email in self._email_to:
+            if email in sent_to:
+                continue
             try:
-                self._email.send_email(
-                    subject='{}{}INFO Alert'.format(self.channel_name,
-                                                    self._space),
-                    message=alert.message, to=email)
+                self._email.send_email(subject=subject, message=alert.message,
+                                       to=email)
+                sent_to.add(email)
             except Exception as e:
                 self.logger.error('Error when sending to %s: %s', email, e)
+                errors.append(e)
+
+        # If any email could not be sent, the error is raised for the alert
+        # to be retried, and the recipients that got it are remembered
+        if len(errors) > 0:
+            with self._partly_sent_lock:
+                self._partly_sent[key] = sent_to
+                while len(self._partly_sent) > _MAX_PARTLY_SENT_ALERTS:
+                    self._partly_sent.popitem(last=False)
+            raise errors[-1]
+
+    def alert_info(self, alert: Alert) -> None:
+        self._alert(alert=alert, subject='{}{}INFO Alert'.format(
+            self.channel_name, self._space))
 
     def alert_minor(self, alert: Alert) -> None:
-        for email in self._email_to:
-            try:
-                self._email.send_email(
-                    subject='{}{}MINOR Alert'.format(self.channel_name,
-                                                     self._space),
-                    message=alert.message, to=email)
-            except Exception as e:
-                self.logger.error('Error when sending to %s: %s', email, e)
+        self._alert(alert=alert, subject='{}{}MINOR Alert'.format(
+            self.channel_name, self._space))
 
     def alert_major(self, alert: Alert) -> None:
-        for email in self._email_to:
-            try:
-                self._email.send_email(
-                    subject='{}{}MAJOR Alert'.format(self.channel_name,
-                                                     self._space),
-                    message=alert.message, to=email)
-            except Exception as e:
-                self.logger.error('Error when sending to %s: %s', email, e)
+        self._alert(alert=alert, subject='{}{}MAJOR Alert'.format(
+            self.channel_name, self._space))
 
     def alert_error(self, alert: Alert) -> None:
-        for email in self._email_to:
-            try:
-                self._email.send_email(
-                    subject='{}{}ERROR Alert'.format(self.channel_name,
-                                                     self._space),
-                    message=alert.message, to=email)
-            except Exception as e:
-                self.logger.error('Error when sending to %s: %s', email, e)
+        self._alert(alert=alert, subject='{}{}ERROR Alert'.format(
+            self.channel_name, self._space))
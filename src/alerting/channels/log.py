@@ -13,6 +13,11 @@ class LogChannel(Channel):
         self._alerts_logger = alerts_logger
         self._space = ' ' if self.channel_name != '' else ''
 
+    @property
+    def receives_duplicates(self) -> bool:
+        # Every alert is logged, including duplicates suppressed elsewhere
+        return True
+
     def alert_info(self, alert: Alert) -> None:
         self._alerts_logger.info('%s%sINFO - %s',
                                  self.channel_name, self._space, alert)
@@ -0,0 +1,36 @@
+from src.alerting.alert_utils.outbox import AlertOutbox
+from src.alerting.alerts.alerts import Alert
+from src.alerting.channels.channel import Channel
+
+
+class OutboxChannel(Channel):
+
+    def __init__(self, channel: Channel, outbox: AlertOutbox,
+                 outbox_key: str) -> None:
+        super().__init__(channel.channel_name, channel.logger, channel.redis)
+
+        # Alerts are journalled in the outbox and delivered to the wrapped
+        # channel by the outbox's delivery worker for this channel
+        self._channel = channel
+        self._outbox = outbox
+        self._outbox_key = outbox_key
+        self._outbox.register(outbox_key, self._deliver)
+
+    @property
+    def type_name(self) -> str:
+        return '{} (outbox)'.format(self._channel.type_name)
+
+    def _deliver(self, severity: str, alert: Alert) -> None:
+        getattr(self._channel, 'alert_' + severity)(alert)
+
+    def alert_info(self, alert: Alert) -> None:
+        self._outbox.append(self._outbox_key, 'info', alert)
+
+    def alert_minor(self, alert: Alert) -> None:
+        self._outbox.append(self._outbox_key, 'minor', alert)
+
+    def alert_major(self, alert: Alert) -> None:
+        self._outbox.append(self._outbox_key, 'major', alert)
+
+    def alert_error(self, alert: Alert) -> None:
+        self._outbox.append(self._outbox_key, 'error', alert)
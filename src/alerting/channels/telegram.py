@@ -4,13 +4,13 @@ from typing import Optional
 from src.alerting.alert_utils.telegram_bot_api import TelegramBotApi
 from src.alerting.alerts.alerts import Alert, ProblemWithTelegramBot
 from src.alerting.channels.channel import Channel, ChannelSet
-from src.utils.redis_api import RedisApi
+from src.utils.state_store import StateStore
 
 
 class TelegramChannel(Channel):
 
     def __init__(self, channel_name: str, logger: logging.Logger,
-                 redis: Optional[RedisApi], telegram_bot: TelegramBotApi,
+                 redis: Optional[StateStore], telegram_bot: TelegramBotApi,
                  backup_channels: ChannelSet) -> None:
         super().__init__(channel_name, logger, redis)
 
@@ -1,20 +1,27 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Optional, List
 
 from src.alerting.alert_utils.twilio_api import TwilioApi
 from src.alerting.alerts.alerts import Alert, \
     ProblemWhenCheckingIfCallsAreSnoozedAlert, ProblemWhenDialingNumberAlert
 from src.alerting.channels.channel import Channel, ChannelSet
-from src.utils.redis_api import RedisApi
+from src.utils.clock import Clock, SYSTEM_CLOCK
+from src.utils.state_store import StateStore
+from src.utils.timing import TimedTaskLimiter
 
 
 class TwilioChannel(Channel):
 
     def __init__(self, channel_name: str, logger: logging.Logger,
-                 redis: Optional[RedisApi], twilio: TwilioApi,
+                 redis: Optional[StateStore], twilio: TwilioApi,
                  call_from: str, call_to: List[str], twiml: str,
                  twiml_is_url: bool, snooze_key: str,
-                 backup_channels: ChannelSet) -> None:
+                 backup_channels: ChannelSet,
+                 call_coalescing_window: timedelta = timedelta(),
+                 clock: Clock = SYSTEM_CLOCK) -> None:
         super().__init__(channel_name, logger, redis)
 
         self._twilio = twilio
@@ -25,6 +32,18 @@ class TwilioChannel(Channel):
         self._snooze_key = snooze_key
         self._backup_channels = backup_channels
 
+        # Major alerts within the coalescing window of the last call round
+        # are covered by that call round, so they do not trigger another one
+        self._call_round_limiter = TimedTaskLimiter(call_coalescing_window,
+                                                    clock)
+        self._call_round_lock = threading.Lock()
+        self._coalesced_alerts = 0
+
+        # Numbers which could not be dialed in their last call round, whose
+        # errors were already sent to the backup channels
+        self._failing_numbers = set()
+        self._failing_numbers_lock = threading.Lock()
+
     def _calls_snoozed(self, logger: logging.Logger) \
             -> bool:
         if self.redis_enabled:
@@ -37,24 +56,69 @@ class TwilioChannel(Channel):
                 logger.info('Twilio did not find a snooze in Redis.')
                 return False
 
-    def alert_major(self, alert: Alert) -> None:
-        # Check if snoozed
+    @property
+    def coalesced_alerts(self) -> int:
+        return self._coalesced_alerts
+
+    def _dial(self, number: str) -> Optional[Exception]:
+        self.logger.info("Twilio now dialing " + number)
         try:
-            snoozed = self._calls_snoozed(self.logger)
+            self._twilio.dial_number(self._call_from, number,
+                                     self._twiml, self._twiml_is_url)
         except Exception as e:
-            self._backup_channels.alert_error(
-                ProblemWhenCheckingIfCallsAreSnoozedAlert())
-            self.logger.error(
-                'Error when checking if Twilio calls are snoozed: %s.', e)
-            snoozed = False
-
-        # Dial the numbers if not snoozed
-        if not snoozed:
-            for number in self._call_to:
-                self.logger.info("Twilio now dialing " + number)
-                try:
-                    self._twilio.dial_number(self._call_from, number,
-                                             self._twiml, self._twiml_is_url)
-                except Exception as e:
-                    self._backup_channels.alert_error(
-                        ProblemWhenDialingNumberAlert(number, e))
+            # A number that keeps failing (e.g. while the call round is
+            # retried) is only reported the first time that it fails
+            with self._failing_numbers_lock:
+                already_failing = number in self._failing_numbers
+                self._failing_numbers.add(number)
+            if not already_failing:
+                self._backup_channels.alert_error(
+                    ProblemWhenDialingNumberAlert(number, e))
+            return e
+
+        with self._failing_numbers_lock:
+            self._failing_numbers.discard(number)
+        return None
+
+    def alert_major(self, alert: Alert) -> None:
+        with self._call_round_lock:
+            # Skip if a call round was made recently enough
+            if not self._call_round_limiter.can_do_task():
+                self._coalesced_alerts += 1
+                self.logger.info(
+                    'Twilio call round skipped since one was made less than '
+                    '%s ago (%s alerts coalesced so far).',
+                    self._call_round_limiter.time_interval,
+                    self._coalesced_alerts)
+                return
+
+            # Check if snoozed
+            try:
+                snoozed = self._calls_snoozed(self.logger)
+            except Exception as e:
+                self._backup_channels.alert_error(
+                    ProblemWhenCheckingIfCallsAreSnoozedAlert())
+                self.logger.error(
+                    'Error when checking if Twilio calls are snoozed: %s.', e)
+                snoozed = False
+
+            # Start a call round if not snoozed
+            if snoozed:
+                return
+            self._call_round_limiter.did_task()
+
+        # All numbers are dialed at the same time rather than one by one,
+        # and the dialing threads are done with once all have been dialed
+        with ThreadPoolExecutor(max_workers=max(1, len(self._call_to))) \
+                as dialer:
+            errors = [e for e in dialer.map(self._dial, self._call_to)
+                      if e is not None]
+
+        # If no number could be dialed, Twilio is most likely not reachable,
+        # so the error is raised for the call round to be retried, and the
+        # retry (or the next major alert) is not coalesced with this round
+        if len(errors) > 0 and len(errors) == len(self._call_to):
+            self._call_round_limiter.reset()
+            self.logger.error('Twilio could not dial any of the %s numbers.',
+                              len(errors))
+            raise errors[-1]
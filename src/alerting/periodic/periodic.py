@@ -1,25 +1,27 @@
 from datetime import timedelta
-from time import sleep
 from typing import Optional
 
 from src.alerting.alerts.alerts import AlerterAliveAlert
 from src.alerting.channels.channel import ChannelSet
-from src.utils.redis_api import RedisApi
+from src.utils.clock import Clock, SYSTEM_CLOCK
+from src.utils.state_store import StateStore
 
 
 class PeriodicAliveReminder:
 
     def __init__(self, interval: timedelta, channel_set: ChannelSet,
-                 mute_key: str, redis: Optional[RedisApi]):
+                 mute_key: str, redis: Optional[StateStore],
+                 clock: Clock = SYSTEM_CLOCK):
         self._interval = interval
         self._channel_set = channel_set
         self._mute_key = mute_key
         self._redis = redis
         self._redis_enabled = redis is not None
+        self._clock = clock
 
     def start(self):
         while True:
-            sleep(self._interval.total_seconds())
+            self._clock.sleep(self._interval.total_seconds())
             self.send_alive_alert()
 
     def send_alive_alert(self) -> None:
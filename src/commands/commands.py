@@ -5,12 +5,12 @@ from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
 from src.utils.config_parsers.user import UserConfig
 from src.utils.config_parsers.user_parsed import UserConf
-from src.utils.redis_api import RedisApi
+from src.utils.state_store import StateStore
 
 
 class Commands:
 
-    def __init__(self, logger: logging.Logger, redis: Optional[RedisApi],
+    def __init__(self, logger: logging.Logger, redis: Optional[StateStore],
                  redis_snooze_key: Optional[str], redis_mute_key: Optional[str],
                  redis_node_monitor_alive_key_prefix: Optional[str],
                  redis_network_monitor_alive_key_prefix: Optional[str],
@@ -1,31 +1,36 @@
 import logging
 from datetime import timedelta, datetime
-from typing import Optional
+from typing import Callable, Optional
 
-from redis import RedisError
 from telegram import Update
 from telegram.ext import CommandHandler, MessageHandler, Filters, \
     CallbackContext
 
 from src.commands.commands import Commands
 from src.commands.handler_utils.telegram_handler import TelegramCommandHandler
+from src.node.signing_window import REDIS_SIGNED_KEY_SUFFIX, \
+    REDIS_OBSERVED_KEY_SUFFIX
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
 from src.utils.config_parsers.user import UserConfig
 from src.utils.config_parsers.user_parsed import UserConf
-from src.utils.redis_api import RedisApi
+from src.utils.profiling import Profiler
+from src.utils.state_encoding import decode_monitor_state
+from src.utils.state_store import StateStore
 
 
 class TelegramCommands(Commands):
 
     def __init__(self, bot_token: str, authorised_chat_id: str,
-                 logger: logging.Logger, redis: Optional[RedisApi],
+                 logger: logging.Logger, redis: Optional[StateStore],
                  redis_snooze_key: Optional[str], redis_mute_key: Optional[str],
                  redis_node_monitor_alive_key_prefix: Optional[str],
                  redis_network_monitor_alive_key_prefix: Optional[str],
                  redis_network_monitor_last_height_key_prefix: Optional[str],
                  internal_conf: InternalConfig = InternalConf,
-                 user_conf: UserConfig = UserConf) -> None:
+                 user_conf: UserConfig = UserConf,
+                 reload_callback: Optional[Callable[[], None]] = None,
+                 profiler: Optional[Profiler] = None) -> None:
 
         super().__init__(logger, redis, redis_snooze_key, redis_mute_key,
                          redis_node_monitor_alive_key_prefix,
@@ -39,6 +44,14 @@ class TelegramCommands(Commands):
         self._default_mute_hours = \
             internal_conf.redis_periodic_alive_reminder_mute_key_default_hours
 
+        # Reloads the node and repo configuration, if possible
+        self._reload_callback = reload_callback
+
+        # Captures a profile of the alerter, if possible
+        self._profiler = profiler
+        self._default_profile_seconds = \
+            internal_conf.profiling_default_duration
+
         # Set up command handlers (command and respective callback function)
         command_handlers = [
             CommandHandler('start', self._start_callback),
@@ -47,9 +60,12 @@ class TelegramCommands(Commands):
             CommandHandler('unmute', self._unmute_callback),
             CommandHandler('unsnooze', self._unsnooze_callback),
             CommandHandler('status', self._status_callback),
+            CommandHandler('uptime', self._uptime_callback),
             CommandHandler('validators', self._validators_callback),
             CommandHandler('block', self._block_callback),
             CommandHandler('tx', self._tx_callback),
+            CommandHandler('reload', self._reload_callback_handler),
+            CommandHandler('profile', self._profile_callback),
             CommandHandler('help', self._help_callback),
             MessageHandler(Filters.command, self._unknown_callback)
         ]
@@ -66,7 +82,7 @@ class TelegramCommands(Commands):
         try:
             self._redis.ping_unsafe()
             return True
-        except (RedisError, ConnectionResetError):
+        except self._redis.errors:
             pass
         except Exception as e:
             self._logger.error('Unrecognized error when accessing Redis: %s', e)
@@ -301,45 +317,90 @@ class TelegramCommands(Commands):
         node_monitor_names = [
             k.replace(self._redis_node_monitor_alive_key_prefix, '')
             for k in node_monitor_keys_list]
-        for key, name in zip(node_monitor_keys_list, node_monitor_names):
-            last_upd = self._redis.get(key).decode('utf-8')
-            last_upd = last_upd.split('.')[0]  # remove seconds
-            status += '- Last update from *{}*: `{}`.\n'.format(name, last_upd)
+        node_monitor_states = self._redis.get_multiple(
+            node_monitor_keys_list) or []
+        for name, encoded in zip(node_monitor_names, node_monitor_states):
+            state = decode_monitor_state(encoded)
+            if state is not None:
+                status += '- Last update from *{}*: `{}`.\n'.format(
+                    name, state.alive_at.replace(microsecond=0))
 
         # Add note if no latest node monitor updates
         if len(node_monitor_keys_list) == 0:
             status += '- No recent update from node monitors.\n'
 
-        # Add network monitor latest update
-        net_monitor_keys_list1 = self._redis.get_keys(
+        # Add network monitor latest update and last height checked
+        net_monitor_keys_list = self._redis.get_keys(
             self._redis_network_monitor_alive_key_prefix + '*')
-        net_monitor_names1 = [k.replace(
+        net_monitor_names = [k.replace(
             self._redis_network_monitor_alive_key_prefix, '')
-            for k in net_monitor_keys_list1]
-        for key, name in zip(net_monitor_keys_list1, net_monitor_names1):
-            last_upd = self._redis.get(key).decode('utf-8')
-            last_upd = last_upd.split('.')[0]  # remove seconds
-            status += '- Last update from *{}*: `{}`.\n'.format(name, last_upd)
-
-        # Add network monitor last height checked
-        net_monitor_keys_list2 = self._redis.get_keys(
-            self._redis_network_monitor_last_height_key_prefix + '*')
-        net_monitor_names2 = [k.replace(
-            self._redis_network_monitor_last_height_key_prefix, '')
-            for k in net_monitor_keys_list2]
-        for key, name in zip(net_monitor_keys_list2, net_monitor_names2):
-            last_height = self._redis.get(key).decode('utf-8')
-            status += '- *{}* is currently in block height {}.\n' \
-                      ''.format(name, last_height)
+            for k in net_monitor_keys_list]
+        net_monitor_states = self._redis.get_multiple(
+            net_monitor_keys_list) or []
+        net_monitor_heights = self._redis.get_multiple(
+            [self._redis_network_monitor_last_height_key_prefix + name
+             for name in net_monitor_names]) or []
+        for name, encoded, height in zip(
+                net_monitor_names, net_monitor_states, net_monitor_heights):
+            state = decode_monitor_state(encoded)
+            if state is None:
+                continue
+            status += '- Last update from *{}*: `{}`.\n'.format(
+                name, state.alive_at.replace(microsecond=0))
+            if height is not None:
+                status += '- *{}* is currently in block height {}.\n' \
+                          ''.format(name, height.decode('utf-8'))
 
         # Add note if no latest network monitor updates
-        if len(net_monitor_keys_list1) == len(net_monitor_keys_list2) == 0:
+        if len(net_monitor_keys_list) == 0:
             status += '- No recent update from network monitors.\n'
 
         # Send status
         TelegramCommands.formatted_reply(
             update, status[:-1] if status.endswith('\n') else status)
 
+    def _uptime_callback(self, update: Update, context: CallbackContext):
+        self._logger.info('/uptime: update=%s, context=%s', update, context)
+
+        # Check that authorised
+        if not self.cmd_handler.authorise(update, context):
+            return
+
+        # Cannot get uptime data if Redis is not enabled
+        if not self._redis_enabled:
+            update.message.reply_text('Uptime not available given that Redis '
+                                      'is not set up.')
+            return
+
+        # If redis is not running no use trying to get uptime
+        if not self.redis_running():
+            update.message.reply_text(
+                'Redis is NOT accessible! This means that the uptime of the '
+                'validators is not accessible.')
+            return
+
+        # Count the signed and observed blocks in each validator's signing
+        # window, without needing to transfer the windows themselves
+        uptime = ""
+        signed_keys_list = self._redis.get_keys('*' + REDIS_SIGNED_KEY_SUFFIX)
+        for key in sorted(signed_keys_list):
+            name = key[:-len(REDIS_SIGNED_KEY_SUFFIX)]
+            signed = self._redis.bitcount(key)
+            observed = self._redis.bitcount(name + REDIS_OBSERVED_KEY_SUFFIX)
+            if signed is None or not observed:
+                continue
+            uptime += '- *{}* signed {:.2f}% of the last {} blocks ' \
+                      'observed.\n'.format(name, 100 * signed / observed,
+                                           observed)
+
+        # Add note if no signing windows
+        if uptime == "":
+            uptime = '- No signing window was recorded yet.'
+
+        # Send uptime
+        TelegramCommands.formatted_reply(
+            update, uptime[:-1] if uptime.endswith('\n') else uptime)
+
     def _validators_callback(self, update: Update, context: CallbackContext):
         self._logger.info('/validators: update=%s, context=%s', update, context)
 
@@ -416,6 +477,62 @@ class TelegramCommands(Commands):
                 self._internal_conf.tx_big_dipper_link_prefix + str(tx_hash),
                 self._internal_conf.tx_mintscan_link_prefix + str(tx_hash)))
 
+    def _reload_callback_handler(self, update: Update,
+                                 context: CallbackContext):
+        self._logger.info('/reload: update=%s, context=%s', update, context)
+
+        # Check that authorised
+        if not self.cmd_handler.authorise(update, context):
+            return
+
+        # Reloading is only possible from within the alerter
+        if self._reload_callback is None:
+            update.message.reply_text('Reloading is not available.')
+            return
+
+        self._reload_callback()
+        update.message.reply_text(
+            'Reloading the node and repo configuration. Monitors of nodes '
+            'and repos that did not change will keep on running.')
+
+    def _profile_callback(self, update: Update, context: CallbackContext):
+        self._logger.info('/profile: update=%s, context=%s', update, context)
+
+        # Check that authorised
+        if not self.cmd_handler.authorise(update, context):
+            return
+
+        # Profiling is only possible from within the alerter
+        if self._profiler is None:
+            update.message.reply_text('Profiling is not available.')
+            return
+
+        # Expected: /profile or /profile <seconds>
+        message_parts = update.message.text.split(' ')
+        if len(message_parts) not in [1, 2]:
+            update.message.reply_text('I expected one or no values.')
+            return
+
+        # Get number of seconds, up to the maximum
+        if len(message_parts) == 1:
+            seconds = self._default_profile_seconds
+        else:  # len(message_parts) == 2
+            try:
+                seconds = float(message_parts[1])
+            except ValueError:
+                seconds = 0
+            if seconds <= 0:
+                update.message.reply_text('Invalid no. of seconds.')
+                return
+        seconds = min(seconds, self._profiler.max_duration)
+
+        if not self._profiler.start(seconds):
+            update.message.reply_text('A profile is already being captured.')
+            return
+        update.message.reply_text(
+            'Profiling for {} seconds. The profile will be written to '
+            '{}.'.format(seconds, self._internal_conf.profiling_directory))
+
     def _help_callback(self, update: Update, context: CallbackContext):
         self._logger.info('/help: update=%s, context=%s', update, context)
 
@@ -433,9 +550,12 @@ class TelegramCommands(Commands):
             '  /mute <hours>: mute periodic alive reminder for <hours>\n'
             '  /unmute: unmute periodic alive reminder\n'
             '  /status: shows status message\n'
+            '  /uptime: shows uptime of validators over the signing window\n'
             '  /validators: shows links to validators\n'
             '  /block <height>: shows link to specified block\n'
             '  /tx <tx-hash>: shows link to specified transaction\n'
+            '  /reload: reloads the node and repo configuration\n'
+            '  /profile <seconds>: captures a profile of the alerter\n'
             '  /help: shows this message')
 
     def _unknown_callback(self, update: Update,
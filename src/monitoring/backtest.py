@@ -0,0 +1,216 @@
+import collections
+import gzip
+import heapq
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Counter, Dict, Iterator, List, NamedTuple, Optional, \
+    Tuple, Union
+
+from src.alerting.alerts.alerts import Alert
+from src.alerting.channels.channel import Channel, ChannelSet
+from src.monitoring.monitor_utils.block_cache import BlockSummary, \
+    summarise_block
+from src.monitoring.monitors.network import NetworkMonitor
+from src.node.node import Node, NodeType
+from src.utils.clock import VirtualClock
+from src.utils.config_parsers.internal import InternalConfig
+
+BACKTEST_NETWORK = 'backtest'
+
+
+class NodeSnapshot(NamedTuple):
+    at: float  # Seconds since the start of the recording
+    rpc_url: str
+    is_up: bool
+    address: Optional[str] = None
+    voting_power: Optional[int] = None
+    catching_up: Optional[bool] = None
+    no_of_peers: Optional[int] = None
+
+
+class BacktestData(NamedTuple):
+    blocks: List[BlockSummary]
+    snapshots: List[NodeSnapshot]
+
+
+class BacktestResult(NamedTuple):
+    name: str
+    alerts: List[Tuple[str, Alert]]
+    blocks: int
+    snapshots: int
+    duration: float
+
+    def counts(self) -> Counter[Tuple[str, str]]:
+        # The number of alerts by alert type and severity
+        return collections.Counter(
+            (type(a).__name__, s) for s, a in self.alerts)
+
+
+class BacktestChannel(Channel):
+    # Keeps the alerts, with their severity, in the order that they were sent
+
+    def __init__(self, logger: logging.Logger) -> None:
+        super().__init__('backtest_channel', logger, redis=None)
+        self.alerts = []
+
+    def alert_info(self, alert: Alert) -> None:
+        self.alerts.append(('info', alert))
+
+    def alert_minor(self, alert: Alert) -> None:
+        self.alerts.append(('minor', alert))
+
+    def alert_major(self, alert: Alert) -> None:
+        self.alerts.append(('major', alert))
+
+    def alert_error(self, alert: Alert) -> None:
+        self.alerts.append(('error', alert))
+
+
+class BacktestNetworkMonitor(NetworkMonitor):
+    # Checks the block summaries that it is given rather than ones that it
+    # gets from a full node, so that no requests are ever made
+
+    def __init__(self, monitor_name: str, channels: ChannelSet,
+                 logger: logging.Logger, all_validators: List[Node],
+                 internal_conf: InternalConfig, clock: VirtualClock) -> None:
+        super().__init__(monitor_name, channels, logger, 0, None, [],
+                         all_validators, internal_conf, clock=clock)
+
+        # There is no full node to get the validator set from, so validator
+        # discovery is always off and only the given validators are checked
+        self._validator_set = None
+
+    def check_summary(self, summary: BlockSummary) -> None:
+        self._evaluate_block(summary)
+
+
+def _result(record: Dict) -> Optional[Dict]:
+    # The result of a recorded JSON-RPC response, if it succeeded
+    if 'x' in record or record.get('s') != 200:
+        return None
+    try:
+        return json.loads(record['b']).get('result')
+    except (ValueError, AttributeError):
+        return None
+
+
+def read_capture(capture_file: str) -> BacktestData:
+    # Extracts the blocks and node snapshots from an RPC capture (as recorded
+    # with rpc_capture_mode = record). A snapshot is taken for every /status
+    # followed by a /net_info of the same node, and a node is taken to be
+    # down whenever its /health or /status request failed.
+    blocks = {}
+    snapshots = []
+    statuses = {}
+
+    with gzip.open(capture_file, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                record = json.loads(line)
+                endpoint, _, query = record['u'].partition('?')
+                rpc_url, _, path = endpoint.rpartition('/')
+                result = _result(record)
+
+                if path in ['health', 'status'] and 'x' in record:
+                    snapshots.append(NodeSnapshot(record['t'], rpc_url, False))
+                elif path == 'status' and result is not None:
+                    statuses[rpc_url] = result
+                elif path == 'net_info' and result is not None \
+                        and rpc_url in statuses:
+                    status = statuses.pop(rpc_url)
+                    snapshots.append(NodeSnapshot(
+                        record['t'], rpc_url, True,
+                        status['validator_info']['address'],
+                        int(status['validator_info']['voting_power']),
+                        status['sync_info']['catching_up'],
+                        int(result['n_peers'])))
+                elif path == 'block' and result is not None \
+                        and query.startswith('height='):
+                    height = int(query[len('height='):])
+                    blocks[height] = summarise_block(height, result)
+        except (EOFError, ValueError):
+            pass  # The recording was cut short
+
+    return BacktestData([blocks[h] for h in sorted(blocks)], snapshots)
+
+
+def _apply_snapshot(node: Node, snapshot: NodeSnapshot, channels: ChannelSet,
+                    logger: logging.Logger) -> None:
+    # Same as what the node monitor does with the data that it gets
+    if not snapshot.is_up:
+        node.set_as_down(channels, logger)
+        return
+    node.set_as_up(channels, logger)
+    node.set_voting_power(snapshot.voting_power, channels, logger)
+    node.set_catching_up(snapshot.catching_up, channels, logger)
+    node.set_no_of_peers(snapshot.no_of_peers, channels, logger)
+
+
+def _create_nodes(validators: List[str], snapshots: List[NodeSnapshot],
+                  internal_conf: InternalConfig, clock: VirtualClock) \
+        -> Tuple[Dict[str, Node], List[Node]]:
+    # A node is created for every node with snapshots (which is a validator if
+    # it ever had voting power) and for every other validator. The nodes by
+    # RPC URL, and the validator nodes, are returned.
+    addresses = {}
+    for s in snapshots:
+        if s.is_up and s.voting_power > 0:
+            addresses[s.rpc_url] = s.address
+        else:
+            addresses.setdefault(s.rpc_url, None)
+
+    nodes = {url: Node(url, url, NodeType.VALIDATOR_FULL_NODE
+                       if address is not None
+                       else NodeType.NON_VALIDATOR_FULL_NODE,
+                       address, BACKTEST_NETWORK, None, internal_conf, clock)
+             for url, address in addresses.items()}
+    validator_nodes = {n.pubkey: n for n in nodes.values() if n.is_validator}
+    for address in validators:
+        if address not in validator_nodes:
+            validator_nodes[address] = Node(
+                address, None, NodeType.VALIDATOR_FULL_NODE, address,
+                BACKTEST_NETWORK, None, internal_conf, clock)
+    return nodes, [validator_nodes[a] for a in validators]
+
+
+def _events(data: BacktestData, start: datetime) \
+        -> Iterator[Tuple[datetime, Union[NodeSnapshot, BlockSummary]]]:
+    # The node snapshots (taken the given time after the start of the
+    # recording) and blocks, in the order in which they happened
+    snapshots = ((start + timedelta(seconds=s.at), s)
+                 for s in data.snapshots)
+    blocks = ((b.time, b) for b in data.blocks)
+    return heapq.merge(snapshots, blocks, key=lambda e: e[0])
+
+
+def run_backtest(name: str, internal_conf: InternalConfig, data: BacktestData,
+                 validators: List[str], logger: logging.Logger) \
+        -> BacktestResult:
+    # Runs the node snapshots and blocks through the alerting logic, using
+    # the thresholds in the internal config. Time is kept by a virtual clock
+    # that follows the snapshots and block times, so nothing ever waits. The
+    # recording is taken to have started at the time of the first block.
+    start = data.blocks[0].time if len(data.blocks) > 0 \
+        else datetime(2020, 1, 1)
+    clock = VirtualClock(start)
+    channel = BacktestChannel(logger)
+    channels = ChannelSet([channel])
+    nodes, validator_nodes = _create_nodes(validators, data.snapshots,
+                                           internal_conf, clock)
+    network_monitor = BacktestNetworkMonitor(
+        'Network monitor (backtest {})'.format(name), channels, logger,
+        validator_nodes, internal_conf, clock)
+
+    started = time.perf_counter()
+    for at_time, event in _events(data, start):
+        clock.advance_to(at_time)
+        if isinstance(event, NodeSnapshot):
+            _apply_snapshot(nodes[event.rpc_url], event, channels, logger)
+        else:
+            network_monitor.check_summary(event)
+    duration = time.perf_counter() - started
+
+    return BacktestResult(name, channel.alerts, len(data.blocks),
+                          len(data.snapshots), duration)
@@ -0,0 +1,238 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, NamedTuple, Optional, Set, Tuple
+
+from src.utils.datetime import parse_rfc3339
+
+_MAGIC = b'PANICBC2'
+_HEADER = struct.Struct('<8sIII')
+_HEADER_SIZE = 64
+
+# Height, block time (as whole microseconds since the epoch, which is the
+# precision of a parsed block time), total and missing validators, proposer
+# and validators hash, followed by the signers bitmap
+_RECORD = struct.Struct('<qqII20s32s')
+_EPOCH = datetime(1970, 1, 1)
+
+
+class BlockSummary(NamedTuple):
+    height: int
+    time: datetime
+    proposer: str
+    signers: Set[str]
+    total: int
+    missing: int
+    validators_hash: str = ''
+
+
+def summarise_block(height: int, block: Dict) -> BlockSummary:
+    # Summarises a /block response. The signers are the validators
+    # participating in the precommits of the last commit.
+    last_commit = block['block']['last_commit']
+    if 'precommits' in last_commit:
+        block_precommits = last_commit['precommits']  # tendermint <v0.33
+        non_null_precommits = \
+            filter(lambda p: p, block_precommits)
+    else:
+        block_precommits = last_commit['signatures']  # tendermint v0.33+
+        non_null_precommits = \
+            filter(lambda p: p['signature'], block_precommits)
+    block_precommits_validators = set(
+        map(lambda p: p['validator_address'], non_null_precommits))
+    total_no_of_missing_validators = \
+        len(block_precommits) - len(block_precommits_validators)
+
+    header = block['block']['header']
+    return BlockSummary(
+        height, parse_rfc3339(header['time']),
+        header.get('proposer_address', ''), block_precommits_validators,
+        len(block_precommits), total_no_of_missing_validators,
+        header.get('validators_hash', ''))
+
+
+class BlockCache:
+    # A fixed-size, memory-mapped ring of block summaries, in which the
+    # summary of a height is stored in slot (height % capacity). This gives
+    # O(1) lookups and bounded retention: a height is overwritten by the
+    # height that is `capacity` blocks after it. Signers are stored as a
+    # bitmap over an append-only table of validator addresses, kept in a
+    # separate file next to the cache. The cache can be shared by threads.
+
+    def __init__(self, cache_file: str, capacity: int, max_validators: int,
+                 logger: logging.Logger) -> None:
+        self._cache_file = cache_file
+        self._capacity = capacity
+        self._max_validators = max_validators
+        self._logger = logger
+
+        self._bitmap_size = (max_validators + 7) // 8
+        self._record_size = _RECORD.size + self._bitmap_size
+
+        self._lock = threading.Lock()
+
+        self._addresses_file = cache_file + '.validators'
+        self._addresses = []
+        self._address_indices = {}
+        self._load_addresses()
+
+        self._file = open(cache_file,
+                          'r+b' if os.path.isfile(cache_file) else 'w+b')
+        self._map = self._open_map()
+
+        # Kept up to date as blocks are put, so that the ring is only
+        # scanned for it once, when the cache is opened
+        heights = [struct.unpack_from('<q', self._map, self._offset(i))[0]
+                   for i in range(self._capacity)]
+        self._latest_height = max(heights) if any(h > 0 for h in heights) \
+            else None
+
+    def _load_addresses(self) -> None:
+        if not os.path.isfile(self._addresses_file):
+            return
+        with open(self._addresses_file) as f:
+            for address in f.read().split():
+                self._address_indices[address] = len(self._addresses)
+                self._addresses.append(address)
+
+    def _open_map(self) -> mmap.mmap:
+        size = _HEADER_SIZE + self._capacity * self._record_size
+        header = _HEADER.pack(_MAGIC, self._capacity, self._max_validators,
+                              self._record_size)
+
+        # A cache with a different layout cannot be reused, so it is cleared
+        self._file.seek(0)
+        if self._file.read(_HEADER.size) != header:
+            self._logger.info('Creating block cache %s.', self._cache_file)
+            self._file.truncate(0)
+            self._file.truncate(size)
+            self._file.seek(0)
+            self._file.write(header)
+            self._file.flush()
+            if len(self._addresses) > 0:
+                os.remove(self._addresses_file)
+                self._addresses = []
+                self._address_indices = {}
+        elif os.path.getsize(self._cache_file) != size:
+            self._file.truncate(size)
+
+        return mmap.mmap(self._file.fileno(), size)
+
+    @staticmethod
+    def layout(cache_file: str) -> Optional[Tuple[int, int]]:
+        # The capacity and maximum number of validators of an existing cache
+        # file, so that it can be opened without being cleared
+        if not os.path.isfile(cache_file):
+            return None
+        with open(cache_file, 'rb') as f:
+            header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return None
+        magic, capacity, max_validators, _ = _HEADER.unpack(header)
+        return (capacity, max_validators) if magic == _MAGIC else None
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def _offset(self, height: int) -> int:
+        return _HEADER_SIZE + (height % self._capacity) * self._record_size
+
+    def _address_index(self, address: str) -> Optional[int]:
+        index = self._address_indices.get(address)
+        if index is not None or len(self._addresses) >= self._max_validators:
+            return index
+
+        # New addresses are appended to the table, so indices never change
+        with open(self._addresses_file, 'a') as f:
+            f.write(address + '\n')
+        index = len(self._addresses)
+        self._address_indices[address] = index
+        self._addresses.append(address)
+        return index
+
+    def put(self, summary: BlockSummary) -> bool:
+        # Blocks whose signers cannot all be represented are not cached,
+        # since they would otherwise look like they were missed by some
+        with self._lock:
+            indices = [self._address_index(a) for a in summary.signers]
+            if None in indices:
+                self._logger.warning(
+                    'Not caching block %s since the block cache is limited '
+                    'to %s validators.', summary.height,
+                    self._max_validators)
+                return False
+
+            bitmap = bytearray(self._bitmap_size)
+            for index in indices:
+                bitmap[index >> 3] |= 0x80 >> (index & 7)
+
+            try:
+                proposer = bytes.fromhex(summary.proposer)
+            except ValueError:
+                proposer = b''
+            try:
+                validators_hash = bytes.fromhex(summary.validators_hash)
+            except ValueError:
+                validators_hash = b''
+
+            # The height is written last, so that the record only becomes
+            # valid once everything else was written
+            microseconds = (summary.time - _EPOCH) // timedelta(
+                microseconds=1)
+            offset = self._offset(summary.height)
+            self._map[offset:offset + self._record_size] = \
+                _RECORD.pack(0, microseconds, summary.total, summary.missing,
+                             proposer, validators_hash) + bitmap
+            self._map[offset:offset + 8] = struct.pack('<q', summary.height)
+
+            if self._latest_height is None or \
+                    summary.height > self._latest_height:
+                self._latest_height = summary.height
+            return True
+
+    def get(self, height: int) -> Optional[BlockSummary]:
+        with self._lock:
+            offset = self._offset(height)
+            stored_height, microseconds, total, missing, proposer, \
+                validators_hash = _RECORD.unpack_from(self._map, offset)
+            if stored_height != height or height == 0:
+                return None
+
+            bitmap = self._map[offset + _RECORD.size:
+                               offset + self._record_size]
+            signers = {self._addresses[i]
+                       for i in range(len(self._addresses))
+                       if bitmap[i >> 3] & (0x80 >> (i & 7))}
+            proposer = '' if proposer == bytes(len(proposer)) \
+                else proposer.hex().upper()
+            validators_hash = '' if validators_hash == bytes(32) \
+                else validators_hash.hex().upper()
+            time = _EPOCH + timedelta(microseconds=microseconds)
+            return BlockSummary(height, time, proposer, signers, total,
+                                missing, validators_hash)
+
+    @property
+    def latest_height(self) -> Optional[int]:
+        # The highest cached height, if any
+        return self._latest_height
+
+    def summaries(self, start_height: int, end_height: int) \
+            -> Iterator[BlockSummary]:
+        # Yields the cached summaries from start_height to end_height
+        # (inclusive), skipping heights that are not cached
+        for height in range(max(start_height, end_height - self._capacity + 1),
+                            end_height + 1):
+            summary = self.get(height)
+            if summary is not None:
+                yield summary
+
+    def flush(self) -> None:
+        self._map.flush()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+from typing import Callable, Union
+
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.utils.metrics import BLOCK_PIPELINE_QUEUE_DEPTH
+
+# A fetched block is either the content of its /block response or, if it did
+# not have to be fetched, its summary
+FetchedBlock = Union[bytes, BlockSummary]
+
+# Sent by each fetch worker to the decoder once there is nothing to fetch
+_DONE = object()
+
+
+class BlockPipeline:
+    # Checks a range of blocks in three stages which overlap: fetch workers
+    # get the blocks concurrently, a decoder parses and summarises them, and
+    # the blocks are evaluated in order of height by the thread that runs the
+    # pipeline. No more than queue_size blocks are ever between being picked
+    # up for fetching and being evaluated, so fetching waits whenever
+    # evaluation falls behind (backpressure), and the blocks are checked as
+    # fast as the slowest stage rather than all of the stages added up.
+
+    def __init__(self, monitor_name: str,
+                 fetch: Callable[[int], FetchedBlock],
+                 decode: Callable[[int, FetchedBlock], BlockSummary],
+                 fetch_workers: int, queue_size: int,
+                 logger: logging.Logger) -> None:
+        self._monitor_name = monitor_name
+        self._fetch = fetch
+        self._decode = decode
+        self._fetch_workers = fetch_workers
+        self._queue_size = queue_size
+        self._logger = logger
+
+        self._fetch_depth = BLOCK_PIPELINE_QUEUE_DEPTH.labels(
+            monitor_name, 'fetch')
+        self._decode_depth = BLOCK_PIPELINE_QUEUE_DEPTH.labels(
+            monitor_name, 'decode')
+        self._evaluate_depth = BLOCK_PIPELINE_QUEUE_DEPTH.labels(
+            monitor_name, 'evaluate')
+
+        # The threads of the runs so far which might not have stopped yet
+        self._threads = []
+
+    def _feed(self, start_height: int, end_height: int,
+              slots: threading.Semaphore, stopped: threading.Event,
+              to_fetch: queue.Queue) -> None:
+        for height in range(start_height, end_height + 1):
+            # Wait for a slot, i.e. for a block to be evaluated
+            slots.acquire()
+            if stopped.is_set():
+                break
+            to_fetch.put(height)
+        for _ in range(self._fetch_workers):
+            to_fetch.put(_DONE)
+
+    def _fetch_forever(self, stopped: threading.Event, to_fetch: queue.Queue,
+                       to_decode: queue.Queue) -> None:
+        while True:
+            height = to_fetch.get()
+            if height is _DONE:
+                break
+            if stopped.is_set():
+                continue
+            try:
+                to_decode.put((height, self._fetch(height)))
+            except Exception as e:
+                to_decode.put((height, e))
+        to_decode.put((None, _DONE))
+
+    def _decode_forever(self, stopped: threading.Event,
+                        to_decode: queue.Queue,
+                        to_evaluate: queue.Queue) -> None:
+        fetch_workers = self._fetch_workers
+        while fetch_workers > 0:
+            height, fetched = to_decode.get()
+            if fetched is _DONE:
+                fetch_workers -= 1
+                continue
+            if stopped.is_set() or isinstance(fetched, Exception):
+                to_evaluate.put((height, fetched))
+                continue
+            try:
+                to_evaluate.put((height, self._decode(height, fetched)))
+            except Exception as e:
+                to_evaluate.put((height, e))
+
+    def _set_depths(self, fetch: int, decode: int, evaluate: int) -> None:
+        self._fetch_depth.set(fetch)
+        self._decode_depth.set(decode)
+        self._evaluate_depth.set(evaluate)
+
+    def run(self, start_height: int, end_height: int,
+            evaluate: Callable[[BlockSummary], None]) -> None:
+        # Evaluates the blocks from start_height to end_height (inclusive),
+        # in order. If a block could not be fetched or decoded, the blocks
+        # before it are evaluated and the error is then raised.
+        self._logger.debug('Checking heights %s to %s using %s fetch '
+                           'worker(s).', start_height, end_height,
+                           self._fetch_workers)
+        stopped = threading.Event()
+        slots = threading.Semaphore(self._queue_size)
+        to_fetch = queue.Queue()
+        to_decode = queue.Queue()
+        to_evaluate = queue.Queue()
+
+        threads = [threading.Thread(
+            target=self._feed, args=(start_height, end_height, slots,
+                                     stopped, to_fetch))]
+        threads += [threading.Thread(
+            target=self._fetch_forever, args=(stopped, to_fetch, to_decode))
+            for _ in range(self._fetch_workers)]
+        threads.append(threading.Thread(
+            target=self._decode_forever,
+            args=(stopped, to_decode, to_evaluate)))
+        for i, t in enumerate(threads):
+            t.name = '{} pipeline {}'.format(self._monitor_name, i)
+            t.daemon = True
+            t.start()
+        self._threads = [t for t in self._threads if t.is_alive()] + threads
+
+        # Blocks decoded out of order wait until it is their turn
+        decoded = {}
+        try:
+            for height in range(start_height, end_height + 1):
+                while height not in decoded:
+                    decoded_height, summary = to_evaluate.get()
+                    decoded[decoded_height] = summary
+                    self._set_depths(to_fetch.qsize(), to_decode.qsize(),
+                                     to_evaluate.qsize() + len(decoded))
+
+                summary = decoded.pop(height)
+                if isinstance(summary, Exception):
+                    raise summary
+                evaluate(summary)
+                slots.release()
+        finally:
+            # Anything still in the pipeline is dropped, and its threads
+            # stop once they are done with what they are doing
+            stopped.set()
+            for _ in range(self._queue_size):
+                slots.release()
+            self._set_depths(0, 0, 0)
+
+    def close(self) -> None:
+        # Waits for the threads of past runs to stop. Each run signals its
+        # threads to stop once it is done, so this is only to be called when
+        # the pipeline is not running, e.g. once its monitor has stopped.
+        for t in self._threads:
+            t.join()
+        self._threads = []
@@ -1,14 +1,26 @@
 import json
 import logging
+import time
 from typing import Dict
 
-import requests
+from src.monitoring.monitor_utils.rpc_transport import get_rpc_transport
+from src.utils.metrics import RPC_REQUEST_DURATION
 
 
-def get_json(endpoint: str, logger: logging.Logger) -> Dict:
-    get_ret = requests.get(endpoint, timeout=10)
+def get_content(endpoint: str, logger: logging.Logger) -> bytes:
+    start = time.perf_counter()
+    try:
+        get_ret = get_rpc_transport().get(endpoint, 10)
+    finally:
+        # The query (such as a height) is left out of the endpoint label
+        RPC_REQUEST_DURATION.labels(endpoint.split('?', 1)[0]).observe(
+            time.perf_counter() - start)
     logger.debug('get_json: get_ret: %s', get_ret)
-    return json.loads(get_ret.content.decode('UTF-8'))
+    return get_ret.content
+
+
+def get_json(endpoint: str, logger: logging.Logger) -> Dict:
+    return json.loads(get_content(endpoint, logger).decode('UTF-8'))
 
 
 def get_cosmos_json(endpoint: str, logger: logging.Logger) -> Dict:
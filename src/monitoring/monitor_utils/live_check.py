@@ -1,12 +1,13 @@
 import logging
 
-import requests
 from requests.exceptions import ConnectionError as ReqConnectionError
 
+from src.monitoring.monitor_utils.rpc_transport import get_rpc_transport
+
 
 def live_check_unsafe(endpoint: str, logger: logging.Logger) -> None:
     # This throws a ConnectionError if the live check fails
-    head_ret = requests.head(endpoint, timeout=10)
+    head_ret = get_rpc_transport().head(endpoint, 10)
     logger.debug('live_check: head_ret: %s', head_ret)
 
 
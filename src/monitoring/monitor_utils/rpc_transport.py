@@ -0,0 +1,165 @@
+import atexit
+import collections
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.exceptions import ConnectionError as ReqConnectionError, \
+    ReadTimeout, ChunkedEncodingError
+
+# Errors that are raised again as they are when replaying. Any other error
+# that was recorded is replayed as a ConnectionError.
+_REPLAYABLE_ERRORS = {e.__name__: e for e in [
+    ReqConnectionError, ReadTimeout, ChunkedEncodingError]}
+
+# Recordings are flushed every this many records, so that a recording of an
+# alerter that was killed is mostly readable
+_FLUSH_EVERY = 100
+
+
+class RpcTransport:
+    # Makes the HTTP requests behind get_json and live_check
+
+    def get(self, endpoint: str, timeout: float) -> requests.Response:
+        return requests.get(endpoint, timeout=timeout)
+
+    def head(self, endpoint: str, timeout: float) -> requests.Response:
+        return requests.head(endpoint, timeout=timeout)
+
+
+class RecordingRpcTransport(RpcTransport):
+    # Makes requests using another transport, recording the request, the
+    # response (or error) and how long it took to a gzipped JSON lines file
+
+    def __init__(self, capture_file: str,
+                 transport: Optional[RpcTransport] = None) -> None:
+        self._transport = transport or RpcTransport()
+        os.makedirs(os.path.dirname(capture_file) or '.', exist_ok=True)
+        self._file = gzip.open(capture_file, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._records = 0
+        self._started = time.monotonic()
+        atexit.register(self.close)
+
+    def _record(self, record: Dict) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self._records += 1
+            if self._records % _FLUSH_EVERY == 0:
+                self._file.flush()
+
+    def get(self, endpoint: str, timeout: float) -> requests.Response:
+        return self._request('GET', endpoint, timeout)
+
+    def head(self, endpoint: str, timeout: float) -> requests.Response:
+        return self._request('HEAD', endpoint, timeout)
+
+    def _request(self, method: str, endpoint: str, timeout: float) \
+            -> requests.Response:
+        record = {'t': round(time.monotonic() - self._started, 6),
+                  'm': method, 'u': endpoint}
+        start = time.perf_counter()
+        try:
+            if method == 'GET':
+                response = self._transport.get(endpoint, timeout)
+            else:
+                response = self._transport.head(endpoint, timeout)
+            record['s'] = response.status_code
+            record['b'] = response.content.decode('utf-8', 'replace')
+            return response
+        except Exception as e:
+            record['x'] = type(e).__name__
+            raise
+        finally:
+            record['e'] = round(time.perf_counter() - start, 6)
+            self._record(record)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class ReplayRpcTransport(RpcTransport):
+    # Serves the responses of a recording. The responses to each method and
+    # endpoint are served in the order in which they were recorded, either
+    # taking as long as they took when recorded or as fast as possible. A
+    # request without any (remaining) recorded response fails with a
+    # ConnectionError, as if the node was down.
+
+    def __init__(self, capture_file: str, as_fast_as_possible: bool = True) \
+            -> None:
+        self._as_fast_as_possible = as_fast_as_possible
+        self._responses = collections.defaultdict(collections.deque)
+        self._remaining = 0
+        self._lock = threading.Lock()
+        self.exhausted = threading.Event()
+
+        with gzip.open(capture_file, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    record = json.loads(line)
+                    self._responses[(record['m'], record['u'])].append(
+                        record)
+                    self._remaining += 1
+            except (EOFError, ValueError):
+                pass  # The recording was cut short
+        if self._remaining == 0:
+            self.exhausted.set()
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    def endpoints(self) -> Dict[Tuple[str, str], int]:
+        # The number of remaining responses by method and endpoint
+        with self._lock:
+            return {k: len(v) for k, v in self._responses.items()}
+
+    def get(self, endpoint: str, timeout: float) -> requests.Response:
+        return self._request('GET', endpoint, timeout)
+
+    def head(self, endpoint: str, timeout: float) -> requests.Response:
+        return self._request('HEAD', endpoint, timeout)
+
+    def _request(self, method: str, endpoint: str, timeout: float) \
+            -> requests.Response:
+        with self._lock:
+            responses = self._responses.get((method, endpoint))
+            record = responses.popleft() if responses else None
+            if record is not None:
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self.exhausted.set()
+
+        if record is None:
+            raise ReqConnectionError('No recorded response to {} {}.'.format(
+                method, endpoint))
+        if not self._as_fast_as_possible:
+            time.sleep(min(record['e'], timeout))
+        if 'x' in record:
+            raise _REPLAYABLE_ERRORS.get(record['x'], ReqConnectionError)(
+                'Recorded {}.'.format(record['x']))
+
+        response = requests.Response()
+        response.status_code = record['s']
+        response._content = record['b'].encode('utf-8')
+        response.url = endpoint
+        return response
+
+
+_transport = RpcTransport()
+
+
+def get_rpc_transport() -> RpcTransport:
+    return _transport
+
+
+def set_rpc_transport(transport: RpcTransport) -> None:
+    global _transport
+    _transport = transport
@@ -0,0 +1,65 @@
+import logging
+from typing import Callable, List, Tuple
+
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.monitoring.monitor_utils.get_json import get_cosmos_json
+
+
+def get_validator_set(rpc_url: str, height: int, page_size: int,
+                      logger: logging.Logger) -> List[str]:
+    # The addresses of the validators at the height, fetched a page at a
+    # time. Tendermint versions that do not paginate /validators return all
+    # of the validators at once, without a total.
+    addresses = []
+    page = 1
+    while True:
+        result = get_cosmos_json(
+            '{}/validators?height={}&page={}&per_page={}'.format(
+                rpc_url, height, page, page_size), logger)
+        validators = result['validators']
+        addresses += [v['address'] for v in validators]
+        total = int(result.get('total', len(addresses)))
+        if len(addresses) >= total or len(validators) == 0:
+            return addresses
+        page += 1
+
+
+class ValidatorSetCache:
+    # The validator set that signed the last commit of each block, which is
+    # the validator set at the previous height. The set is only fetched
+    # again if the validators hash in the header of the previous block is
+    # not that of the cached set, or if the previous block was not seen.
+
+    def __init__(self, fetch: Callable[[int], List[str]],
+                 logger: logging.Logger) -> None:
+        self._fetch = fetch
+        self._logger = logger
+
+        self._validators = []
+        self._validators_hash = None
+
+        # The height and validators hash of the last block seen
+        self._last_height = None
+        self._last_validators_hash = None
+
+    def validators_of_last_commit(self, summary: BlockSummary) \
+            -> Tuple[List[str], bool]:
+        # Returns the validators of the last commit of the block, whether or
+        # not they signed it, and whether these changed since the last block
+        height = summary.height - 1
+        validators_hash = self._last_validators_hash \
+            if self._last_height == height else None
+
+        changed = False
+        if validators_hash is None or \
+                validators_hash != self._validators_hash:
+            validators = self._fetch(height)
+            self._logger.debug('Fetched validator set at height %s: %s '
+                               'validator(s)', height, len(validators))
+            changed = validators != self._validators
+            self._validators = validators
+            self._validators_hash = validators_hash
+
+        self._last_height = summary.height
+        self._last_validators_hash = summary.validators_hash or None
+        return self._validators, changed
@@ -7,13 +7,13 @@ from src.monitoring.monitor_utils.get_json import get_json
 from src.monitoring.monitors.monitor import Monitor
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
-from src.utils.redis_api import RedisApi
+from src.utils.state_store import StateStore
 
 
 class GitHubMonitor(Monitor):
 
     def __init__(self, monitor_name: str, channels: ChannelSet,
-                 logger: logging.Logger, redis: Optional[RedisApi],
+                 logger: logging.Logger, redis: Optional[StateStore],
                  repo_name: str, releases_page: str,
                  redis_github_releases_key_prefix: str,
                  internal_conf: InternalConfig = InternalConf):
@@ -3,13 +3,13 @@ from typing import Optional
 
 from src.alerting.channels.channel import ChannelSet
 from src.utils.config_parsers.internal import InternalConfig
-from src.utils.redis_api import RedisApi
+from src.utils.state_store import StateStore
 
 
 class Monitor:
 
     def __init__(self, monitor_name: str, channels: ChannelSet,
-                 logger: logging.Logger, redis: Optional[RedisApi],
+                 logger: logging.Logger, redis: Optional[StateStore],
                  internal_conf: InternalConfig) -> None:
         super().__init__()
 
@@ -28,7 +28,7 @@ class Monitor:
         return self._logger
 
     @property
-    def redis(self) -> RedisApi:
+    def redis(self) -> StateStore:
         return self._redis
 
     @property
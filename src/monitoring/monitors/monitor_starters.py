@@ -1,7 +1,8 @@
 import logging
-import time
+import threading
 from http.client import IncompleteRead
 from json import JSONDecodeError
+from typing import Optional
 
 from requests.exceptions import ConnectionError as ReqConnectionError, \
     ReadTimeout, ChunkedEncodingError
@@ -12,17 +13,43 @@ from src.alerting.alerts.alerts import CouldNotFindLiveFullNodeAlert, \
 from src.monitoring.monitors.github import GitHubMonitor
 from src.monitoring.monitors.network import NetworkMonitor
 from src.monitoring.monitors.node import NodeMonitor
+from src.utils.clock import Clock, SYSTEM_CLOCK
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
 from src.utils.exceptions import NoLiveFullNodeException
+from src.utils.metrics import MONITOR_LOOP_DURATION, MONITOR_LOOP_OVERRUNS
 from src.utils.timing import TimedTaskLimiter
 
 
+def _running(stop_event: Optional[threading.Event]) -> bool:
+    return stop_event is None or not stop_event.is_set()
+
+
+def _sleep(monitor_period: int, stop_event: Optional[threading.Event],
+           clock: Clock):
+    # Monitors with a stop event wake up as soon as they are stopped
+    if stop_event is None:
+        clock.sleep(monitor_period)
+    else:
+        clock.wait(stop_event, monitor_period)
+
+
+def _record_round(monitor_name: str, start: float, monitor_period: int,
+                  clock: Clock):
+    duration = clock.monotonic() - start
+    MONITOR_LOOP_DURATION.labels(monitor_name).observe(duration)
+    if duration > monitor_period:
+        MONITOR_LOOP_OVERRUNS.labels(monitor_name).inc()
+
+
 def start_node_monitor(node_monitor: NodeMonitor, monitor_period: int,
-                       logger: logging.Logger):
+                       logger: logging.Logger,
+                       stop_event: Optional[threading.Event] = None,
+                       clock: Clock = SYSTEM_CLOCK):
     # Start
-    while True:
+    while _running(stop_event):
         # Read node data
+        start = clock.monotonic()
         try:
             logger.debug('Reading %s.', node_monitor.node)
             node_monitor.monitor()
@@ -38,6 +65,8 @@ def start_node_monitor(node_monitor: NodeMonitor, monitor_period: int,
         except Exception as e:
             logger.exception(e)
             raise e
+        _record_round(node_monitor.monitor_name, start, monitor_period,
+                      clock)
 
         # Save all state
         node_monitor.save_state()
@@ -45,14 +74,17 @@ def start_node_monitor(node_monitor: NodeMonitor, monitor_period: int,
 
         # Sleep
         logger.debug('Sleeping for %s seconds.', monitor_period)
-        time.sleep(monitor_period)
+        _sleep(monitor_period, stop_event, clock)
 
 
 def start_network_monitor(network_monitor: NetworkMonitor, monitor_period: int,
-                          logger: logging.Logger):
+                          logger: logging.Logger,
+                          stop_event: Optional[threading.Event] = None,
+                          clock: Clock = SYSTEM_CLOCK):
     # Start
-    while True:
+    while _running(stop_event):
         # Read network data
+        start = clock.monotonic()
         try:
             logger.debug('Reading network data.')
             network_monitor.monitor()
@@ -71,6 +103,8 @@ def start_network_monitor(network_monitor: NetworkMonitor, monitor_period: int,
         except Exception as e:
             logger.exception(e)
             raise e
+        _record_round(network_monitor.monitor_name, start, monitor_period,
+                      clock)
 
         # Save all state
         network_monitor.save_state()
@@ -78,19 +112,22 @@ def start_network_monitor(network_monitor: NetworkMonitor, monitor_period: int,
         # Sleep
         if not network_monitor.is_syncing():
             logger.debug('Sleeping for %s seconds.', monitor_period)
-            time.sleep(monitor_period)
+            _sleep(monitor_period, stop_event, clock)
 
 
 def start_github_monitor(github_monitor: GitHubMonitor, monitor_period: int,
                          logger: logging.Logger,
-                         internal_config: InternalConfig = InternalConf):
+                         internal_config: InternalConfig = InternalConf,
+                         stop_event: Optional[threading.Event] = None,
+                         clock: Clock = SYSTEM_CLOCK):
     # Set up alert limiter
     github_error_alert_limiter = TimedTaskLimiter(
-        internal_config.github_error_interval_seconds)
+        internal_config.github_error_interval_seconds, clock)
 
     # Start
-    while True:
+    while _running(stop_event):
         # Read GitHub releases page
+        start = clock.monotonic()
         try:
             logger.debug('Reading %s.', github_monitor.releases_page)
             github_monitor.monitor()
@@ -113,7 +150,9 @@ def start_github_monitor(github_monitor: GitHubMonitor, monitor_period: int,
         except Exception as e:
             logger.exception(e)
             raise e
+        _record_round(github_monitor.monitor_name, start, monitor_period,
+                      clock)
 
         # Sleep
         logger.debug('Sleeping for %s seconds.', monitor_period)
-        time.sleep(monitor_period)
+        _sleep(monitor_period, stop_event, clock)
@@ -1,18 +1,34 @@
+import json
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from typing import List, Optional
 
-import dateutil.parser
-
+from src.alerting.alerts.alerts import NetworkWideMissedBlocksAlert, \
+    NetworkWideMissedBlocksOverAlert, NoNewBlocksAlert, NewBlocksAgainAlert
 from src.alerting.channels.channel import ChannelSet
-from src.monitoring.monitor_utils.get_json import get_cosmos_json
+from src.alerting.channels.log import LogChannel
+from src.monitoring.monitor_utils.block_cache import BlockCache, \
+    BlockSummary, summarise_block
+from src.monitoring.monitor_utils.block_pipeline import BlockPipeline, \
+    FetchedBlock
+from src.monitoring.monitor_utils.get_json import get_content, \
+    get_cosmos_json
 from src.monitoring.monitor_utils.live_check import live_check
+from src.monitoring.monitor_utils.validator_set import ValidatorSetCache, \
+    get_validator_set
 from src.monitoring.monitors.monitor import Monitor
-from src.node.node import Node
+from src.node.node import Node, NodeType
+from src.node.validator_table import ValidatorTable
+from src.utils.clock import Clock, SYSTEM_CLOCK
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
+from src.utils.datetime import strfdelta
 from src.utils.exceptions import NoLiveFullNodeException
-from src.utils.redis_api import RedisApi
+from src.utils.metrics import BLOCK_CHECK_DURATION, BLOCKS_BEHIND
+from src.utils.state_encoding import MonitorState, encode_monitor_state
+from src.utils.state_store import StateStore
+from src.utils.timing import TimedTaskLimiter
 
 
 class NetworkMonitor(Monitor):
@@ -20,15 +36,22 @@ class NetworkMonitor(Monitor):
     def __init__(self, monitor_name: str, channels: ChannelSet,
                  logger: logging.Logger,
                  network_monitor_max_catch_up_blocks: int,
-                 redis: Optional[RedisApi], all_full_nodes: List[Node],
+                 redis: Optional[StateStore], all_full_nodes: List[Node],
                  all_validators: List[Node],
-                 internal_conf: InternalConfig = InternalConf):
+                 internal_conf: InternalConfig = InternalConf,
+                 block_cache: Optional[BlockCache] = None,
+                 clock: Clock = SYSTEM_CLOCK):
         super().__init__(monitor_name, channels, logger, redis, internal_conf)
 
         self.network_monitor_max_catch_up_blocks = \
             network_monitor_max_catch_up_blocks
+        self._max_blocks_per_round = \
+            self._internal_conf.block_pipeline_max_blocks_per_round
         self._all_full_nodes = all_full_nodes
         self._all_validators = all_validators
+        self._validator_table = ValidatorTable(all_validators)
+        self._block_cache = block_cache
+        self._clock = clock
 
         self.last_full_node_used = None
         self._last_height_checked = None
@@ -46,38 +69,98 @@ class NetworkMonitor(Monitor):
         self._redis_last_height_key_timeout = \
             self._internal_conf.redis_network_monitor_last_height_key_timeout
 
+        # Network-wide incidents are alerted on once, in place of the
+        # individual alerts of every validator that is affected by them
+        self._incident_missing_fraction = \
+            self._internal_conf.network_incident_missing_validators_fraction
+        self._incident_start_height = None
+        self._incident_blocks = 0
+        self._muted_channels = ChannelSet([])
+
+        # The delayer is reset every time that the chain height increases
+        self._last_chain_height = None
+        self._no_new_blocks_alert_delayer = TimedTaskLimiter(
+            self._internal_conf.no_new_blocks_alert_delay, clock)
+        self._no_new_blocks_alert_sent = False
+
+        # If enabled, every other active validator is discovered from the
+        # validator set, and its alerts are only logged
+        if self._internal_conf.validator_discovery_enabled:
+            self._validator_set = ValidatorSetCache(
+                self._get_validator_set, self.logger)
+        else:
+            self._validator_set = None
+        self._discovered_validators = {}
+        self._discovered_table = ValidatorTable([])
+        self._discovered_channels = ChannelSet([LogChannel(
+            'Discovered validator', self.logger, self.logger)])
+
+        # Blocks are fetched from the full node that was picked for the round
+        self._block_pipeline = BlockPipeline(
+            monitor_name,
+            lambda height: self._fetch_block(height, self.last_full_node_used),
+            self._decode_block,
+            self._internal_conf.block_pipeline_fetch_workers,
+            self._internal_conf.block_pipeline_queue_size, self.logger)
+
+        self._block_check_duration = BLOCK_CHECK_DURATION.labels(monitor_name)
+        self._blocks_behind = BLOCKS_BEHIND.labels(monitor_name)
+
         self.load_state()
 
     def is_syncing(self) -> bool:
         return self._monitor_is_syncing
 
+    @property
+    def in_network_wide_incident(self) -> bool:
+        return self._incident_start_height is not None
+
     def load_state(self) -> None:
         # If Redis is enabled, load the last height checked, if any
         if self.redis_enabled:
             self._last_height_checked = self.redis.get_int(
                 self._redis_last_height_checked_key, None)
 
+            # Restore the validators' signing windows
+            for v in self._all_validators:
+                v.load_signing_window(self.logger)
+
             self.logger.debug(
-                'Restored %s state: %s=%s', self._monitor_name,
-                self._redis_last_height_checked_key, self._last_height_checked)
+                'Restored %s state: last_height_checked=%s',
+                self._monitor_name, self._last_height_checked)
 
     def save_state(self) -> None:
         # If Redis is enabled, save the current last height checked and the
         # current time, indicating that the monitor was alive at this time
         if self.redis_enabled:
             self.logger.debug(
-                'Saving network monitor state: %s=%s',
-                self._redis_last_height_checked_key, self._last_height_checked)
+                'Saving network monitor state: last_height_checked=%s',
+                self._last_height_checked)
 
-            # Set last height checked key
-            key = self._redis_last_height_checked_key
-            until = timedelta(seconds=self._redis_last_height_key_timeout)
-            self.redis.set_for(key, self._last_height_checked, until)
+            # Set last height checked key, if any, which is kept for longer
+            # than the alive key so that the monitor carries on from it
+            if self._last_height_checked is not None:
+                key = self._redis_last_height_checked_key
+                until = timedelta(
+                    seconds=self._redis_last_height_key_timeout)
+                self.redis.set_for(key, self._last_height_checked, until)
 
             # Set alive key (to be able to query latest update from Telegram)
             key = self._redis_alive_key
             until = timedelta(seconds=self._redis_alive_key_timeout)
-            self.redis.set_for(key, str(datetime.now()), until)
+            self.redis.set_for(key, encode_monitor_state(MonitorState(
+                self._clock.now())), until)
+
+            # Save changes to the validators' signing windows
+            self._validator_table.flush_signed_blocks()
+            self._discovered_table.flush_signed_blocks()
+            Node.save_signing_windows(
+                self._all_validators +
+                list(self._discovered_validators.values()), self.logger)
+
+    def close(self) -> None:
+        # Waits for the block pipeline's threads once the monitor has stopped
+        self._block_pipeline.close()
 
     @property
     def node(self) -> Node:
@@ -89,47 +172,189 @@ class NetworkMonitor(Monitor):
                 return n
         raise NoLiveFullNodeException()
 
+    def _correlate_block(self, height: int, missing_validators: int,
+                         total_validators: int, signers: set) -> ChannelSet:
+        # A large enough fraction of missing validators means that the block
+        # was missed network-wide rather than by the individual validators
+        network_wide = total_validators > 0 and \
+            missing_validators / total_validators >= \
+            self._incident_missing_fraction
+
+        if network_wide and not self.in_network_wide_incident:
+            own_missing = self._validator_table.missed_count(signers)
+            alert = NetworkWideMissedBlocksAlert(
+                self._monitor_name, height, missing_validators,
+                total_validators, own_missing)
+            if own_missing > 0:
+                self.channels.alert_major(alert)
+            else:
+                self.channels.alert_minor(alert)
+            self._incident_start_height = height
+            self._incident_blocks = 0
+        elif not network_wide and self.in_network_wide_incident:
+            self.channels.alert_info(NetworkWideMissedBlocksOverAlert(
+                self._monitor_name, self._incident_start_height, height))
+            self._incident_start_height = None
+
+            # The validators' missed blocks alerts were muted during the
+            # incident, so their clears are muted as well
+            for table in [self._validator_table, self._discovered_table]:
+                table.clear_missed_blocks_since(
+                    self._incident_blocks, self._muted_channels, self.logger)
+
+        if network_wide:
+            self._incident_blocks += 1
+        return self._muted_channels if network_wide else self.channels
+
+    def _check_chain_height(self, chain_height: int) -> None:
+        # Any increase in the chain height means that the chain is moving
+        if self._last_chain_height is None or \
+                chain_height > self._last_chain_height:
+            if self._no_new_blocks_alert_sent:
+                self.channels.alert_info(NewBlocksAgainAlert(
+                    self._monitor_name, chain_height))
+            self._last_chain_height = chain_height
+            self._no_new_blocks_alert_delayer.did_task()
+            self._no_new_blocks_alert_sent = False
+        elif not self._no_new_blocks_alert_sent and \
+                self._no_new_blocks_alert_delayer.can_do_task():
+            # The node used may be stuck rather than the chain, so the height
+            # is confirmed against the other full nodes before alerting
+            highest_height = self._highest_chain_height(chain_height)
+            if highest_height > self._last_chain_height:
+                self.logger.warning(
+                    '%s is at height %s while other full nodes are at height '
+                    '%s.', self.last_full_node_used, chain_height,
+                    highest_height)
+                self._last_chain_height = highest_height
+                self._no_new_blocks_alert_delayer.did_task()
+                return
+
+            duration = strfdelta(
+                self._no_new_blocks_alert_delayer.time_interval,
+                "{hours}h, {minutes}m, {seconds}s")
+            self.channels.alert_major(NoNewBlocksAlert(
+                self._monitor_name, chain_height, duration))
+            self._no_new_blocks_alert_sent = True
+
+    def _highest_chain_height(self, chain_height: int) -> int:
+        # The highest of the chain height and the heights of the other full
+        # nodes that can be reached
+        for n in self._all_full_nodes:
+            if n is self.last_full_node_used:
+                continue
+            try:
+                if live_check(n.rpc_url + '/health', self.logger):
+                    status = get_cosmos_json(n.rpc_url + '/status',
+                                             self._logger)
+                    chain_height = max(chain_height, int(
+                        status['sync_info']['latest_block_height']))
+            except Exception as e:
+                self.logger.error('Error when getting the height of %s: %s',
+                                  n, e)
+        return chain_height
+
+    def _fetch_block(self, height: int, node: Optional[Node] = None) \
+            -> FetchedBlock:
+        # Use the cached summary of the block, if any
+        if self._block_cache is not None:
+            summary = self._block_cache.get(height)
+            if summary is not None:
+                self._logger.debug('Using cached block at height %s', height)
+                return summary
+
+        # Get block, by default from the first full node that responds
+        node = node or self.node
+        return get_content(node.rpc_url + '/block?height=' + str(height),
+                           self._logger)
+
+    def _decode_block(self, height: int, fetched: FetchedBlock) \
+            -> BlockSummary:
+        if isinstance(fetched, BlockSummary):
+            return fetched
+
+        block = json.loads(fetched.decode('UTF-8'))['result']
+        summary = summarise_block(height, block)
+
+        if self._block_cache is not None:
+            self._block_cache.put(summary)
+        return summary
+
+    def _get_block_summary(self, height: int) -> BlockSummary:
+        return self._decode_block(height, self._fetch_block(height))
+
+    def _get_validator_set(self, height: int) -> List[str]:
+        return get_validator_set(
+            self.node.rpc_url, height,
+            self._internal_conf.validator_discovery_page_size, self.logger)
+
+    def _update_discovered_validators(self, addresses: List[str]) -> None:
+        # The discovered validators are the active validators that are not
+        # already monitored. Each keeps its state if it leaves the validator
+        # set and joins it again.
+        monitored = {v.pubkey for v in self._all_validators}
+        network = self._all_full_nodes[0].network \
+            if len(self._all_full_nodes) > 0 else ''
+        discovered = []
+        for address in addresses:
+            if address in monitored:
+                continue
+            v = self._discovered_validators.get(address)
+            if v is None:
+                v = Node(address, None, NodeType.VALIDATOR_FULL_NODE,
+                         address, network, self.redis, self._internal_conf,
+                         self._clock)
+                v.load_signing_window(self.logger)
+                self._discovered_validators[address] = v
+            discovered.append(v)
+
+        self._discovered_table.flush_signed_blocks()
+        self._discovered_table = ValidatorTable(discovered)
+        self.logger.info('%s tracking %s discovered validator(s)',
+                         self._monitor_name, len(discovered))
+
     def _check_block(self, height: int) -> None:
         self._logger.info('%s obtaining data at height %s',
                           self._monitor_name, height)
+        self._evaluate_block(self._get_block_summary(height))
 
-        # Get block
-        block = get_cosmos_json(self.node.rpc_url + '/block?height=' +
-                                str(height), self._logger)
+    def _evaluate_block(self, summary: BlockSummary) -> None:
+        start = time.perf_counter()
+        height = summary.height
 
-        # Get validators participating in the precommits of last commit
-        last_commit = block['block']['last_commit']
-        if 'precommits' in last_commit:
-            block_precommits = last_commit['precommits']  # tendermint <v0.33
-            non_null_precommits = \
-                filter(lambda p: p, block_precommits)
-        else:
-            block_precommits = last_commit['signatures']  # tendermint v0.33+
-            non_null_precommits = \
-                filter(lambda p: p['signature'], block_precommits)
-        block_precommits_validators = set(
-            map(lambda p: p['validator_address'], non_null_precommits))
-        total_no_of_missing_validators = \
-            len(block_precommits) - len(block_precommits_validators)
+        # The signers are those of the last commit, i.e. of height - 1
+        block_precommits_validators = summary.signers
+        total_no_of_missing_validators = summary.missing
 
         self._logger.debug('Precommit validators: %s',
                            block_precommits_validators)
         self._logger.debug('Total missing validators: %s',
                            total_no_of_missing_validators)
 
-        # Call method based on whether block missed or not
-        for v in self._all_validators:
-            if v.pubkey not in block_precommits_validators:
-                block_time = block['block']['header']['time']
-                v.add_missed_block(
-                    height - 1,  # '- 1' since it's actually previous height
-                    dateutil.parser.parse(block_time, ignoretz=True),
-                    total_no_of_missing_validators, self.channels,
-                    self.logger)
-            else:
-                v.clear_missed_blocks(self.channels, self.logger)
+        # Correlate the block with any network-wide incident, in which case
+        # the individual validators' alerts are not sent to the channels
+        channels = self._correlate_block(
+            height - 1, total_no_of_missing_validators, summary.total,
+            block_precommits_validators)
+
+        # Evaluate the block for all validators at once, with '- 1' since
+        # the signers are actually those of the previous height
+        self._validator_table.evaluate_block(height - 1, summary, channels,
+                                             self.logger)
 
+        # The discovered validators, using the validator set of the block
+        if self._validator_set is not None:
+            validators, changed = \
+                self._validator_set.validators_of_last_commit(summary)
+            if changed:
+                self._update_discovered_validators(validators)
+            self._discovered_table.evaluate_block(
+                height - 1, summary, self._discovered_channels
+                if channels is self.channels else channels, self.logger)
+
+        self._last_height_checked = height
         self._logger.debug('Moving to next height.')
+        self._block_check_duration.observe(time.perf_counter() - start)
 
     def monitor(self) -> None:
         # Get node status and, from that, the last height to be checked
@@ -141,6 +366,9 @@ class NetworkMonitor(Monitor):
         if last_height_to_check == 0:
             return
 
+        # Check whether the chain is still producing new blocks
+        self._check_chain_height(last_height_to_check)
+
         # If this is the first height being checked, ignore previous heights
         if self._last_height_checked is None:
             self._last_height_checked = last_height_to_check - 1
@@ -151,12 +379,22 @@ class NetworkMonitor(Monitor):
                 self.network_monitor_max_catch_up_blocks:
             height = last_height_to_check - \
                      self.network_monitor_max_catch_up_blocks
+
+        # Check up to the max blocks per round, and more than one block using
+        # the pipeline, in which case the last height checked moves forward
+        # with every block that is evaluated
+        end_height = min(last_height_to_check,
+                         height + self._max_blocks_per_round - 1)
+        if height == end_height:
             self._check_block(height)
-            self._last_height_checked = height
-        elif height <= last_height_to_check:
-            self._check_block(height)
-            self._last_height_checked = height
+        elif height < end_height:
+            self._logger.info('%s obtaining data at heights %s to %s',
+                              self._monitor_name, height, end_height)
+            self._block_pipeline.run(height, end_height,
+                                     self._evaluate_block)
 
+        self._blocks_behind.set(
+            last_height_to_check - self._last_height_checked)
         if last_height_to_check - self._last_height_checked > 2:
             self._monitor_is_syncing = True
         else:
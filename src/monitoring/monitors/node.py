@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 
 from src.alerting.channels.channel import ChannelSet
@@ -7,18 +7,23 @@ from src.monitoring.monitor_utils.get_json import get_cosmos_json
 from src.monitoring.monitor_utils.live_check import live_check_unsafe
 from src.monitoring.monitors.monitor import Monitor
 from src.node.node import Node
+from src.utils.clock import Clock, SYSTEM_CLOCK
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
-from src.utils.redis_api import RedisApi
+from src.utils.state_encoding import MonitorState, encode_monitor_state
+from src.utils.state_store import StateStore
 
 
 class NodeMonitor(Monitor):
 
     def __init__(self, monitor_name: str, channels: ChannelSet,
-                 logger: logging.Logger, redis: Optional[RedisApi], node: Node,
-                 internal_conf: InternalConfig = InternalConf):
+                 logger: logging.Logger, redis: Optional[StateStore],
+                 node: Node,
+                 internal_conf: InternalConfig = InternalConf,
+                 clock: Clock = SYSTEM_CLOCK):
         super().__init__(monitor_name, channels, logger, redis, internal_conf)
         self.node = node
+        self._clock = clock
 
         self._redis_alive_key = \
             self._internal_conf.redis_node_monitor_alive_key_prefix + \
@@ -35,7 +40,8 @@ class NodeMonitor(Monitor):
             # Set alive key (to be able to query latest update from Telegram)
             key = self._redis_alive_key
             until = timedelta(seconds=self._redis_alive_key_timeout)
-            self.redis.set_for(key, str(datetime.now()), until)
+            self.redis.set_for(key, encode_monitor_state(
+                MonitorState(self._clock.now())), until)
 
     def monitor(self) -> None:
         # Check if node is accessible
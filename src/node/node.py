@@ -1,18 +1,30 @@
 import logging
 from enum import Enum
-from typing import Optional
-
-import dateutil.parser
+from typing import Dict, List, Optional, Tuple
 
 from src.alerting.alerts.alerts import *
 from src.alerting.channels.channel import ChannelSet
+from src.node.signing_window import SigningWindow, \
+    REDIS_SIGNED_KEY_SUFFIX, REDIS_OBSERVED_KEY_SUFFIX, \
+    REDIS_LAST_HEIGHT_KEY_SUFFIX, REDIS_SIZE_KEY_SUFFIX
+from src.utils.clock import Clock, SYSTEM_CLOCK
 from src.utils.config_parsers.internal import InternalConfig
 from src.utils.config_parsers.internal_parsed import InternalConf
-from src.utils.datetime import strfdelta
-from src.utils.redis_api import RedisApi
+from src.utils.datetime import parse_rfc3339, strfdelta
+from src.utils.state_encoding import NodeState, decode_node_state, \
+    encode_node_state
+from src.utils.state_store import StateStore, StateType
 from src.utils.timing import TimedTaskLimiter, TimedOccurrenceTracker
 
 
+REDIS_STATE_KEY_SUFFIX = '_state'
+
+# Consecutive blocks that a validator has to miss before it is alerted on
+MISSED_BLOCKS_ALERT_THRESHOLD = 2
+LEGACY_STATE_KEY_SUFFIXES = ['_went_down_at', '_consecutive_blocks_missed',
+                             '_voting_power', '_catching_up', '_no_of_peers']
+
+
 class NodeType(Enum):
     VALIDATOR_FULL_NODE = 1,
     NON_VALIDATOR_FULL_NODE = 2
@@ -20,8 +32,10 @@ class NodeType(Enum):
 
 class Node:
     def __init__(self, name: str, rpc_url: Optional[str], node_type: NodeType,
-                 pubkey: Optional[str], network: str, redis: Optional[RedisApi],
-                 internal_conf: InternalConfig = InternalConf) -> None:
+                 pubkey: Optional[str], network: str,
+                 redis: Optional[StateStore],
+                 internal_conf: InternalConfig = InternalConf,
+                 clock: Clock = SYSTEM_CLOCK) -> None:
         super().__init__()
 
         self.name = name
@@ -32,6 +46,8 @@ class Node:
         self._redis = redis
         self._redis_enabled = redis is not None
         self._redis_prefix = self.name + "@" + self.network
+        self._legacy_state_keys = None
+        self._clock = clock
 
         self._went_down_at = None
         self._consecutive_blocks_missed = 0
@@ -40,6 +56,7 @@ class Node:
         self._no_of_peers = None
         self._experiencing_delays_alert_sent = False
         self._initial_downtime_alert_sent = False
+        self._low_uptime_alert_sent = False
 
         self._validator_peer_danger_boundary = \
             internal_conf.validator_peer_danger_boundary
@@ -49,14 +66,21 @@ class Node:
             internal_conf.full_node_peer_danger_boundary
         self._missed_blocks_danger_boundary = \
             internal_conf.missed_blocks_danger_boundary
+        self._signing_window_min_blocks = \
+            internal_conf.signing_window_min_blocks
+        self._signing_window_uptime_danger_boundary = \
+            internal_conf.signing_window_uptime_danger_boundary
+
+        self._signing_window = SigningWindow(
+            internal_conf.signing_window_blocks)
 
         self._downtime_initial_alert_delayer = TimedTaskLimiter(
-            internal_conf.downtime_initial_alert_delay)
+            internal_conf.downtime_initial_alert_delay, clock)
         self._downtime_reminder_limiter = TimedTaskLimiter(
-            internal_conf.downtime_reminder_interval_seconds)
+            internal_conf.downtime_reminder_interval_seconds, clock)
         self._timed_block_miss_tracker = TimedOccurrenceTracker(
             internal_conf.max_missed_blocks_in_time_interval,
-            internal_conf.max_missed_blocks_time_interval)
+            internal_conf.max_missed_blocks_time_interval, clock)
 
         self._change_in_voting_power_threshold = \
             internal_conf.change_in_voting_power_threshold
@@ -80,6 +104,10 @@ class Node:
     def consecutive_blocks_missed_so_far(self) -> int:
         return self._consecutive_blocks_missed
 
+    @property
+    def signing_window(self) -> SigningWindow:
+        return self._signing_window
+
     @property
     def voting_power(self) -> int:
         return self._voting_power
@@ -96,29 +124,58 @@ class Node:
         return "voting_power={}, catching_up={}, number_of_peers={}".format(
             self.voting_power, self.catching_up, self.no_of_peers)
 
+    def _state(self) -> NodeState:
+        return NodeState(self._went_down_at, self._consecutive_blocks_missed,
+                         self._voting_power, self._catching_up,
+                         self._no_of_peers)
+
+    def _parse_legacy_int(self, value: Optional[str], default: Optional[int],
+                          logger: logging.Logger) -> Optional[int]:
+        try:
+            return int(value) if value is not None else default
+        except ValueError as e:
+            logger.error('Error when parsing %s state: %s', self.name, e)
+            return default
+
+    def _load_legacy_state(self, logger: logging.Logger) -> NodeState:
+        # State saved before it was encoded, as one string per value. It is
+        # read (in a single read) if there is no encoded state, and deleted
+        # once the encoded state is saved.
+        keys = [self._redis_prefix + s for s in LEGACY_STATE_KEY_SUFFIXES]
+        values = self._redis.get_multiple(keys)
+        if values is None or all(v is None for v in values):
+            return NodeState(None, 0, None, False, None)
+        self._legacy_state_keys = keys
+
+        values = [None if v in [None, b'None'] else v.decode('utf-8')
+                  for v in values]
+        went_down_at, missed, voting_power, catching_up, no_of_peers = values
+
+        # String to actual values
+        if went_down_at is not None:
+            try:
+                went_down_at = parse_rfc3339(went_down_at)
+            except (TypeError, ValueError, OverflowError) as e:
+                logger.error('Error when parsing _went_down_at: %s', e)
+                went_down_at = None
+        missed = self._parse_legacy_int(missed, 0, logger)
+        voting_power = self._parse_legacy_int(voting_power, None, logger)
+        no_of_peers = self._parse_legacy_int(no_of_peers, None, logger)
+        return NodeState(went_down_at, missed, voting_power,
+                         catching_up == 'True', no_of_peers)
+
     def load_state(self, logger: logging.Logger) -> None:
-        # If Redis is enabled, load any previously stored state
+        # If Redis is enabled, load any previously stored state, which is
+        # encoded in a single value
         if self._redis_enabled:
-            self._went_down_at = self._redis.get(
-                self._redis_prefix + '_went_down_at', None)
-            self._consecutive_blocks_missed = self._redis.get_int(
-                self._redis_prefix + '_consecutive_blocks_missed', 0)
-            self._voting_power = self._redis.get_int(
-                self._redis_prefix + '_voting_power', None)
-            self._catching_up = self._redis.get_bool(
-                self._redis_prefix + '_catching_up', False)
-            self._no_of_peers = self._redis.get_int(
-                self._redis_prefix + '_no_of_peers', None)
-
-            # String to actual values
-            if self._went_down_at is not None:
-                try:
-                    self._went_down_at = \
-                        dateutil.parser.parse(self._went_down_at)
-                except (TypeError, ValueError) as e:
-                    logger.error('Error when parsing '
-                                 '_went_down_at: %s', e)
-                    self._went_down_at = None
+            state = decode_node_state(self._redis.get(
+                self._redis_prefix + REDIS_STATE_KEY_SUFFIX))
+            if state is None:
+                state = self._load_legacy_state(logger)
+
+            self._went_down_at, self._consecutive_blocks_missed, \
+                self._voting_power, self._catching_up, self._no_of_peers = \
+                state
 
             logger.debug(
                 'Restored %s state: _went_down_at=%s, '
@@ -136,15 +193,98 @@ class Node:
                 self.name, self._went_down_at, self._consecutive_blocks_missed,
                 self._voting_power, self._catching_up, self._no_of_peers)
 
-            # Set values
-            self._redis.set_multiple({
-                self._redis_prefix + '_went_down_at': str(self._went_down_at),
-                self._redis_prefix + '_consecutive_blocks_missed':
-                    self._consecutive_blocks_missed,
-                self._redis_prefix + '_voting_power': self._voting_power,
-                self._redis_prefix + '_catching_up': str(self._catching_up),
-                self._redis_prefix + '_no_of_peers': self._no_of_peers
-            })
+            # Set value
+            set_ret = self._redis.set(
+                self._redis_prefix + REDIS_STATE_KEY_SUFFIX,
+                encode_node_state(self._state()))
+
+            # The legacy state is no longer needed once the state is saved
+            if set_ret is not None and self._legacy_state_keys is not None:
+                if self._redis.remove(*self._legacy_state_keys) is not None:
+                    self._legacy_state_keys = None
+
+    def load_signing_window(self, logger: logging.Logger) -> None:
+        # If Redis is enabled, load the signing window (in a single read)
+        if self._redis_enabled:
+            size = self._signing_window.size
+            signed, observed, last_height, stored_size = \
+                self._redis.get_multiple([
+                    self._redis_prefix + REDIS_SIGNED_KEY_SUFFIX,
+                    self._redis_prefix + REDIS_OBSERVED_KEY_SUFFIX,
+                    self._redis_prefix + REDIS_LAST_HEIGHT_KEY_SUFFIX,
+                    self._redis_prefix + REDIS_SIZE_KEY_SUFFIX])
+
+            # A stored window of a different size cannot be reused
+            try:
+                if stored_size is None or int(stored_size) != size:
+                    last_height = None
+                elif last_height is not None:
+                    last_height = int(last_height)
+            except ValueError as e:
+                logger.error('Error when parsing signing window: %s', e)
+                last_height = None
+
+            self._signing_window = SigningWindow.restore(
+                size, signed, observed, last_height)
+
+            logger.debug(
+                'Restored %s signing window: last_height=%s, signed=%s, '
+                'observed=%s', self.name, self._signing_window.last_height,
+                self._signing_window.signed_count,
+                self._signing_window.observed_count)
+
+    def _signing_window_writes(self, logger: logging.Logger) \
+            -> Tuple[Dict[str, Dict[int, int]], Dict[str, StateType]]:
+        # The bits and the values to store for the changes to the signing
+        # window, which are taken from the window
+        window = self._signing_window
+        signed_key = self._redis_prefix + REDIS_SIGNED_KEY_SUFFIX
+        observed_key = self._redis_prefix + REDIS_OBSERVED_KEY_SUFFIX
+        changes = window.take_changes()
+
+        logger.debug('Saving %s signing window: last_height=%s, '
+                     'changed_bits=%s', self.name, window.last_height,
+                     'all' if changes is None else len(changes))
+
+        key_bits = {}
+        key_values = {
+            self._redis_prefix + REDIS_LAST_HEIGHT_KEY_SUFFIX:
+                window.last_height,
+            self._redis_prefix + REDIS_SIZE_KEY_SUFFIX: window.size
+        }
+        if changes is None:
+            key_values[signed_key] = window.signed_bitmap
+            key_values[observed_key] = window.observed_bitmap
+        elif len(changes) > 0:
+            key_bits[signed_key] = {o: s for o, (s, _) in changes.items()}
+            key_bits[observed_key] = {o: ob for o, (_, ob) in changes.items()}
+        return key_bits, key_values
+
+    @staticmethod
+    def save_signing_windows(nodes: List['Node'],
+                             logger: logging.Logger) -> None:
+        # If Redis is enabled, store the changes to the signing windows of
+        # the nodes using one write for the bits and one for the values of
+        # all of them, rather than a round trip per node
+        nodes = [n for n in nodes if n._redis_enabled]
+        if len(nodes) == 0:
+            return
+
+        key_bits = {}
+        key_values = {}
+        for node in nodes:
+            bits, values = node._signing_window_writes(logger)
+            key_bits.update(bits)
+            key_values.update(values)
+
+        redis = nodes[0]._redis
+        if len(key_bits) > 0 and redis.set_bits(key_bits) is None or \
+                redis.set_multiple(key_values) is None:
+            for node in nodes:
+                node._signing_window.invalidate_changes()
+
+    def save_signing_window(self, logger: logging.Logger) -> None:
+        Node.save_signing_windows([self], logger)
 
     def set_as_down(self, channels: ChannelSet, logger: logging.Logger) -> None:
 
@@ -154,7 +294,7 @@ class Node:
         # If node was not down before, do not alert for now, just in case it's
         # a connection hiccup but take note of the start of the downtime
         if not self.is_down:
-            self._went_down_at = datetime.now()
+            self._went_down_at = self._clock.now()
             self._experiencing_delays_alert_sent = False
             self._initial_downtime_alert_sent = False
             self._downtime_initial_alert_delayer.did_task()
@@ -167,7 +307,7 @@ class Node:
         # time has passed for it, then send an initial alert
         elif not self._initial_downtime_alert_sent:
             if self._downtime_initial_alert_delayer.can_do_task():
-                downtime = strfdelta(datetime.now() - self._went_down_at,
+                downtime = strfdelta(self._clock.now() - self._went_down_at,
                                      "{hours}h, {minutes}m, {seconds}s")
                 if self.is_validator:
                     channels.alert_major(CannotAccessNodeAlert(
@@ -181,7 +321,7 @@ class Node:
         # for a reminder alert, then send a reminder alert
         else:
             if self._downtime_reminder_limiter.can_do_task():
-                downtime = strfdelta(datetime.now() - self._went_down_at,
+                downtime = strfdelta(self._clock.now() - self._went_down_at,
                                      "{hours}h, {minutes}m, {seconds}s")
                 if self.is_validator:
                     channels.alert_major(StillCannotAccessNodeAlert(
@@ -200,7 +340,7 @@ class Node:
         if self.is_down:
             # Only send accessible alert if inaccessible alert was sent
             if self._initial_downtime_alert_sent:
-                downtime = strfdelta(datetime.now() - self._went_down_at,
+                downtime = strfdelta(self._clock.now() - self._went_down_at,
                                      "{hours}h, {minutes}m, {seconds}s")
                 channels.alert_info(NowAccessibleAlert(
                     self.name, self._went_down_at, downtime))
@@ -232,7 +372,7 @@ class Node:
         # Alert (varies depending on whether was already missing blocks)
         if not self.is_missing_blocks:
             pass  # Do not alert on first missed block
-        elif 2 <= blocks_missed < danger:
+        elif MISSED_BLOCKS_ALERT_THRESHOLD <= blocks_missed < danger:
             channels.alert_info(MissedBlocksAlert(
                 self.name, blocks_missed, block_height, missing_validators)
             )  # 2+ blocks missed inside danger range
@@ -258,6 +398,50 @@ class Node:
         # Update consecutive blocks missed
         self._consecutive_blocks_missed = blocks_missed
 
+    def record_signing(self, block_height: int, signed: bool,
+                       channels: ChannelSet, logger: logging.Logger) -> bool:
+        # NOTE: This function assumes that the node is a validator
+
+        self._signing_window.record(block_height, signed)
+
+        logger.debug('%s record_signing: height=%s, signed=%s, uptime=%s, '
+                     'blocks=%s', self, block_height, signed,
+                     self._signing_window.uptime,
+                     self._signing_window.observed_count)
+
+        # Whether the uptime has to be checked at the next height even if the
+        # node signs it
+        return self.check_uptime(channels, logger)
+
+    def check_uptime(self, channels: ChannelSet,
+                     logger: logging.Logger) -> bool:
+        # NOTE: This function assumes that the node is a validator
+
+        uptime = self._signing_window.uptime
+        blocks = self._signing_window.observed_count
+
+        # Variable alias for improved readability
+        danger = self._signing_window_uptime_danger_boundary
+
+        # Alert if uptime went below or back above the danger boundary, but
+        # only once enough blocks were observed for the uptime to mean much
+        if blocks < self._signing_window_min_blocks:
+            pass
+        elif uptime < danger and not self._low_uptime_alert_sent:
+            channels.alert_minor(LowUptimeAlert(
+                self.name, uptime, blocks, danger))
+            self._low_uptime_alert_sent = True
+        elif uptime >= danger and self._low_uptime_alert_sent:
+            channels.alert_info(UptimeBackAboveDangerBoundaryAlert(
+                self.name, uptime, blocks, danger))
+            self._low_uptime_alert_sent = False
+
+        # Signing the next height never lowers the uptime, so it can only
+        # cross a boundary if it is below the danger boundary or if there
+        # were not enough blocks yet. Returns whether this is the case.
+        return blocks < self._signing_window_min_blocks or \
+            self._low_uptime_alert_sent
+
     def clear_missed_blocks(self, channels: ChannelSet,
                             logger: logging.Logger) -> None:
         # NOTE: This function assumes that the node is a validator
@@ -265,8 +449,8 @@ class Node:
         logger.debug(
             '%s clear_missed_blocks: channels=%s', self, channels)
 
-        # Alert if validator was missing blocks (only if more than 1 block)
-        if self.is_missing_blocks and self._consecutive_blocks_missed > 1:
+        # Alert if validator was missing blocks (only if it was alerted on)
+        if self._consecutive_blocks_missed >= MISSED_BLOCKS_ALERT_THRESHOLD:
             channels.alert_info(NoLongerMissingBlocksAlert(
                 self.name, self._consecutive_blocks_missed))
 
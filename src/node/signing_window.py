@@ -0,0 +1,202 @@
+from typing import Dict, Optional, Tuple
+
+# Suffixes of the Redis keys of a node's signing window
+REDIS_SIGNED_KEY_SUFFIX = '_signing_window_signed'
+REDIS_OBSERVED_KEY_SUFFIX = '_signing_window_observed'
+REDIS_LAST_HEIGHT_KEY_SUFFIX = '_signing_window_last_height'
+REDIS_SIZE_KEY_SUFFIX = '_signing_window_size'
+
+# Number of set bits in each possible byte value
+_BITS_SET = bytes(bin(b).count('1') for b in range(256))
+
+
+def _bits_set(bitmap: bytes) -> int:
+    return sum(bitmap.translate(_BITS_SET))
+
+
+class SigningWindow:
+    # Keeps track of which of the last `size` heights a validator signed. The
+    # bit for a height is at offset (height % size) in two bitmaps: one that
+    # is set if the validator signed and one that is set if the height was
+    # observed at all (heights can be skipped when the monitor catches up).
+    # The bit order matches Redis' SETBIT, so the bitmaps can be persisted
+    # and restored as they are.
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._signed = bytearray((size + 7) // 8)
+        self._observed = bytearray((size + 7) // 8)
+        self._signed_count = 0
+        self._observed_count = 0
+        self._last_height = None
+
+        # Offsets changed since the last call to take_changes(), or None if
+        # the bitmaps were cleared and need to be persisted as a whole
+        self._changed_offsets = set()
+
+    @staticmethod
+    def restore(size: int, signed: Optional[bytes], observed: Optional[bytes],
+                last_height: Optional[int]) -> 'SigningWindow':
+        window = SigningWindow(size)
+        nbytes = len(window._signed)
+        if last_height is None or signed is None or observed is None \
+                or len(signed) > nbytes or len(observed) > nbytes:
+            return window
+
+        # Redis only stores bitmaps up to the last byte with a set bit
+        window._signed[:len(signed)] = signed
+        window._observed[:len(observed)] = observed
+        window._signed_count = _bits_set(signed)
+        window._observed_count = _bits_set(observed)
+        window._last_height = last_height
+        return window
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def last_height(self) -> Optional[int]:
+        return self._last_height
+
+    @property
+    def signed_count(self) -> int:
+        return self._signed_count
+
+    @property
+    def observed_count(self) -> int:
+        return self._observed_count
+
+    @property
+    def uptime(self) -> Optional[float]:
+        if self._observed_count == 0:
+            return None
+        return 100 * self._signed_count / self._observed_count
+
+    @property
+    def signed_bitmap(self) -> bytes:
+        return bytes(self._signed)
+
+    @property
+    def observed_bitmap(self) -> bytes:
+        return bytes(self._observed)
+
+    def _set_bit(self, offset: int, signed: bool, observed: bool) -> None:
+        index = offset >> 3
+        mask = 0x80 >> (offset & 7)
+
+        was_signed = self._signed[index] & mask != 0
+        was_observed = self._observed[index] & mask != 0
+        self._signed_count += signed - was_signed
+        self._observed_count += observed - was_observed
+
+        if signed:
+            self._signed[index] |= mask
+        else:
+            self._signed[index] &= ~mask
+        if observed:
+            self._observed[index] |= mask
+        else:
+            self._observed[index] &= ~mask
+
+        if self._changed_offsets is not None:
+            self._changed_offsets.add(offset)
+
+    def _set_signed(self, start: int, end: int) -> None:
+        # Sets the signed and observed bits of the offsets from start to end
+        # (exclusive). The bytes between the first and the last byte are set
+        # all at once.
+        first_index = start >> 3
+        last_index = (end - 1) >> 3
+        if first_index == last_index:
+            partial = [(first_index, start & 7, end - 8 * first_index)]
+        else:
+            partial = [(first_index, start & 7, 8),
+                       (last_index, 0, end - 8 * last_index)]
+            old_signed = self._signed[first_index + 1:last_index]
+            old_observed = self._observed[first_index + 1:last_index]
+            self._signed_count += 8 * len(old_signed) - _bits_set(old_signed)
+            self._observed_count += \
+                8 * len(old_observed) - _bits_set(old_observed)
+            self._signed[first_index + 1:last_index] = \
+                b'\xff' * len(old_signed)
+            self._observed[first_index + 1:last_index] = \
+                b'\xff' * len(old_observed)
+
+        for index, first, last in partial:
+            mask = (0xFF >> first) & ~(0xFF >> last) & 0xFF
+            self._signed_count += _BITS_SET[mask & ~self._signed[index]]
+            self._observed_count += _BITS_SET[mask & ~self._observed[index]]
+            self._signed[index] |= mask
+            self._observed[index] |= mask
+
+        if self._changed_offsets is not None:
+            self._changed_offsets.update(range(start, end))
+
+    def _clear(self) -> None:
+        self._signed = bytearray(len(self._signed))
+        self._observed = bytearray(len(self._observed))
+        self._signed_count = 0
+        self._observed_count = 0
+        self._changed_offsets = None
+
+    def record(self, height: int, signed: bool) -> None:
+        if self._last_height is None or height > self._last_height:
+            if self._last_height is not None \
+                    and height - self._last_height > self._size:
+                self._clear()
+            elif self._last_height is not None:
+                # Heights that were skipped are no longer in the window
+                for h in range(self._last_height + 1, height):
+                    self._set_bit(h % self._size, False, False)
+            self._last_height = height
+        elif height <= self._last_height - self._size:
+            return  # Too old to be in the window
+
+        self._set_bit(height % self._size, signed, True)
+
+    def record_signed(self, start_height: int, end_height: int) -> None:
+        # Records that every height from start_height to end_height
+        # (inclusive) was signed, which is the same as recording each of
+        # them in turn but sets the bits in bulk
+        if start_height > end_height:
+            return
+        if self._last_height is None or start_height <= self._last_height:
+            # Only heights after the last height are recorded in bulk
+            for height in range(start_height, end_height + 1):
+                self.record(height, True)
+            return
+
+        self.record(start_height, True)
+        start_height = max(start_height + 1, end_height - self._size + 1)
+        if start_height > end_height:
+            return
+        self._last_height = end_height
+
+        # The offsets of the heights wrap around the end of the bitmaps
+        start = start_height % self._size
+        end = end_height % self._size + 1
+        if start < end:
+            self._set_signed(start, end)
+        else:
+            self._set_signed(start, self._size)
+            self._set_signed(0, end)
+
+    def _bits(self, offset: int) -> Tuple[int, int]:
+        index = offset >> 3
+        shift = 7 - (offset & 7)
+        return (self._signed[index] >> shift) & 1, \
+               (self._observed[index] >> shift) & 1
+
+    def invalidate_changes(self) -> None:
+        # For when persisting the changes failed
+        self._changed_offsets = None
+
+    def take_changes(self) -> Optional[Dict[int, Tuple[int, int]]]:
+        # Returns the (signed, observed) bits of each offset changed since the
+        # last call, or None if the whole bitmaps need to be persisted
+        changed_offsets = self._changed_offsets
+        self._changed_offsets = set()
+        if changed_offsets is None:
+            return None
+        return {offset: self._bits(offset) for offset in changed_offsets}
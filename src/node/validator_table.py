@@ -0,0 +1,128 @@
+import logging
+from typing import Iterator, List, Set
+
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.node.node import Node, MISSED_BLOCKS_ALERT_THRESHOLD
+
+
+def _indices(mask: int) -> Iterator[int]:
+    # The indices of the set bits, from the lowest
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class ValidatorTable:
+    # An indexed table of validators, in which a set of validators is a
+    # bitmap (a Python int with bit i set for validator i). The signers of a
+    # block are evaluated against all validators at once using bitwise
+    # operations, and only the validators whose state changes (those that
+    # missed the block, stopped missing blocks or whose uptime could cross a
+    # boundary) are evaluated individually, so alerts are only materialised
+    # for them. The blocks signed by the other validators are recorded in
+    # their signing windows in bulk, once one of these validators has to be
+    # evaluated or the blocks are flushed. The table keeps track of which
+    # validators are missing blocks, so it has to be the only one recording
+    # the validators' blocks.
+
+    def __init__(self, validators: List[Node]) -> None:
+        self._validators = validators
+
+        # Nodes with the same address share the address' bitmap
+        self._masks = {}
+        for i, v in enumerate(validators):
+            self._masks[v.pubkey] = self._masks.get(v.pubkey, 0) | (1 << i)
+        self._all = (1 << len(validators)) - 1
+
+        self._missing = 0
+        for i, v in enumerate(validators):
+            if v.is_missing_blocks:
+                self._missing |= 1 << i
+        self._uptime_watched = self._all
+
+        # The last height evaluated. Every validator whose signing window
+        # ends before it signed all of the blocks since.
+        self._last_height = None
+
+    def __len__(self) -> int:
+        return len(self._validators)
+
+    def signer_mask(self, signers: Set[str]) -> int:
+        mask = 0
+        for address in signers:
+            mask |= self._masks.get(address, 0)
+        return mask
+
+    def missed_count(self, signers: Set[str]) -> int:
+        return bin(self._all & ~self.signer_mask(signers)).count('1')
+
+    def _flush(self, validator: Node) -> None:
+        window = validator.signing_window
+        if self._last_height is not None and window.last_height is not None \
+                and window.last_height < self._last_height:
+            window.record_signed(window.last_height + 1, self._last_height)
+
+    def flush_signed_blocks(self) -> None:
+        # Records the blocks signed since each validator was last evaluated
+        # in its signing window, e.g. before the windows are saved
+        for v in self._validators:
+            self._flush(v)
+
+    def evaluate_block(self, height: int, summary: BlockSummary,
+                       channels: ChannelSet, logger: logging.Logger) -> None:
+        # Evaluates the signers of the block at the height (i.e. the signers
+        # of the last commit of the next block) for all validators
+        signed = self.signer_mask(summary.signers)
+        missed = self._all & ~signed
+        cleared = self._missing & signed
+
+        logger.debug('Block at height %s missed by %s validator(s) and no '
+                     'longer missed by %s validator(s)', height,
+                     bin(missed).count('1'), bin(cleared).count('1'))
+
+        # If heights were skipped, every validator records the block so that
+        # the skipped heights leave the signing windows. Otherwise, the
+        # uptime of a validator that signed the block (unless it has to be
+        # watched) does not go down, so the block is left to be recorded in
+        # bulk and the uptime is not checked.
+        if self._last_height is None or height != self._last_height + 1:
+            self.flush_signed_blocks()
+            evaluated = self._all
+        else:
+            evaluated = missed | self._uptime_watched
+
+        uptime_watched = 0
+        for i in _indices(evaluated):
+            v = self._validators[i]
+            self._flush(v)
+            if v.record_signing(height, not (missed >> i) & 1, channels,
+                                logger):
+                uptime_watched |= 1 << i
+        self._uptime_watched = uptime_watched
+        self._last_height = height
+
+        # Only the validators whose consecutive missed blocks change
+        for i in _indices(missed):
+            self._validators[i].add_missed_block(
+                height, summary.time, summary.missing, channels, logger)
+        for i in _indices(cleared):
+            self._validators[i].clear_missed_blocks(channels, logger)
+        self._missing = missed
+
+    def clear_missed_blocks_since(self, blocks: int, channels: ChannelSet,
+                                  logger: logging.Logger) -> None:
+        # Clears the missed blocks of the validators that were not alerted on
+        # before the last few blocks, i.e. that missed fewer blocks than the
+        # alert threshold before them. Their danger boundaries are checked
+        # from scratch if they keep missing blocks, while validators that
+        # were already being alerted on keep counting.
+        cleared = 0
+        for i in _indices(self._missing):
+            v = self._validators[i]
+            if v.consecutive_blocks_missed_so_far - blocks < \
+                    MISSED_BLOCKS_ALERT_THRESHOLD:
+                v.clear_missed_blocks(channels, logger)
+                cleared |= 1 << i
+        self._missing &= ~cleared
@@ -0,0 +1,66 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class Clock:
+    # The time as seen by the timing-dependent components: the wall clock
+    # time (for reporting and for times that are persisted), the monotonic
+    # time (for measuring intervals) and sleeping. This is the system clock.
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        # Sleeps until the event is set or for the given time, whichever is
+        # first, and returns whether the event is set
+        return event.wait(seconds)
+
+
+class VirtualClock(Clock):
+    # A clock that only moves when it is advanced, so that timing behaviour
+    # can be tested and simulated without any waiting. Sleeping advances the
+    # clock by the time slept and returns immediately.
+
+    def __init__(self, start: datetime = datetime(2020, 1, 1)) -> None:
+        self._now = start
+        self._monotonic = 0.0
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        # The event can only have been set before the wait started
+        if not event.is_set():
+            self.advance(seconds)
+        return event.is_set()
+
+    def advance(self, seconds: float) -> None:
+        if seconds < 0:
+            raise ValueError('A clock cannot go back in time.')
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+            self._monotonic += seconds
+
+    def advance_to(self, at_time: datetime) -> None:
+        # Times before the current time leave the clock as it is
+        with self._lock:
+            if at_time > self._now:
+                self._monotonic += (at_time - self._now).total_seconds()
+                self._now = at_time
+
+
+SYSTEM_CLOCK = Clock()
@@ -0,0 +1,35 @@
+from typing import Callable, Dict, Hashable, Iterable, List, NamedTuple, \
+    Tuple, TypeVar
+
+from src.utils.config_parsers.user import NodeConfig, RepoConfig
+
+T = TypeVar('T')
+
+
+def node_config_key(node_config: NodeConfig) -> Tuple:
+    # Any change to a node's configuration means that its monitors have to be
+    # restarted, so the whole configuration is part of the key
+    return (node_config.node_name, node_config.node_rpc_url,
+            node_config.node_is_validator, node_config.include_in_node_monitor,
+            node_config.include_in_network_monitor)
+
+
+def repo_config_key(repo_config: RepoConfig) -> Tuple:
+    return (repo_config.repo_name, repo_config.repo_page,
+            repo_config.include_in_github_monitor)
+
+
+class ConfigDiff(NamedTuple):
+    added: Dict[Hashable, T]
+    removed: List[Hashable]
+
+
+def diff_configs(running_keys: Iterable[Hashable], configs: List[T],
+                 key: Callable[[T], Hashable]) -> ConfigDiff:
+    # Returns the configs (by key) that are not running yet, and the keys of
+    # the running configs that are no longer in the list of configs
+    wanted = {key(c): c for c in configs}
+    running_keys = set(running_keys)
+    return ConfigDiff(
+        {k: c for k, c in wanted.items() if k not in running_keys},
+        [k for k in running_keys if k not in wanted])
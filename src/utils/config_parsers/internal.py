@@ -1,6 +1,7 @@
 import configparser
 import sys
 from datetime import timedelta
+from typing import List, Optional
 
 from src.utils.config_parsers.config_parser import ConfigParser
 
@@ -10,16 +11,23 @@ def to_bool(bool_str: str) -> bool:
 
 
 class InternalConfig(ConfigParser):
-    # Use internal_parsed.py rather than creating a new instance of this class
-    def __init__(self, config_file_path: str) -> None:
-        super().__init__([config_file_path])
+    # Use internal_parsed.py rather than creating a new instance of this class.
+    # Any values in the override files replace those in the config file.
+    def __init__(self, config_file_path: str,
+                 override_file_paths: Optional[List[str]] = None) -> None:
+        config_file_paths = [config_file_path] + (override_file_paths or [])
+        super().__init__(config_file_paths)
 
         cp = configparser.ConfigParser()
-        cp.read(config_file_path)
+        cp.read(config_file_paths)
 
         # [logging]
         section = cp['logging']
         self.logging_level = section['logging_level']
+        self.logging_asynchronous = to_bool(section['logging_asynchronous'])
+        self.logging_flush_interval = timedelta(seconds=float(
+            section['logging_flush_interval_seconds']))
+        self.logging_max_batch_size = int(section['logging_max_batch_size'])
 
         self.telegram_commands_general_log_file = section[
             'telegram_commands_general_log_file']
@@ -30,6 +38,10 @@ class InternalConfig(ConfigParser):
         self.node_monitor_general_log_file_template = section[
             'node_monitor_general_log_file_template']
 
+        self.monitors_shared_log_enabled = to_bool(
+            section['monitors_shared_log_enabled'])
+        self.monitors_shared_log_file = section['monitors_shared_log_file']
+
         self.alerts_log_file = section['alerts_log_file']
         self.redis_log_file = section['redis_log_file']
         self.general_log_file = section['general_log_file']
@@ -38,6 +50,76 @@ class InternalConfig(ConfigParser):
         section = cp['twilio']
         self.twiml = section['twiml']
         self.twiml_is_url = to_bool(section['twiml_is_url'])
+        self.twilio_call_coalescing_window = timedelta(seconds=int(
+            section['twilio_call_coalescing_window_seconds']))
+
+        # [alert_outbox]
+        section = cp['alert_outbox']
+        self.alert_outbox_enabled = to_bool(section['alert_outbox_enabled'])
+        self.alert_outbox_file = section['alert_outbox_file']
+        self.alert_outbox_flush_interval = timedelta(seconds=float(
+            section['alert_outbox_flush_interval_seconds']))
+        self.alert_outbox_max_batch_size = int(
+            section['alert_outbox_max_batch_size'])
+        self.alert_outbox_retry_initial_delay = timedelta(seconds=float(
+            section['alert_outbox_retry_initial_delay_seconds']))
+        self.alert_outbox_retry_max_delay = timedelta(seconds=float(
+            section['alert_outbox_retry_max_delay_seconds']))
+        self.alert_outbox_max_age = timedelta(seconds=float(
+            section['alert_outbox_max_age_seconds']))
+
+        # [block_cache]
+        section = cp['block_cache']
+        self.block_cache_enabled = to_bool(section['block_cache_enabled'])
+        self.block_cache_file_template = section['block_cache_file_template']
+        self.block_cache_capacity_blocks = int(
+            section['block_cache_capacity_blocks'])
+        self.block_cache_max_validators = int(
+            section['block_cache_max_validators'])
+
+        # [validator_discovery]
+        section = cp['validator_discovery']
+        self.validator_discovery_enabled = to_bool(
+            section['validator_discovery_enabled'])
+        self.validator_discovery_page_size = int(
+            section['validator_discovery_page_size'])
+
+        # [block_pipeline]
+        section = cp['block_pipeline']
+        self.block_pipeline_fetch_workers = int(
+            section['block_pipeline_fetch_workers'])
+        self.block_pipeline_queue_size = int(
+            section['block_pipeline_queue_size'])
+        self.block_pipeline_max_blocks_per_round = int(
+            section['block_pipeline_max_blocks_per_round'])
+
+        # [metrics]
+        section = cp['metrics']
+        self.metrics_enabled = to_bool(section['metrics_enabled'])
+        self.metrics_host = section['metrics_host']
+        self.metrics_port = int(section['metrics_port'])
+
+        # [profiling]
+        section = cp['profiling']
+        self.profiling_directory = section['profiling_directory']
+        self.profiling_default_duration = float(
+            section['profiling_default_duration_seconds'])
+        self.profiling_max_duration = float(
+            section['profiling_max_duration_seconds'])
+        self.profiling_sampling_interval = float(
+            section['profiling_sampling_interval_seconds'])
+
+        # [rpc_capture]
+        section = cp['rpc_capture']
+        self.rpc_capture_mode = section['rpc_capture_mode']
+        self.rpc_capture_file = section['rpc_capture_file']
+        self.rpc_replay_as_fast_as_possible = to_bool(
+            section['rpc_replay_as_fast_as_possible'])
+
+        # [state_store]
+        section = cp['state_store']
+        self.state_store_backend = section['state_store_backend']
+        self.state_store_sqlite_file = section['state_store_sqlite_file']
 
         # [redis]
         section = cp['redis']
@@ -55,6 +137,8 @@ class InternalConfig(ConfigParser):
             'redis_network_monitor_last_height_key_prefix']
         self.redis_periodic_alive_reminder_mute_key = \
             section['redis_periodic_alive_reminder_mute_key']
+        self.redis_alert_fingerprint_key_prefix = \
+            section['redis_alert_fingerprint_key_prefix']
 
         self.redis_twilio_snooze_key_default_hours = timedelta(hours=float(
             section['redis_twilio_snooze_key_default_hours']))
@@ -80,6 +164,10 @@ class InternalConfig(ConfigParser):
         self.github_monitor_period_seconds = int(
             section['github_monitor_period_seconds'])
 
+        # [startup]
+        section = cp['startup']
+        self.startup_max_workers = int(section['startup_max_workers'])
+
         # [alert_intervals_and_limits]
         section = cp['alert_intervals_and_limits']
         self.downtime_initial_alert_delay = timedelta(seconds=int(
@@ -103,6 +191,17 @@ class InternalConfig(ConfigParser):
             section['github_error_interval_seconds']))
         self.change_in_voting_power_threshold = int(
             section['change_in_voting_power_threshold'])
+        self.alert_deduplication_window = timedelta(seconds=int(
+            section['alert_deduplication_window_seconds']))
+        self.network_incident_missing_validators_fraction = float(
+            section['network_incident_missing_validators_fraction'])
+        self.signing_window_blocks = int(section['signing_window_blocks'])
+        self.signing_window_min_blocks = int(
+            section['signing_window_min_blocks'])
+        self.signing_window_uptime_danger_boundary = float(
+            section['signing_window_uptime_danger_boundary'])
+        self.no_new_blocks_alert_delay = timedelta(seconds=int(
+            section['no_new_blocks_alert_delay_seconds']))
 
         # [links]
         section = cp['links']
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from typing import List, NamedTuple
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_import_times(report: str) -> List[ImportTime]:
+    # Parses the output of `python -X importtime`, which has lines such as
+    # 'import time:       123 |        456 |   some.module'
+    times = []
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # The header line
+        times.append(ImportTime(fields[2].strip(), self_us, cumulative_us))
+    return times
+
+
+def measure_import_times(module: str) -> List[ImportTime]:
+    # The module is imported in a fresh interpreter, so that nothing that
+    # was already imported by the caller is left out
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    return parse_import_times(result.stderr)
@@ -0,0 +1,77 @@
+import json
+import os
+from collections import OrderedDict
+from typing import Callable, Optional, TextIO
+
+# Maps the monitor type and node of a record to the name of the file that
+# the record should be written to, or None if the record should be skipped
+LogFileFor = Callable[[str, str], Optional[str]]
+
+
+class MonitorLogDemultiplexer:
+
+    def __init__(self, output_directory: str, log_file_for: LogFileFor,
+                 max_open_files: int = 64) -> None:
+        self._output_directory = output_directory
+        self._log_file_for = log_file_for
+        self._max_open_files = max_open_files
+
+        # Only a bounded number of files is kept open, least recently used
+        # first, so that the number of file descriptors does not grow with
+        # the number of nodes
+        self._open_files = OrderedDict()
+        self._truncated = set()
+
+        self._lines_written = 0
+        self._lines_skipped = 0
+
+    @property
+    def lines_written(self) -> int:
+        return self._lines_written
+
+    @property
+    def lines_skipped(self) -> int:
+        return self._lines_skipped
+
+    def _file(self, path: str) -> TextIO:
+        if path in self._open_files:
+            self._open_files.move_to_end(path)
+            return self._open_files[path]
+
+        if len(self._open_files) >= self._max_open_files:
+            _, oldest = self._open_files.popitem(last=False)
+            oldest.close()
+
+        # Files are overwritten the first time they are opened, so that
+        # demultiplexing the same log twice does not duplicate records. They
+        # are only ever in the output directory, so the log files that the
+        # monitors write to are left alone.
+        mode = 'a' if path in self._truncated else 'w'
+        self._truncated.add(path)
+        self._open_files[path] = open(path, mode)
+        return self._open_files[path]
+
+    def write(self, line: str) -> None:
+        try:
+            record = json.loads(line)
+            file_name = self._log_file_for(record['monitor'], record['node'])
+        except (ValueError, KeyError):
+            self._lines_skipped += 1
+            return
+
+        if file_name is None:
+            self._lines_skipped += 1
+            return
+        path = os.path.join(self._output_directory,
+                            os.path.basename(file_name))
+
+        # Same format as the per-monitor log files
+        self._file(path).write('{} - {} - {} - {}\n'.format(
+            record['time'], record['node'], record['level'],
+            record['message']))
+        self._lines_written += 1
+
+    def close(self) -> None:
+        for f in self._open_files.values():
+            f.close()
+        self._open_files.clear()
@@ -1,12 +1,165 @@
+import atexit
+import json
 import logging
 import logging.config
 import logging.handlers
+import os
+import queue
+import threading
+from datetime import timedelta
+from typing import Optional
 
 DUMMY_LOGGER = logging.getLogger('dummy')
+MONITORS_LOGGER_NAME = 'monitors'
+LOG_DATE_FORMAT = '%d/%m/%Y %I:%M:%S %p'
 
 
-def create_logger(file: str, name: str, level: str, rotating: bool = False) \
-        -> logging.Logger:
+class _StructuredFormatter(logging.Formatter):
+    # One JSON object per line, so that the shared monitors log can be split
+    # back up by monitor and node (see run_util_demux_monitor_logs.py)
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            'time': self.formatTime(record, self.datefmt),
+            'monitor': getattr(record, 'monitor', record.name),
+            'node': getattr(record, 'node', ''),
+            'level': record.levelname,
+            'message': super().format(record),
+        })
+
+
+class _MonitorFieldsFilter(logging.Filter):
+
+    def __init__(self, monitor: str, node: str) -> None:
+        super().__init__()
+        self._monitor = monitor
+        self._node = node
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.monitor = self._monitor
+        record.node = self._node
+        return True
+
+
+class _DeferredFlushMixin:
+    # StreamHandler.emit flushes the stream after every record. Handlers fed
+    # by the asynchronous writer leave this to the writer, which flushes once
+    # per batch instead.
+
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        super().flush()
+
+
+class _BufferedFileHandler(_DeferredFlushMixin, logging.FileHandler):
+    pass
+
+
+class _BufferedRotatingFileHandler(_DeferredFlushMixin,
+                                   logging.handlers.RotatingFileHandler):
+
+    def __init__(self, filename: str, maxBytes: int, backupCount: int) \
+            -> None:
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount)
+        self._size = os.path.getsize(self.baseFilename) \
+            if os.path.isfile(self.baseFilename) else 0
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        # The size is tracked here rather than asking the stream for it,
+        # since seeking or telling on a text stream flushes its buffer
+        if self.maxBytes <= 0:
+            return False
+        size = len(self.format(record)) + len(self.terminator)
+        if self._size > 0 and self._size + size >= self.maxBytes:
+            self._size = size
+            return True
+        self._size += size
+        return False
+
+
+class _AsyncLogWriter:
+
+    def __init__(self, flush_interval: timedelta,
+                 max_batch_size: int) -> None:
+        self._flush_interval = flush_interval.total_seconds()
+        self._max_batch_size = max_batch_size
+        self._queue = queue.SimpleQueue()
+        self._stopped = object()
+
+        self._thread = threading.Thread(target=self._write_forever,
+                                        daemon=True, name='log-writer')
+        self._thread.start()
+        atexit.register(self.stop)
+
+    @property
+    def queue(self) -> queue.SimpleQueue:
+        return self._queue
+
+    def stop(self) -> None:
+        # Writes out and flushes whatever is still queued
+        self._queue.put(self._stopped)
+        self._thread.join(timeout=5)
+
+    def _write_forever(self) -> None:
+        unflushed = set()
+        while True:
+            # Without anything to flush there is no reason to wake up
+            try:
+                items = [self._queue.get(
+                    timeout=self._flush_interval if unflushed else None)]
+            except queue.Empty:
+                items = []
+            while 0 < len(items) < self._max_batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for item in items:
+                if item is self._stopped:
+                    stop = True
+                    continue
+                handler, record = item
+                handler.handle(record)
+                unflushed.add(handler)
+
+            if stop or len(items) < self._max_batch_size:
+                for handler in unflushed:
+                    handler.flush_batch()
+                unflushed.clear()
+            if stop:
+                return
+
+
+class _WriterQueueHandler(logging.handlers.QueueHandler):
+
+    def __init__(self, writer: _AsyncLogWriter,
+                 target: logging.Handler) -> None:
+        super().__init__(writer.queue)
+        self._target = target
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # The writer needs to know which file each record goes to
+        self.queue.put_nowait((self._target, record))
+
+
+_async_writer: Optional[_AsyncLogWriter] = None
+_shared_monitor_logger_lock = threading.Lock()
+
+
+def enable_async_logging(flush_interval: timedelta,
+                         max_batch_size: int) -> None:
+    # Only affects loggers created after this is called
+    global _async_writer
+    if _async_writer is None:
+        _async_writer = _AsyncLogWriter(flush_interval, max_batch_size)
+
+
+def create_logger(file: str, name: str, level: str, rotating: bool = False,
+                  structured: bool = False) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
@@ -14,18 +167,49 @@ def create_logger(file: str, name: str, level: str, rotating: bool = False) \
     if len(logger.handlers) == 1:
         return logger
 
-    if rotating:
+    asynchronous = _async_writer is not None
+    if rotating and asynchronous:
+        handler = _BufferedRotatingFileHandler(
+            file, maxBytes=10000000, backupCount=3)
+    elif rotating:
         handler = logging.handlers.RotatingFileHandler(
             file, maxBytes=10000000, backupCount=3)
+    elif asynchronous:
+        handler = _BufferedFileHandler(file)
     else:
         handler = logging.FileHandler(file)
 
-    formatter = logging.Formatter(
-        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%d/%m/%Y %I:%M:%S %p')
+    if structured:
+        formatter = _StructuredFormatter(datefmt=LOG_DATE_FORMAT)
+    else:
+        formatter = logging.Formatter(
+            fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt=LOG_DATE_FORMAT)
 
     handler.setFormatter(formatter)
 
-    logger.addHandler(handler)
+    if asynchronous:
+        logger.addHandler(_WriterQueueHandler(_async_writer, handler))
+    else:
+        logger.addHandler(handler)
+
+    return logger
+
+
+def create_shared_monitor_logger(file: str, monitor: str, node: str,
+                                 level: str) -> logging.Logger:
+    # All monitors log through a single handler (and file) owned by the
+    # shared monitors logger. Each monitor gets a child logger without a
+    # handler of its own, which only tags its records with the monitor type
+    # and node, so file descriptors do not grow with the number of nodes.
+    with _shared_monitor_logger_lock:
+        create_logger(file, MONITORS_LOGGER_NAME, level, rotating=True,
+                      structured=True)
+
+    logger = logging.getLogger('{}.{}.{}'.format(
+        MONITORS_LOGGER_NAME, monitor, node))
+    logger.setLevel(level)
+    if len(logger.filters) == 0:
+        logger.addFilter(_MonitorFieldsFilter(monitor, node))
 
     return logger
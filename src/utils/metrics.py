@@ -0,0 +1,273 @@
+import abc
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Sequence, Tuple
+
+# Bucket upper bounds (in seconds) of latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(label_value: str) -> str:
+    return label_value.replace('\\', '\\\\').replace('\n', '\\n') \
+        .replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if len(names) == 0:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(n, _escape(v))
+                          for n, v in zip(names, values)) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(abc.ABC):
+    # A metric with zero or more labels. The child of each combination of
+    # label values is created once and can be kept by the caller, so that
+    # recording a value only costs an increment under the child's lock.
+
+    _type = None
+
+    def __init__(self, name: str, documentation: str,
+                 label_names: Sequence[str] = ()) -> None:
+        self._name = name
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @abc.abstractmethod
+    def _new_child(self):
+        pass
+
+    def labels(self, *label_values: str):
+        child = self._children.get(label_values)
+        if child is None:
+            if len(label_values) != len(self._label_names):
+                raise ValueError('{} expects labels {}.'.format(
+                    self._name, self._label_names))
+            with self._lock:
+                child = self._children.setdefault(label_values,
+                                                  self._new_child())
+        return child
+
+    def _child_samples(self, labels: str, child) -> List[str]:
+        return ['{}{} {}'.format(self._name, labels,
+                                 _format_value(child.value))]
+
+    def render(self) -> List[str]:
+        lines = ['# HELP {} {}'.format(self._name, self._documentation),
+                 '# TYPE {} {}'.format(self._name, self._type)]
+        for label_values, child in sorted(self._children.items()):
+            lines.extend(self._child_samples(
+                _format_labels(self._label_names, label_values), child))
+        return lines
+
+
+class _CounterChild:
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    _type = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+
+class _GaugeChild:
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        # A single assignment, so no lock is needed
+        self.value = value
+
+
+class Gauge(_Metric):
+    _type = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+
+class _HistogramChild:
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._buckets = buckets
+        # One count per bucket, plus one for values above the last bucket.
+        # Counts are not cumulative until they are rendered.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    _type = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, label_names)
+        self._buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._buckets)
+
+    def _child_samples(self, labels: str, child: _HistogramChild) \
+            -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float('inf'),), counts):
+            cumulative += count
+            bucket_labels = labels[:-1] + ',' if labels else '{'
+            lines.append('{}_bucket{}le="{}"}} {}'.format(
+                self._name, bucket_labels, _format_value(bound), cumulative))
+        lines.append('{}_sum{} {}'.format(self._name, labels,
+                                          _format_value(total)))
+        lines.append('{}_count{} {}'.format(self._name, labels, cumulative))
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self) -> None:
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        # Registering a metric twice returns the existing one, so that
+        # modules can define their metrics without worrying about reloads
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str,
+                label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str,
+              label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str,
+                  label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(
+            Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Metrics are always recorded, since doing so is cheap, but are only served
+# if the metrics endpoint is enabled
+REGISTRY = MetricsRegistry()
+
+RPC_REQUEST_DURATION = REGISTRY.histogram(
+    'panic_rpc_request_duration_seconds',
+    'Duration of requests to node RPC and GitHub endpoints.', ['endpoint'])
+MONITOR_LOOP_DURATION = REGISTRY.histogram(
+    'panic_monitor_loop_duration_seconds',
+    'Duration of a single monitoring round.', ['monitor'])
+MONITOR_LOOP_OVERRUNS = REGISTRY.counter(
+    'panic_monitor_loop_overruns_total',
+    'Monitoring rounds that took longer than the monitoring period.',
+    ['monitor'])
+BLOCK_CHECK_DURATION = REGISTRY.histogram(
+    'panic_block_check_duration_seconds',
+    'Duration of evaluating a single block in the network monitor.',
+    ['monitor'])
+BLOCKS_BEHIND = REGISTRY.gauge(
+    'panic_network_blocks_behind',
+    'Blocks between the last checked block and the chain tip.', ['monitor'])
+BLOCK_PIPELINE_QUEUE_DEPTH = REGISTRY.gauge(
+    'panic_block_pipeline_queue_depth',
+    'Blocks waiting for each stage of the network monitor\'s pipeline.',
+    ['monitor', 'stage'])
+ALERTS_RAISED = REGISTRY.counter(
+    'panic_alerts_total',
+    'Alerts raised (after deduplication), by type and severity.',
+    ['type', 'severity'])
+ALERTS_SUPPRESSED = REGISTRY.counter(
+    'panic_alerts_suppressed_total',
+    'Duplicate alerts suppressed by deduplication, by type and severity.',
+    ['type', 'severity'])
+CHANNEL_SEND_DURATION = REGISTRY.histogram(
+    'panic_channel_send_duration_seconds',
+    'Time taken by a channel to accept an alert.', ['channel'])
+OUTBOX_DELIVERY_DURATION = REGISTRY.histogram(
+    'panic_outbox_delivery_duration_seconds',
+    'Time taken to deliver an alert journalled in the alert outbox.',
+    ['channel'])
+# Only has a value once Redis is initialised, so it is absent (rather than
+# 0) if Redis is disabled
+REDIS_UP = REGISTRY.gauge(
+    'panic_redis_up', 'Whether Redis was reachable the last time it was used.')
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split('?', 1)[0] not in ['/', '/metrics']:
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # Scrapes are not logged
+
+
+def start_metrics_server(host: str, port: int, logger: logging.Logger,
+                         registry: MetricsRegistry = REGISTRY) \
+        -> ThreadingHTTPServer:
+    handler = type('MetricsRequestHandler', (_MetricsRequestHandler,),
+                   {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info('Serving metrics on http://%s:%s/metrics.', host,
+                server.server_address[1])
+    return server
+
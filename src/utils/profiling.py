@@ -0,0 +1,117 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from types import FrameType
+from typing import Counter, Dict, Optional
+
+# Number of frames kept by tracemalloc for each allocation
+_TRACEMALLOC_FRAMES = 25
+
+
+def _frame_name(frame: FrameType) -> str:
+    return '{} ({})'.format(frame.f_code.co_name, frame.f_code.co_filename)
+
+
+def _folded_stack(thread_name: str, frame: Optional[FrameType]) -> str:
+    # Stacks are folded root first, as expected by flamegraph tools
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ';'.join(reversed(names))
+
+
+def sample_stacks(duration: float, interval: float) -> Counter[str]:
+    # Samples the stacks of all threads (other than the calling one) every
+    # interval for the duration, and counts how often each stack was seen
+    samples = collections.Counter()
+    own_id = threading.get_ident()
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != own_id:
+                samples[_folded_stack(names.get(thread_id, str(thread_id)),
+                                      frame)] += 1
+        time.sleep(interval)
+    return samples
+
+
+def fold_memory_snapshot(snapshot: tracemalloc.Snapshot) -> Dict[str, int]:
+    # Folds the allocations that are still alive into stacks weighted by
+    # their size in bytes, so that they can also be shown as a flamegraph
+    stacks = {}
+    for stat in snapshot.statistics('traceback'):
+        stack = ';'.join('{}:{}'.format(f.filename, f.lineno)
+                         for f in stat.traceback)  # Oldest frame first
+        stacks[stack] = stacks.get(stack, 0) + stat.size
+    return stacks
+
+
+def write_folded(path: str, stacks: Dict[str, int]) -> None:
+    with open(path, 'w') as f:
+        for stack, count in sorted(stacks.items(), key=lambda s: -s[1]):
+            f.write('{} {}\n'.format(stack, count))
+
+
+class Profiler:
+    # Captures a time-bounded profile of the running process in the
+    # background: a sampling profile of all threads, and a snapshot of the
+    # memory that was allocated (and not freed) while profiling. Both are
+    # written in the folded stack format, as used by flamegraph.pl and
+    # speedscope. Only one profile is captured at a time.
+
+    def __init__(self, directory: str, sampling_interval: float,
+                 max_duration: float, logger: logging.Logger) -> None:
+        self._directory = directory
+        self._sampling_interval = sampling_interval
+        self._max_duration = max_duration
+        self._logger = logger
+        self._lock = threading.Lock()
+
+    @property
+    def max_duration(self) -> float:
+        return self._max_duration
+
+    def start(self, duration: float) -> bool:
+        # Returns False if a profile is already being captured. This does not
+        # block, so that it can be called from a signal handler.
+        if not self._lock.acquire(blocking=False):
+            return False
+        duration = min(duration, self._max_duration)
+        threading.Thread(target=self._profile, args=(duration,),
+                         daemon=True).start()
+        return True
+
+    def _profile(self, duration: float) -> None:
+        try:
+            self._logger.info('Profiling for %s seconds.', duration)
+            prefix = os.path.join(self._directory, 'profile_{}'.format(
+                datetime.now().strftime('%Y%m%d_%H%M%S')))
+            os.makedirs(self._directory, exist_ok=True)
+
+            # Memory is only traced while profiling, unless it already was
+            was_tracing = tracemalloc.is_tracing()
+            if not was_tracing:
+                tracemalloc.start(_TRACEMALLOC_FRAMES)
+            try:
+                samples = sample_stacks(duration, self._sampling_interval)
+                snapshot = tracemalloc.take_snapshot()
+            finally:
+                if not was_tracing:
+                    tracemalloc.stop()
+
+            files = [prefix + '_cpu.folded', prefix + '_memory.folded']
+            write_folded(files[0], samples)
+            write_folded(files[1], fold_memory_snapshot(snapshot))
+            self._logger.info('Profile written to %s.', ', '.join(files))
+        except Exception as e:
+            self._logger.error('Error when profiling: %s', e)
+        finally:
+            self._lock.release()
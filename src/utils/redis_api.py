@@ -1,80 +1,60 @@
 import logging
 from datetime import timedelta
-from typing import Dict, Optional, Union, List
+from typing import Callable, Dict, Optional, List
 
-import redis
+from src.utils.metrics import REDIS_UP
+from src.utils.state_store import StateStore, StateType
 
-from src.utils.timing import TimedTaskLimiter
+RedisType = StateType
 
-RedisType = Union[bytes, str, int, float]
+# Characters that have a special meaning in the patterns of KEYS and SCAN
+_PATTERN_SPECIAL_CHARACTERS = '\\*?[]'
 
 
-class RedisApi:
+class RedisApi(StateStore):
+
+    _name = 'Redis'
 
     def __init__(self, logger: logging.Logger, db: int,
                  host: str = 'localhost', port: int = 6379,
                  password: str = '', namespace: str = '',
                  live_check_time_interval: timedelta = timedelta(seconds=60)) \
             -> None:
-        self._logger = logger
+        # Imported here so that redis is only loaded if Redis is enabled
+        import redis
+
         if password == '':
             self._redis = redis.Redis(host=host, port=port, db=db)
         else:
             self._redis = redis.Redis(host=host, port=port, db=db,
                                       password=password)
-        self._namespace = namespace
-
-        # The live check limiter means that we don't wait for connection
-        # errors to occur to be able to continue, thus speeding everything up
-        self._live_check_limiter = TimedTaskLimiter(live_check_time_interval)
-        self._is_live = True  # This is necessary to initialise the variable
-        self._set_as_live()
+        self._errors = (redis.RedisError, ConnectionResetError)
+        super().__init__(logger, namespace, live_check_time_interval)
 
         self._logger.info('Redis initialised.')
 
-    @property
-    def is_live(self) -> bool:
-        return self._is_live
-
-    def _add_namespace(self, key: str) -> str:
-        if not key.startswith(self._namespace + ':'):
-            return self._namespace + ':' + key
-        else:
-            return key  # prevent adding namespace twice
-
-    def _remove_namespace(self, key: str) -> str:
-        if not key.startswith(self._namespace + ':'):
-            return key  # prevent removing namespace twice
-        else:
-            return key.replace(self._namespace + ':', '', 1)
+    def _namespace_pattern(self) -> str:
+        # Matches all keys in the namespace, even if the namespace contains
+        # characters that have a special meaning in patterns
+        namespace = ''.join('\\' + c if c in _PATTERN_SPECIAL_CHARACTERS else c
+                            for c in self._namespace)
+        return namespace + ':*'
 
     def _set_as_live(self) -> None:
-        if not self._is_live:
-            self._logger.info('Redis is now accessible again.')
-        self._is_live = True
+        super()._set_as_live()
+        REDIS_UP.labels().set(1)
 
     def _set_as_down(self) -> None:
-        # If Redis is live or if we can check whether it is live (because the
-        # live check time interval has passed), reset the live check limiter
-        # so that usage of Redis is skipped for as long as the time interval
-        if self._is_live or self._live_check_limiter.can_do_task():
-            self._live_check_limiter.did_task()
-            self._logger.warning('Redis is unusable for some reason. Stopping '
-                                 'usage temporarily to improve performance.')
-        self._is_live = False
-
-    def _do_not_use_if_recently_went_down(self) -> bool:
-        # If Redis is not live and cannot check if it is live (by using it)
-        # then stop the function called from happening by returning True
-        return not self._is_live and not self._live_check_limiter.can_do_task()
-
-    def set_unsafe(self, key: str, value: RedisType):
+        super()._set_as_down()
+        REDIS_UP.labels().set(0)
+
+    def set_unsafe(self, key: str, value: StateType):
         key = self._add_namespace(key)
 
         set_ret = self._redis.set(key, value)
         return set_ret
 
-    def set_multiple_unsafe(self, key_values: Dict[str, RedisType]):
+    def set_multiple_unsafe(self, key_values: Dict[str, StateType]):
         # Add namespace to keys
         keys = list(key_values.keys())
         unique_keys = [self._add_namespace(k) for k in keys]
@@ -88,7 +68,7 @@ class RedisApi:
         exec_ret = pipe.execute()
         return exec_ret
 
-    def set_for_unsafe(self, key: str, value: RedisType, time: timedelta):
+    def set_for_unsafe(self, key: str, value: StateType, time: timedelta):
         key = self._add_namespace(key)
 
         pipe = self._redis.pipeline()
@@ -102,30 +82,37 @@ class RedisApi:
 
         if self.exists_unsafe(key):
             get_ret = self._redis.get(key)
-            if get_ret.decode('UTF-8') == 'None':
+            if get_ret == b'None':  # values may be binary, so not decoded
                 return None
             else:
                 return get_ret
         else:
             return default
 
-    def get_int_unsafe(self, key: str, default=None) -> Optional[int]:
-        key = self._add_namespace(key)
+    def get_multiple_unsafe(self, keys: List[str]) -> List[Optional[bytes]]:
+        if len(keys) == 0:
+            return []  # MGET needs at least one key
+        keys = [self._add_namespace(k) for k in keys]
 
-        get_ret = self.get_unsafe(key, None)
-        try:
-            return int(get_ret) if get_ret is not None else default
-        except ValueError:
-            self._logger.error(
-                'Could not convert value %s of key %s to an integer. '
-                'Defaulting to value %s.', get_ret, key, default)
-            return default
+        # Values are returned as they are (e.g. binary bitmaps), in one read
+        mget_ret = self._redis.mget(keys)
+        return mget_ret
 
-    def get_bool_unsafe(self, key: str, default=None) -> Optional[bool]:
+    def set_bits_unsafe(self, key_bits: Dict[str, Dict[int, int]]):
+        # Set multiple bits of multiple bitmaps
+        pipe = self._redis.pipeline()
+        for key, bits in key_bits.items():
+            key = self._add_namespace(key)
+            for offset, value in bits.items():
+                pipe.setbit(key, offset, value)
+        exec_ret = pipe.execute()
+        return exec_ret
+
+    def bitcount_unsafe(self, key: str) -> int:
         key = self._add_namespace(key)
 
-        get_ret = self.get_unsafe(key, None)
-        return (get_ret.decode() == 'True') if get_ret is not None else default
+        bitcount_ret = self._redis.bitcount(key)
+        return bitcount_ret
 
     def exists_unsafe(self, key: str) -> bool:
         key = self._add_namespace(key)
@@ -153,141 +140,29 @@ class RedisApi:
         flushdb_ret = self._redis.flushdb()
         return flushdb_ret
 
-    def set(self, key: str, value: RedisType):
-        key = self._add_namespace(key)
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return None
-            ret = self.set_unsafe(key, value)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in set: %s', e)
-            self._set_as_down()
-            return None
-
-    def set_multiple(self, key_values: Dict[str, RedisType]):
-        # Add namespace to keys
-        keys = list(key_values.keys())
-        unique_keys = [self._add_namespace(k) for k in keys]
-        for k, uk in zip(keys, unique_keys):
-            key_values[uk] = key_values.pop(k)
-
-        # Set multiple
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return None
-            ret = self.set_multiple_unsafe(key_values)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in set_multiple: %s', e)
-            self._set_as_down()
-            return None
-
-    def set_for(self, key: str, value: RedisType, time: timedelta):
-        key = self._add_namespace(key)
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return None
-            ret = self.set_for_unsafe(key, value, time)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in set_for: %s', e)
-            self._set_as_down()
-            return None
-
-    def get(self, key: str, default=None) -> Optional[bytes]:
-        key = self._add_namespace(key)
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return default
-            ret = self.get_unsafe(key, default)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in get: %s', e)
-            self._set_as_down()
-            return default
-
-    def get_int(self, key: str, default=None) -> Optional[int]:
-        key = self._add_namespace(key)
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return default
-            ret = self.get_int_unsafe(key, default)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in get_int: %s', e)
-            self._set_as_down()
-            return default
-
-    def get_bool(self, key: str, default=None) -> Optional[bool]:
-        key = self._add_namespace(key)
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return default
-            ret = self.get_bool_unsafe(key, default)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in get_bool: %s', e)
-            self._set_as_down()
-            return default
-
-    def exists(self, key: str) -> bool:
-        key = self._add_namespace(key)
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return False
-            ret = self.exists_unsafe(key)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in exists: %s', e)
-            self._set_as_down()
-            return False
-
-    def get_keys(self, pattern: str = "*") -> List[str]:
-        pattern = self._add_namespace(pattern)
-
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return []
-            ret = self.get_keys_unsafe(pattern)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in get_keys: %s', e)
-            self._set_as_down()
-            return []
-
-    def remove(self, *keys):
-        keys = [self._add_namespace(k) for k in keys]
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return None
-            ret = self.remove_unsafe(*keys)
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in remove: %s', e)
-            self._set_as_down()
-            return None
-
-    def delete_all(self):
-        try:
-            if self._do_not_use_if_recently_went_down():
-                return None
-            ret = self.delete_all_unsafe()
-            self._set_as_live()
-            return ret
-        except Exception as e:
-            self._logger.error('Redis error in delete_all: %s', e)
-            self._set_as_down()
-            return None
+    def delete_namespace_unsafe(
+            self, batch_size: int = 1000,
+            progress: Optional[Callable[[int], None]] = None) -> int:
+        # Unlike delete_all_unsafe, this only deletes the keys in the
+        # namespace, and never blocks Redis for long. Keys are found
+        # incrementally using SCAN and deleted in batches using UNLINK, which
+        # frees their memory in the background. The progress callback is
+        # given the number of keys deleted so far after every batch.
+        deleted = 0
+        batch = []
+        for key in self._redis.scan_iter(match=self._namespace_pattern(),
+                                         count=batch_size):
+            batch.append(key)
+            if len(batch) == batch_size:
+                deleted += self._redis.unlink(*batch)
+                batch = []
+                if progress is not None:
+                    progress(deleted)
+        if len(batch) > 0:
+            deleted += self._redis.unlink(*batch)
+            if progress is not None:
+                progress(deleted)
+        return deleted
 
     def ping_unsafe(self) -> bool:
         return self._redis.ping()
@@ -0,0 +1,87 @@
+import struct
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+# Every encoded state starts with its version, so that the layout can change
+# without old state being misread. State of an unknown version is ignored.
+STATE_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Version, flags, went down at, consecutive blocks missed, voting power and
+# number of peers. Times are microseconds since the epoch, so they are exact.
+_NODE_STATE = struct.Struct('<BBqIqI')
+_NODE_WENT_DOWN = 1
+_NODE_HAS_VOTING_POWER = 2
+_NODE_CATCHING_UP = 4
+_NODE_HAS_NO_OF_PEERS = 8
+
+# Version and alive at. The last height checked by a network monitor is
+# kept under its own key, which outlives this state.
+_MONITOR_STATE = struct.Struct('<Bq')
+
+
+class NodeState(NamedTuple):
+    went_down_at: Optional[datetime]
+    consecutive_blocks_missed: int
+    voting_power: Optional[int]
+    catching_up: bool
+    no_of_peers: Optional[int]
+
+
+class MonitorState(NamedTuple):
+    alive_at: datetime
+
+
+def _to_micros(time: datetime) -> int:
+    return (time - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + micros * _MICROSECOND
+
+
+def encode_node_state(state: NodeState) -> bytes:
+    flags = 0
+    went_down_at = 0
+    if state.went_down_at is not None:
+        flags |= _NODE_WENT_DOWN
+        went_down_at = _to_micros(state.went_down_at)
+    if state.voting_power is not None:
+        flags |= _NODE_HAS_VOTING_POWER
+    if state.catching_up:
+        flags |= _NODE_CATCHING_UP
+    if state.no_of_peers is not None:
+        flags |= _NODE_HAS_NO_OF_PEERS
+    return _NODE_STATE.pack(
+        STATE_VERSION, flags, went_down_at, state.consecutive_blocks_missed,
+        state.voting_power or 0, state.no_of_peers or 0)
+
+
+def decode_node_state(encoded: Optional[bytes]) -> Optional[NodeState]:
+    # None if there is no state or if it is not of the current version
+    if encoded is None or len(encoded) != _NODE_STATE.size \
+            or encoded[0] != STATE_VERSION:
+        return None
+    _, flags, went_down_at, consecutive_blocks_missed, voting_power, \
+        no_of_peers = _NODE_STATE.unpack(encoded)
+    return NodeState(
+        _from_micros(went_down_at) if flags & _NODE_WENT_DOWN else None,
+        consecutive_blocks_missed,
+        voting_power if flags & _NODE_HAS_VOTING_POWER else None,
+        bool(flags & _NODE_CATCHING_UP),
+        no_of_peers if flags & _NODE_HAS_NO_OF_PEERS else None)
+
+
+def encode_monitor_state(state: MonitorState) -> bytes:
+    return _MONITOR_STATE.pack(STATE_VERSION, _to_micros(state.alive_at))
+
+
+def decode_monitor_state(encoded: Optional[bytes]) -> Optional[MonitorState]:
+    # None if there is no state or if it is not of the current version
+    if encoded is None or len(encoded) != _MONITOR_STATE.size \
+            or encoded[0] != STATE_VERSION:
+        return None
+    _, alive_at = _MONITOR_STATE.unpack(encoded)
+    return MonitorState(_from_micros(alive_at))
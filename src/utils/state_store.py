@@ -0,0 +1,689 @@
+import abc
+import fnmatch
+import logging
+import os
+import sqlite3
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple, Type, Union
+
+from src.utils.clock import Clock, SYSTEM_CLOCK
+from src.utils.timing import TimedTaskLimiter
+
+StateType = Union[bytes, str, int, float]
+
+# Maximum number of keys read or deleted using a single SQLite statement
+_SQLITE_MAX_KEYS_PER_STATEMENT = 500
+
+
+def _to_bytes(value: StateType) -> bytes:
+    # Values are stored as Redis would store them
+    if isinstance(value, bytes):
+        return value
+    elif isinstance(value, str):
+        return value.encode('utf-8')
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode('utf-8')
+    raise TypeError('Invalid value type {}. Convert the value to bytes, a '
+                    'string, an integer or a float first.'.format(
+                     type(value).__name__))
+
+
+def _set_bits(bitmap: bytearray, bits: Dict[int, int]) -> bytearray:
+    # Same bit order as Redis' SETBIT, in which offset 0 is the most
+    # significant bit of the first byte. The bitmap grows as needed.
+    for offset, value in bits.items():
+        if (offset >> 3) >= len(bitmap):
+            bitmap.extend(bytes((offset >> 3) + 1 - len(bitmap)))
+        if value:
+            bitmap[offset >> 3] |= 0x80 >> (offset & 7)
+        else:
+            bitmap[offset >> 3] &= ~(0x80 >> (offset & 7)) & 0xFF
+    return bitmap
+
+
+def _bitcount(bitmap: Optional[bytes]) -> int:
+    return 0 if bitmap is None \
+        else bin(int.from_bytes(bitmap, 'big')).count('1')
+
+
+class StateStore(abc.ABC):
+    # A key-value store for the alerter's state, which is Redis, SQLite or
+    # memory. Keys are namespaced by the alerter's identifier. The unsafe
+    # methods raise any error as it is. The other methods catch and log the
+    # error instead, and stop using the store for a while once it fails, so
+    # that an unusable store does not slow everything down. A store has to
+    # implement all of the abstract unsafe methods to be created.
+
+    _name = 'State store'
+    _errors = ()
+
+    def __init__(self, logger: logging.Logger, namespace: str = '',
+                 live_check_time_interval: timedelta = timedelta(seconds=60)) \
+            -> None:
+        self._logger = logger
+        self._namespace = namespace
+
+        # The live check limiter means that we don't wait for errors to occur
+        # to be able to continue, thus speeding everything up
+        self._live_check_limiter = TimedTaskLimiter(live_check_time_interval)
+        self._is_live = True  # This is necessary to initialise the variable
+        self._set_as_live()
+
+    @property
+    def is_live(self) -> bool:
+        return self._is_live
+
+    @property
+    def errors(self) -> Tuple[Type[Exception], ...]:
+        # The errors raised by the unsafe methods when the store is unusable
+        return self._errors
+
+    def _add_namespace(self, key: str) -> str:
+        if not key.startswith(self._namespace + ':'):
+            return self._namespace + ':' + key
+        else:
+            return key  # prevent adding namespace twice
+
+    def _remove_namespace(self, key: str) -> str:
+        if not key.startswith(self._namespace + ':'):
+            return key  # prevent removing namespace twice
+        else:
+            return key.replace(self._namespace + ':', '', 1)
+
+    def _in_namespace(self, key: str) -> bool:
+        return key.startswith(self._namespace + ':')
+
+    def _set_as_live(self) -> None:
+        if not self._is_live:
+            self._logger.info('%s is now accessible again.', self._name)
+        self._is_live = True
+
+    def _set_as_down(self) -> None:
+        # If the store is live or if we can check whether it is live (because
+        # the live check time interval has passed), reset the live check
+        # limiter so that usage of the store is skipped for as long as the
+        # time interval
+        if self._is_live or self._live_check_limiter.can_do_task():
+            self._live_check_limiter.did_task()
+            self._logger.warning('%s is unusable for some reason. Stopping '
+                                 'usage temporarily to improve performance.',
+                                 self._name)
+        self._is_live = False
+
+    def _do_not_use_if_recently_went_down(self) -> bool:
+        # If the store is not live and cannot check if it is live (by using
+        # it) then stop the function called from happening by returning True
+        return not self._is_live and not self._live_check_limiter.can_do_task()
+
+    @abc.abstractmethod
+    def set_unsafe(self, key: str, value: StateType):
+        pass
+
+    @abc.abstractmethod
+    def set_multiple_unsafe(self, key_values: Dict[str, StateType]):
+        pass
+
+    @abc.abstractmethod
+    def set_for_unsafe(self, key: str, value: StateType, time: timedelta):
+        pass
+
+    @abc.abstractmethod
+    def get_unsafe(self, key: str, default=None) -> Optional[bytes]:
+        pass
+
+    @abc.abstractmethod
+    def get_multiple_unsafe(self, keys: List[str]) -> List[Optional[bytes]]:
+        pass
+
+    def get_int_unsafe(self, key: str, default=None) -> Optional[int]:
+        key = self._add_namespace(key)
+
+        get_ret = self.get_unsafe(key, None)
+        try:
+            return int(get_ret) if get_ret is not None else default
+        except ValueError:
+            self._logger.error(
+                'Could not convert value %s of key %s to an integer. '
+                'Defaulting to value %s.', get_ret, key, default)
+            return default
+
+    def get_bool_unsafe(self, key: str, default=None) -> Optional[bool]:
+        key = self._add_namespace(key)
+
+        get_ret = self.get_unsafe(key, None)
+        return (get_ret.decode() == 'True') if get_ret is not None else default
+
+    @abc.abstractmethod
+    def set_bits_unsafe(self, key_bits: Dict[str, Dict[int, int]]):
+        pass
+
+    @abc.abstractmethod
+    def bitcount_unsafe(self, key: str) -> int:
+        pass
+
+    @abc.abstractmethod
+    def exists_unsafe(self, key: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def get_keys_unsafe(self, pattern: str = "*") -> List[str]:
+        pass
+
+    @abc.abstractmethod
+    def remove_unsafe(self, *keys):
+        pass
+
+    @abc.abstractmethod
+    def delete_all_unsafe(self):
+        pass
+
+    @abc.abstractmethod
+    def delete_namespace_unsafe(
+            self, batch_size: int = 1000,
+            progress: Optional[Callable[[int], None]] = None) -> int:
+        pass
+
+    @abc.abstractmethod
+    def ping_unsafe(self) -> bool:
+        pass
+
+    def set(self, key: str, value: StateType):
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.set_unsafe(key, value)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in set: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def set_multiple(self, key_values: Dict[str, StateType]):
+        # Add namespace to keys
+        keys = list(key_values.keys())
+        unique_keys = [self._add_namespace(k) for k in keys]
+        for k, uk in zip(keys, unique_keys):
+            key_values[uk] = key_values.pop(k)
+
+        # Set multiple
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.set_multiple_unsafe(key_values)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in set_multiple: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def set_for(self, key: str, value: StateType, time: timedelta):
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.set_for_unsafe(key, value, time)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in set_for: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def get(self, key: str, default=None) -> Optional[bytes]:
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return default
+            ret = self.get_unsafe(key, default)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in get: %s', self._name, e)
+            self._set_as_down()
+            return default
+
+    def get_multiple(self, keys: List[str]) -> List[Optional[bytes]]:
+        keys = [self._add_namespace(k) for k in keys]
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return [None] * len(keys)
+            ret = self.get_multiple_unsafe(keys)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in get_multiple: %s', self._name, e)
+            self._set_as_down()
+            return [None] * len(keys)
+
+    def get_int(self, key: str, default=None) -> Optional[int]:
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return default
+            ret = self.get_int_unsafe(key, default)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in get_int: %s', self._name, e)
+            self._set_as_down()
+            return default
+
+    def get_bool(self, key: str, default=None) -> Optional[bool]:
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return default
+            ret = self.get_bool_unsafe(key, default)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in get_bool: %s', self._name, e)
+            self._set_as_down()
+            return default
+
+    def set_bits(self, key_bits: Dict[str, Dict[int, int]]):
+        key_bits = {self._add_namespace(k): b for k, b in key_bits.items()}
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.set_bits_unsafe(key_bits)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in set_bits: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def bitcount(self, key: str) -> Optional[int]:
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.bitcount_unsafe(key)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in bitcount: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def exists(self, key: str) -> bool:
+        key = self._add_namespace(key)
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return False
+            ret = self.exists_unsafe(key)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in exists: %s', self._name, e)
+            self._set_as_down()
+            return False
+
+    def get_keys(self, pattern: str = "*") -> List[str]:
+        pattern = self._add_namespace(pattern)
+
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return []
+            ret = self.get_keys_unsafe(pattern)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in get_keys: %s', self._name, e)
+            self._set_as_down()
+            return []
+
+    def remove(self, *keys):
+        keys = [self._add_namespace(k) for k in keys]
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.remove_unsafe(*keys)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in remove: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def delete_all(self):
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.delete_all_unsafe()
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in delete_all: %s', self._name, e)
+            self._set_as_down()
+            return None
+
+    def delete_namespace(self, batch_size: int = 1000) -> Optional[int]:
+        try:
+            if self._do_not_use_if_recently_went_down():
+                return None
+            ret = self.delete_namespace_unsafe(batch_size)
+            self._set_as_live()
+            return ret
+        except Exception as e:
+            self._logger.error('%s error in delete_namespace: %s',
+                               self._name, e)
+            self._set_as_down()
+            return None
+
+
+class MemoryStateStore(StateStore):
+    # Keeps the state in memory, as Redis would, so it is lost whenever the
+    # alerter stops. Expiry is measured using the clock's monotonic time.
+
+    _name = 'Memory state store'
+
+    def __init__(self, logger: logging.Logger, namespace: str = '',
+                 clock: Clock = SYSTEM_CLOCK) -> None:
+        self._clock = clock
+        self._values = {}
+        self._expiry_times = {}
+        self._lock = threading.RLock()
+        super().__init__(logger, namespace)
+
+        self._logger.info('Memory state store initialised.')
+
+    def _read(self, key: str) -> Optional[bytes]:
+        # Expired keys are removed when they are next accessed
+        expiry_time = self._expiry_times.get(key)
+        if expiry_time is not None and expiry_time <= self._clock.monotonic():
+            del self._values[key]
+            del self._expiry_times[key]
+        return self._values.get(key)
+
+    def _write(self, key: str, value: StateType) -> None:
+        self._values[key] = _to_bytes(value)
+        self._expiry_times.pop(key, None)
+
+    def _delete(self, key: str) -> int:
+        self._expiry_times.pop(key, None)
+        return 1 if self._values.pop(key, None) is not None else 0
+
+    def set_unsafe(self, key: str, value: StateType):
+        key = self._add_namespace(key)
+
+        with self._lock:
+            self._write(key, value)
+        return True
+
+    def set_multiple_unsafe(self, key_values: Dict[str, StateType]):
+        with self._lock:
+            for key, value in key_values.items():
+                self._write(self._add_namespace(key),
+                            value if value is not None else 'None')
+        return [True] * len(key_values)
+
+    def set_for_unsafe(self, key: str, value: StateType, time: timedelta):
+        key = self._add_namespace(key)
+
+        with self._lock:
+            self._write(key, value)
+            self._expiry_times[key] = \
+                self._clock.monotonic() + time.total_seconds()
+        return [True, True]
+
+    def get_unsafe(self, key: str, default=None) -> Optional[bytes]:
+        key = self._add_namespace(key)
+
+        with self._lock:
+            value = self._read(key)
+        if value is None:
+            return default
+        return None if value == b'None' else value
+
+    def get_multiple_unsafe(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._read(self._add_namespace(k)) for k in keys]
+
+    def set_bits_unsafe(self, key_bits: Dict[str, Dict[int, int]]):
+        # The expiry time of a bitmap is kept, as with Redis' SETBIT
+        with self._lock:
+            for key, bits in key_bits.items():
+                key = self._add_namespace(key)
+                self._values[key] = bytes(
+                    _set_bits(bytearray(self._read(key) or b''), bits))
+        return [True] * sum(len(bits) for bits in key_bits.values())
+
+    def bitcount_unsafe(self, key: str) -> int:
+        key = self._add_namespace(key)
+
+        with self._lock:
+            return _bitcount(self._read(key))
+
+    def exists_unsafe(self, key: str) -> bool:
+        key = self._add_namespace(key)
+
+        with self._lock:
+            return self._read(key) is not None
+
+    def get_keys_unsafe(self, pattern: str = "*") -> List[str]:
+        pattern = self._add_namespace(pattern)
+
+        with self._lock:
+            keys_list = [k for k in list(self._values)
+                         if fnmatch.fnmatchcase(k, pattern)
+                         and self._read(k) is not None]
+        return [self._remove_namespace(k) for k in keys_list]
+
+    def remove_unsafe(self, *keys):
+        keys = [self._add_namespace(k) for k in keys]
+
+        with self._lock:
+            return sum(self._delete(k) for k in keys
+                       if self._read(k) is not None)
+
+    def delete_all_unsafe(self):
+        with self._lock:
+            self._values.clear()
+            self._expiry_times.clear()
+        return True
+
+    def delete_namespace_unsafe(
+            self, batch_size: int = 1000,
+            progress: Optional[Callable[[int], None]] = None) -> int:
+        deleted = 0
+        with self._lock:
+            keys = [k for k in self._values if self._in_namespace(k)]
+        for i in range(0, len(keys), batch_size):
+            with self._lock:
+                deleted += sum(self._delete(k)
+                               for k in keys[i:i + batch_size])
+            if progress is not None:
+                progress(deleted)
+        return deleted
+
+    def ping_unsafe(self) -> bool:
+        return True
+
+
+class SqliteStateStore(StateStore):
+    # Keeps the state in a SQLite database file, so that it survives restarts
+    # without a Redis server. The database is in WAL mode, so writes are
+    # appended to a log rather than rewriting pages of the database. Expiry
+    # times are wall clock times, since they outlive the process, and expired
+    # keys are removed when the store is opened and whenever they are read.
+    # Writes of many keys are done in a single transaction.
+
+    _name = 'SQLite state store'
+    _errors = (sqlite3.Error,)
+
+    def __init__(self, db_file: str, logger: logging.Logger,
+                 namespace: str = '', clock: Clock = SYSTEM_CLOCK) -> None:
+        self._db_file = db_file
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+        self._db = sqlite3.connect(db_file, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS state ('
+                         'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                         'expires_at REAL)')
+        self._db.execute('DELETE FROM state WHERE expires_at <= ?',
+                         (self._now(),))
+        super().__init__(logger, namespace)
+
+        self._logger.info('SQLite state store %s initialised.', db_file)
+
+    def _now(self) -> float:
+        return self._clock.now().timestamp()
+
+    def _read(self, key: str) -> Optional[bytes]:
+        row = self._db.execute(
+            'SELECT value, expires_at FROM state WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= self._now():
+            self._db.execute('DELETE FROM state WHERE key = ?', (key,))
+            return None
+        return value
+
+    def _read_many(self, keys: List[str]) -> Dict[str, bytes]:
+        # Reads the keys that exist, in as few statements as possible
+        values = {}
+        now = self._now()
+        for i in range(0, len(keys), _SQLITE_MAX_KEYS_PER_STATEMENT):
+            chunk = keys[i:i + _SQLITE_MAX_KEYS_PER_STATEMENT]
+            rows = self._db.execute(
+                'SELECT key, value FROM state WHERE key IN ({}) AND '
+                '(expires_at IS NULL OR expires_at > ?)'.format(
+                    ','.join('?' * len(chunk))), chunk + [now])
+            values.update(rows)
+        return values
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def set_unsafe(self, key: str, value: StateType):
+        key = self._add_namespace(key)
+
+        with self._lock:
+            self._db.execute('REPLACE INTO state VALUES (?, ?, NULL)',
+                             (key, _to_bytes(value)))
+        return True
+
+    def set_multiple_unsafe(self, key_values: Dict[str, StateType]):
+        rows = [(self._add_namespace(k),
+                 _to_bytes(v if v is not None else 'None'))
+                for k, v in key_values.items()]
+
+        with self._lock, self._db:
+            self._db.execute('BEGIN')
+            self._db.executemany('REPLACE INTO state VALUES (?, ?, NULL)',
+                                 rows)
+        return [True] * len(rows)
+
+    def set_for_unsafe(self, key: str, value: StateType, time: timedelta):
+        key = self._add_namespace(key)
+
+        with self._lock:
+            self._db.execute('REPLACE INTO state VALUES (?, ?, ?)',
+                             (key, _to_bytes(value),
+                              self._now() + time.total_seconds()))
+        return [True, True]
+
+    def get_unsafe(self, key: str, default=None) -> Optional[bytes]:
+        key = self._add_namespace(key)
+
+        with self._lock:
+            value = self._read(key)
+        if value is None:
+            return default
+        return None if value == b'None' else value
+
+    def get_multiple_unsafe(self, keys: List[str]) -> List[Optional[bytes]]:
+        keys = [self._add_namespace(k) for k in keys]
+
+        with self._lock:
+            values = self._read_many(list(set(keys)))
+        return [values.get(k) for k in keys]
+
+    def set_bits_unsafe(self, key_bits: Dict[str, Dict[int, int]]):
+        # The expiry time of a bitmap is kept, as with Redis' SETBIT
+        with self._lock, self._db:
+            self._db.execute('BEGIN')
+            for key, bits in key_bits.items():
+                key = self._add_namespace(key)
+                bitmap = _set_bits(bytearray(self._read(key) or b''), bits)
+                self._db.execute(
+                    'INSERT INTO state VALUES (?, ?, NULL) ON CONFLICT(key) '
+                    'DO UPDATE SET value = excluded.value',
+                    (key, bytes(bitmap)))
+        return [True] * sum(len(bits) for bits in key_bits.values())
+
+    def bitcount_unsafe(self, key: str) -> int:
+        key = self._add_namespace(key)
+
+        with self._lock:
+            return _bitcount(self._read(key))
+
+    def exists_unsafe(self, key: str) -> bool:
+        key = self._add_namespace(key)
+
+        with self._lock:
+            return self._read(key) is not None
+
+    def get_keys_unsafe(self, pattern: str = "*") -> List[str]:
+        pattern = self._add_namespace(pattern)
+
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT key FROM state WHERE '
+                'expires_at IS NULL OR expires_at > ?', (self._now(),))
+            keys_list = [k for k, in rows if fnmatch.fnmatchcase(k, pattern)]
+        return [self._remove_namespace(k) for k in keys_list]
+
+    def remove_unsafe(self, *keys):
+        keys = list({self._add_namespace(k) for k in keys})
+
+        with self._lock, self._db:
+            self._db.execute('BEGIN')
+            existing = self._read_many(keys)
+            self._db.executemany('DELETE FROM state WHERE key = ?',
+                                 [(k,) for k in keys])
+        return len(existing)
+
+    def delete_all_unsafe(self):
+        with self._lock:
+            self._db.execute('DELETE FROM state')
+        return True
+
+    def delete_namespace_unsafe(
+            self, batch_size: int = 1000,
+            progress: Optional[Callable[[int], None]] = None) -> int:
+        # Keys are deleted in batches, so that the database is not locked for
+        # long. The namespace is matched as a range of keys, using the index.
+        start = self._namespace + ':'
+        end = self._namespace + ';'  # ';' is the character after ':'
+        deleted = 0
+        while True:
+            with self._lock:
+                cursor = self._db.execute(
+                    'DELETE FROM state WHERE key IN (SELECT key FROM state '
+                    'WHERE key >= ? AND key < ? LIMIT ?)',
+                    (start, end, batch_size))
+            if cursor.rowcount <= 0:
+                return deleted
+            deleted += cursor.rowcount
+            if progress is not None:
+                progress(deleted)
+
+    def ping_unsafe(self) -> bool:
+        with self._lock:
+            self._db.execute('SELECT 1').fetchone()
+        return True
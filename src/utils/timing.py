@@ -1,16 +1,34 @@
-from datetime import datetime, timedelta
-from queue import Queue
+from array import array
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from src.utils.clock import Clock, SYSTEM_CLOCK
 from src.utils.datetime import strfdelta
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_seconds(at_time: datetime) -> float:
+    # Naive datetimes (such as block times) are taken to be in UTC
+    if at_time.tzinfo is None:
+        return (at_time - _EPOCH).total_seconds()
+    return at_time.astimezone(timezone.utc).timestamp()
+
 
 class TimedTaskLimiter:
-    def __init__(self, time_interval: timedelta) -> None:
+    def __init__(self, time_interval: timedelta,
+                 clock: Clock = SYSTEM_CLOCK) -> None:
         super().__init__()
 
         self._time_interval = time_interval
+        self._clock = clock
+        self._time_interval_seconds = time_interval.total_seconds()
+
+        # Whether the task can be done is decided using the monotonic clock,
+        # so that it is not affected by changes to the system time. The wall
+        # clock time is only kept for reporting purposes.
         self._last_time_that_did_task = datetime.min
+        self._last_monotonic_time_that_did_task = None
 
     @property
     def time_interval(self) -> timedelta:
@@ -21,25 +39,37 @@ class TimedTaskLimiter:
         return self._last_time_that_did_task
 
     def can_do_task(self) -> bool:
-        return (datetime.now() - self._last_time_that_did_task) \
-               > self._time_interval
+        return self._last_monotonic_time_that_did_task is None or \
+               (self._clock.monotonic() -
+                self._last_monotonic_time_that_did_task) \
+               > self._time_interval_seconds
 
     def did_task(self) -> None:
-        self._last_time_that_did_task = datetime.now()
+        self._last_time_that_did_task = self._clock.now()
+        self._last_monotonic_time_that_did_task = self._clock.monotonic()
 
     def reset(self) -> None:
         self._last_time_that_did_task = datetime.min
+        self._last_monotonic_time_that_did_task = None
 
 
 class TimedOccurrenceTracker:
-    def __init__(self, max_occurrences: int, time_interval: timedelta) -> None:
+    def __init__(self, max_occurrences: int, time_interval: timedelta,
+                 clock: Clock = SYSTEM_CLOCK) -> None:
         super().__init__()
 
         self._max_occurrences = max_occurrences
+        self._clock = clock
         self._time_interval = time_interval
+        self._time_interval_seconds = time_interval.total_seconds()
 
-        self._last_occurrences = Queue(maxsize=max_occurrences)
-        self.reset()
+        # Ring buffer of the times of the last max_occurrences occurrences,
+        # where the next slot to be overwritten holds the oldest occurrence.
+        # Slots are only meaningful once max_occurrences occurrences happened
+        # since the last reset, so a reset does not need to clear them.
+        self._last_occurrences = array('d', [0.0] * max_occurrences)
+        self._next_slot = 0
+        self._occurrences = 0
 
     @property
     def max_occurrences(self) -> int:
@@ -53,26 +83,31 @@ class TimedOccurrenceTracker:
     def time_interval_pretty(self) -> str:
         return strfdelta(self.time_interval, "{hours}h, {minutes}m, {seconds}s")
 
+    # Times default to the clock's monotonic time. Times supplied as
+    # datetimes (such as block times) are on a different clock, so a tracker
+    # should either always be given times or never be given times.
+
     def action_happened(self, at_time: Optional[datetime] = None) -> None:
-        # Default: get current time
-        if at_time is None:
-            at_time = datetime.now()
+        self._last_occurrences[self._next_slot] = self._clock.monotonic() \
+            if at_time is None else _to_seconds(at_time)
 
-        self._last_occurrences.get()
-        self._last_occurrences.put(at_time)
+        self._next_slot += 1
+        if self._next_slot == self._max_occurrences:
+            self._next_slot = 0
+        if self._occurrences < self._max_occurrences:
+            self._occurrences += 1
 
     def too_many_occurrences(self, from_time: Optional[datetime] = None) \
             -> bool:
-        # Default: get current time
-        if from_time is None:
-            from_time = datetime.now()
+        if self._occurrences < self._max_occurrences:
+            return False
 
-        # noinspection PyUnresolvedReferences
-        oldest_occurrence = self._last_occurrences.queue[0]
-        return (from_time - oldest_occurrence) < self._time_interval
+        from_seconds = self._clock.monotonic() \
+            if from_time is None else _to_seconds(from_time)
+        oldest_occurrence = self._last_occurrences[self._next_slot]
+        return (from_seconds - oldest_occurrence) \
+            < self._time_interval_seconds
 
     def reset(self) -> None:
-        while not self._last_occurrences.empty():
-            self._last_occurrences.get()
-        for i in range(self._max_occurrences):
-            self._last_occurrences.put(datetime.min)
+        self._next_slot = 0
+        self._occurrences = 0
@@ -0,0 +1,183 @@
+import logging
+import unittest
+from datetime import timedelta
+
+from redis import ConnectionError as RedisConnectionError
+
+from src.alerting.alert_utils.deduplication import AlertDeduplicator
+from src.alerting.alerts.alerts import Alert, ExperiencingDelaysAlert, \
+    TerminatedDueToExceptionAlert
+from src.alerting.channels.channel import ChannelSet
+from src.alerting.channels.log import LogChannel
+from src.utils.clock import VirtualClock
+from src.utils.metrics import ALERTS_SUPPRESSED
+from src.utils.redis_api import RedisApi
+from src.utils.state_store import MemoryStateStore, StateStore
+from test import TestInternalConf, TestUserConf
+from test.test_helpers import CounterChannel
+
+
+class TestAlertDeduplicatorWithoutRedis(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.window_seconds = 1
+        self.clock = VirtualClock()
+        self.dedup = AlertDeduplicator(
+            timedelta(seconds=self.window_seconds), self.logger,
+            clock=self.clock)
+
+        self.alert = ExperiencingDelaysAlert('node')
+        self.other_alert = ExperiencingDelaysAlert('other node')
+
+    def test_first_occurrence_is_not_duplicate(self):
+        self.assertFalse(self.dedup.is_duplicate(self.alert, 'info'))
+
+    def test_second_occurrence_within_window_is_duplicate(self):
+        self.dedup.is_duplicate(self.alert, 'info')
+        self.assertTrue(self.dedup.is_duplicate(self.alert, 'info'))
+
+    def test_occurrence_after_window_is_not_duplicate(self):
+        self.dedup.is_duplicate(self.alert, 'info')
+        self.clock.sleep(self.window_seconds)
+        self.assertFalse(self.dedup.is_duplicate(self.alert, 'info'))
+
+    def test_different_alert_is_not_duplicate(self):
+        self.dedup.is_duplicate(self.alert, 'info')
+        self.assertFalse(self.dedup.is_duplicate(self.other_alert, 'info'))
+
+    def test_same_alert_with_different_severity_is_not_duplicate(self):
+        self.dedup.is_duplicate(self.alert, 'info')
+        self.assertFalse(self.dedup.is_duplicate(self.alert, 'major'))
+
+    def test_redis_not_accessed_while_holding_lock(self):
+        # Whether the lock was held at each access to the state store
+        locked = []
+
+        class LockCheckingStateStore(MemoryStateStore):
+            def exists_unsafe(self, key: str) -> bool:
+                locked.append(dedup._lock.locked())
+                return super().exists_unsafe(key)
+
+            def set_for_unsafe(self, key: str, value, time: timedelta):
+                locked.append(dedup._lock.locked())
+                return super().set_for_unsafe(key, value, time)
+
+        dedup = AlertDeduplicator(
+            timedelta(seconds=self.window_seconds), self.logger,
+            LockCheckingStateStore(self.logger), clock=self.clock)
+        dedup.is_duplicate(self.alert, 'info')
+        dedup.is_duplicate(self.alert, 'info')
+
+        self.assertEqual([False, False], locked)
+
+
+class TestChannelSetWithDeduplicator(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.counter_channel = CounterChannel(self.logger)
+        self.dedup = AlertDeduplicator(timedelta(seconds=10), self.logger)
+        self.channel_set = ChannelSet([self.counter_channel], self.dedup)
+
+    def test_duplicate_alerts_do_not_reach_channels(self):
+        for i in range(3):
+            self.channel_set.alert_error(TerminatedDueToExceptionAlert(
+                'monitor', Exception('error')))
+        self.assertEqual(1, self.counter_channel.error_count)
+
+    def test_distinct_alerts_reach_channels(self):
+        self.channel_set.alert_error(TerminatedDueToExceptionAlert(
+            'monitor', Exception('error')))
+        self.channel_set.alert_error(TerminatedDueToExceptionAlert(
+            'monitor', Exception('another error')))
+        self.assertEqual(2, self.counter_channel.error_count)
+
+    def test_suppressed_duplicates_are_counted(self):
+        alert = TerminatedDueToExceptionAlert('monitor', Exception('error'))
+        suppressed = ALERTS_SUPPRESSED.labels(type(alert).__name__, 'error')
+        before = suppressed.value
+
+        for i in range(4):
+            self.channel_set.alert_error(alert)
+
+        self.assertEqual(3, suppressed.value - before)
+
+    def test_duplicate_alerts_reach_log_channel(self):
+        alerts_logger = logging.getLogger('dummy_alerts')
+        self.channel_set.add_channel(LogChannel('', self.logger,
+                                                alerts_logger))
+
+        with self.assertLogs(alerts_logger) as logs:
+            for i in range(3):
+                self.channel_set.alert_info(Alert('test'))
+
+        self.assertEqual(3, len(logs.records))
+        self.assertEqual(1, self.counter_channel.info_count)
+
+    def test_channel_set_without_deduplicator_sends_all_alerts(self):
+        channel_set = ChannelSet([self.counter_channel])
+        for i in range(3):
+            channel_set.alert_info(Alert('test'))
+        self.assertEqual(3, self.counter_channel.info_count)
+
+
+class TestAlertDeduplicatorWithRedis(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Same as in setUp(), to avoid running all tests if Redis is offline
+
+        logger = logging.getLogger('dummy')
+        db = TestInternalConf.redis_test_database
+        host = TestUserConf.redis_host
+        port = TestUserConf.redis_port
+        password = TestUserConf.redis_password
+        redis = RedisApi(logger, db, host, port, password)
+
+        try:
+            redis.ping_unsafe()
+        except RedisConnectionError:
+            raise Exception('Redis is not online.')
+
+    def _create_state_store(self) -> StateStore:
+        return RedisApi(self.logger, self.db, self.host, self.port,
+                        self.password)
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.db = TestInternalConf.redis_test_database
+        self.host = TestUserConf.redis_host
+        self.port = TestUserConf.redis_port
+        self.password = TestUserConf.redis_password
+        self.redis = self._create_state_store()
+        self.redis.delete_all_unsafe()
+
+        try:
+            self.redis.ping_unsafe()
+        except RedisConnectionError:
+            self.fail('Redis is not online.')
+
+        self.window = timedelta(seconds=10)
+        self.prefix = TestInternalConf.redis_alert_fingerprint_key_prefix
+        self.alert = ExperiencingDelaysAlert('node')
+
+    def test_alert_sent_before_restart_is_duplicate(self):
+        before_restart = AlertDeduplicator(self.window, self.logger,
+                                           self.redis, self.prefix)
+        after_restart = AlertDeduplicator(self.window, self.logger,
+                                          self.redis, self.prefix)
+
+        self.assertFalse(before_restart.is_duplicate(self.alert, 'info'))
+        self.assertTrue(after_restart.is_duplicate(self.alert, 'info'))
+
+
+class TestAlertDeduplicatorWithMemoryStateStore(
+        TestAlertDeduplicatorWithRedis):
+    # The same tests, run in-process against the memory state store
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        pass
+
+    def _create_state_store(self) -> StateStore:
+        return MemoryStateStore(self.logger)
@@ -0,0 +1,189 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from time import sleep, time
+
+from src.alerting.alert_utils.outbox import AlertOutbox
+from src.alerting.alerts.alerts import Alert, CannotAccessNodeAlert
+from src.alerting.channels.outbox import OutboxChannel
+from test.test_helpers import CounterChannel, DummyException
+
+WAIT_SECONDS = 0.5
+
+
+class DummyDeliverer:
+
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.delivered = []
+        self.alerts = []
+        self.event = threading.Event()
+
+    def __call__(self, severity: str, alert: Alert) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise DummyException()
+        self.delivered.append((severity, alert.message))
+        self.alerts.append(alert)
+        self.event.set()
+
+
+class TestAlertOutbox(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.directory = tempfile.TemporaryDirectory()
+        self.outbox_file = os.path.join(self.directory.name, 'outbox.db')
+        self.channel = 'test_channel'
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _outbox(self, max_age: timedelta = timedelta(days=1)) -> AlertOutbox:
+        return AlertOutbox(self.outbox_file, self.logger,
+                           timedelta(seconds=0.01), 100,
+                           timedelta(seconds=0.05), timedelta(seconds=0.1),
+                           max_age)
+
+    def test_alerts_are_delivered_in_order(self):
+        outbox = self._outbox()
+        deliverer = DummyDeliverer()
+        outbox.register(self.channel, deliverer)
+
+        for i in range(5):
+            outbox.append(self.channel, 'info', Alert(str(i)))
+        sleep(WAIT_SECONDS)
+
+        self.assertEqual([('info', str(i)) for i in range(5)],
+                         deliverer.delivered)
+        self.assertEqual(0, outbox.pending_alerts(self.channel))
+
+    def test_failed_delivery_is_retried(self):
+        outbox = self._outbox()
+        deliverer = DummyDeliverer(failures=2)
+        outbox.register(self.channel, deliverer)
+
+        outbox.append(self.channel, 'major', Alert('test'))
+        sleep(WAIT_SECONDS)
+
+        self.assertEqual([('major', 'test')], deliverer.delivered)
+        self.assertEqual(0, outbox.pending_alerts(self.channel))
+
+    def test_alerts_are_kept_until_delivered(self):
+        outbox = self._outbox()
+        outbox.register(self.channel, DummyDeliverer(failures=1000))
+
+        outbox.append(self.channel, 'major', Alert('test'))
+        sleep(WAIT_SECONDS)
+
+        self.assertEqual(1, outbox.pending_alerts(self.channel))
+
+    def test_journalled_alerts_are_delivered_after_restart(self):
+        # Alerts are journalled but never delivered, since no channel is
+        # registered before the 'restart'
+        before_restart = self._outbox()
+        before_restart.append(self.channel, 'minor', Alert('test'))
+        sleep(WAIT_SECONDS)
+
+        after_restart = self._outbox()
+        deliverer = DummyDeliverer()
+        after_restart.register(self.channel, deliverer)
+        deliverer.event.wait(WAIT_SECONDS)
+
+        self.assertEqual([('minor', 'test')], deliverer.delivered)
+
+    def test_alerts_are_delivered_with_same_type_and_fingerprint(self):
+        outbox = self._outbox()
+        deliverer = DummyDeliverer()
+        outbox.register(self.channel, deliverer)
+
+        alert = CannotAccessNodeAlert('node', datetime(2020, 1, 1),
+                                      '5m')
+        outbox.append(self.channel, 'major', alert)
+        deliverer.event.wait(WAIT_SECONDS)
+
+        self.assertIsInstance(deliverer.alerts[0], CannotAccessNodeAlert)
+        self.assertEqual(alert.message, deliverer.alerts[0].message)
+        self.assertEqual(alert.fingerprint, deliverer.alerts[0].fingerprint)
+
+    def test_alerts_journalled_without_key_fields_are_delivered(self):
+        # An outbox journalled before key fields were kept
+        connection = sqlite3.connect(self.outbox_file)
+        with connection:
+            connection.execute(
+                'CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'channel TEXT NOT NULL, severity TEXT NOT NULL, '
+                'alert_type TEXT NOT NULL, message TEXT NOT NULL, '
+                'created REAL NOT NULL, attempts INTEGER NOT NULL, '
+                'next_attempt REAL NOT NULL)')
+            connection.execute(
+                'INSERT INTO outbox (channel, severity, alert_type, message, '
+                'created, attempts, next_attempt) '
+                'VALUES (?, ?, ?, ?, ?, 0, ?)',
+                (self.channel, 'minor', 'Alert', 'test', time(), time()))
+        connection.close()
+
+        outbox = self._outbox()
+        deliverer = DummyDeliverer()
+        outbox.register(self.channel, deliverer)
+        deliverer.event.wait(WAIT_SECONDS)
+
+        self.assertEqual([('minor', 'test')], deliverer.delivered)
+
+    def test_registering_channel_again_only_replaces_deliverer(self):
+        outbox = self._outbox()
+        first_deliverer = DummyDeliverer()
+        second_deliverer = DummyDeliverer()
+        outbox.register(self.channel, first_deliverer)
+        threads = threading.active_count()
+        outbox.register(self.channel, second_deliverer)
+
+        outbox.append(self.channel, 'info', Alert('test'))
+        sleep(WAIT_SECONDS)
+
+        self.assertEqual(threads, threading.active_count())
+        self.assertEqual([], first_deliverer.delivered)
+        self.assertEqual([('info', 'test')], second_deliverer.delivered)
+
+    def test_alerts_older_than_max_age_are_dropped(self):
+        outbox = self._outbox(max_age=timedelta(seconds=0.1))
+        deliverer = DummyDeliverer(failures=1000)
+        outbox.register(self.channel, deliverer)
+
+        outbox.append(self.channel, 'major', Alert('test'))
+        sleep(WAIT_SECONDS)
+
+        self.assertEqual(0, outbox.pending_alerts(self.channel))
+
+
+class TestOutboxChannel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.directory = tempfile.TemporaryDirectory()
+        self.outbox = AlertOutbox(
+            os.path.join(self.directory.name, 'outbox.db'), self.logger,
+            timedelta(seconds=0.01), 100, timedelta(seconds=0.05),
+            timedelta(seconds=0.1), timedelta(days=1))
+        self.counter_channel = CounterChannel(self.logger)
+        self.channel = OutboxChannel(self.counter_channel, self.outbox,
+                                     'test_channel')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_alerts_reach_wrapped_channel_with_same_severity(self):
+        self.channel.alert_info(Alert('test'))
+        self.channel.alert_minor(Alert('test'))
+        self.channel.alert_major(Alert('test'))
+        self.channel.alert_error(Alert('test'))
+        sleep(WAIT_SECONDS)
+
+        self.assertEqual(1, self.counter_channel.info_count)
+        self.assertEqual(1, self.counter_channel.minor_count)
+        self.assertEqual(1, self.counter_channel.major_count)
+        self.assertEqual(1, self.counter_channel.error_count)
@@ -239,3 +239,27 @@ class TestAlerts(unittest.TestCase):
         self.assertEqual(
             'Problem encountered when dialing {}: {}'.format(number, exception),
             str(ProblemWhenDialingNumberAlert(number, exception)))
+
+    def test_fingerprint_is_stable_across_alert_instances(self):
+        node = 'Node Name'
+        went_down_at = datetime.max
+
+        self.assertEqual(
+            StillCannotAccessNodeAlert(node, went_down_at, '1s').fingerprint,
+            StillCannotAccessNodeAlert(node, went_down_at, '2s').fingerprint)
+
+    def test_fingerprint_differs_for_different_key_fields(self):
+        self.assertNotEqual(ExperiencingDelaysAlert('Node 1').fingerprint,
+                            ExperiencingDelaysAlert('Node 2').fingerprint)
+
+    def test_fingerprint_differs_for_different_alert_types(self):
+        node = 'Node Name'
+
+        self.assertNotEqual(IsCatchingUpAlert(node).fingerprint,
+                            IsNoLongerCatchingUpAlert(node).fingerprint)
+
+    def test_fingerprint_of_alert_without_key_fields_uses_message(self):
+        self.assertEqual(Alert('message').fingerprint,
+                         Alert('message').fingerprint)
+        self.assertNotEqual(Alert('message').fingerprint,
+                            Alert('other message').fingerprint)
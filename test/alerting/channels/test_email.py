@@ -0,0 +1,69 @@
+import logging
+import unittest
+
+from src.alerting.alerts.alerts import Alert
+from src.alerting.channels.email import EmailChannel
+from test.test_helpers import DummyException
+
+
+class DummyEmailSender:
+
+    def __init__(self) -> None:
+        self.failing = set()
+        self.sent = []
+
+    def send_email(self, subject: str, message: str, to: str) -> None:
+        if to in self.failing:
+            raise DummyException()
+        self.sent.append(to)
+
+
+class TestEmailChannel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.recipients = ['a@x.com', 'b@x.com', 'c@x.com']
+        self.email = DummyEmailSender()
+        self.channel = EmailChannel('email', self.logger, None, self.email,
+                                    self.recipients)
+        self.alert = Alert('alert')
+
+    def test_alert_sent_to_all_recipients(self):
+        self.channel.alert_major(self.alert)
+
+        self.assertEqual(self.recipients, self.email.sent)
+
+    def test_alert_raises_if_any_recipient_failed(self):
+        self.email.failing = {'b@x.com'}
+
+        self.assertRaises(DummyException, self.channel.alert_major,
+                          self.alert)
+        self.assertEqual(['a@x.com', 'c@x.com'], self.email.sent)
+
+    def test_retried_alert_only_sent_to_recipients_that_did_not_get_it(self):
+        self.email.failing = {'b@x.com'}
+        self.assertRaises(DummyException, self.channel.alert_major,
+                          self.alert)
+        self.email.failing = set()
+        self.channel.alert_major(self.alert)
+
+        self.assertEqual(['a@x.com', 'c@x.com', 'b@x.com'], self.email.sent)
+
+    def test_alert_sent_to_all_recipients_again_once_fully_sent(self):
+        self.email.failing = {'b@x.com'}
+        self.assertRaises(DummyException, self.channel.alert_major,
+                          self.alert)
+        self.email.failing = set()
+        self.channel.alert_major(self.alert)
+        self.channel.alert_major(self.alert)
+
+        self.assertEqual(2 * len(self.recipients), len(self.email.sent))
+
+    def test_alert_of_another_severity_sent_to_all_recipients(self):
+        self.email.failing = {'b@x.com'}
+        self.assertRaises(DummyException, self.channel.alert_major,
+                          self.alert)
+        self.email.failing = set()
+        self.channel.alert_minor(self.alert)
+
+        self.assertEqual(2 + len(self.recipients), len(self.email.sent))
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import unittest
+from datetime import timedelta
+
+from src.alerting.alerts.alerts import Alert
+from src.alerting.channels.channel import ChannelSet
+from src.alerting.channels.twilio import TwilioChannel
+from src.utils.clock import Clock, SYSTEM_CLOCK, VirtualClock
+from test.test_helpers import CounterChannel, DummyException
+
+
+class DummyTwilioApi:
+
+    def __init__(self, dial_seconds: float = 0,
+                 fail: bool = False) -> None:
+        self.dial_seconds = dial_seconds
+        self.fail = fail
+        self.dialed = []
+        self._lock = threading.Lock()
+
+    def dial_number(self, call_from: str, call_to: str,
+                    twiml: str, twiml_is_url: bool):
+        time.sleep(self.dial_seconds)
+        if self.fail:
+            raise DummyException()
+        with self._lock:
+            self.dialed.append(call_to)
+
+
+class TestTwilioChannel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.counter_channel = CounterChannel(self.logger)
+        self.backup_channels = ChannelSet([self.counter_channel])
+        self.numbers = ['+1', '+2', '+3', '+4']
+        self.window = timedelta(seconds=10)
+        self.alert = Alert('major alert')
+
+    def _channel(self, twilio: DummyTwilioApi, window: timedelta,
+                 clock: Clock = SYSTEM_CLOCK) -> TwilioChannel:
+        return TwilioChannel('twilio', self.logger, None, twilio,
+                             '+0', self.numbers, 'twiml', False,
+                             'snooze_key', self.backup_channels, window,
+                             clock)
+
+    def test_alert_major_dials_all_numbers(self):
+        twilio = DummyTwilioApi()
+        self._channel(twilio, self.window).alert_major(self.alert)
+
+        self.assertEqual(sorted(self.numbers), sorted(twilio.dialed))
+
+    def test_alert_major_dials_numbers_concurrently(self):
+        dial_seconds = 0.5
+        twilio = DummyTwilioApi(dial_seconds)
+        channel = self._channel(twilio, self.window)
+
+        start = time.monotonic()
+        channel.alert_major(self.alert)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, dial_seconds * len(self.numbers) / 2)
+
+    def test_alert_major_within_window_is_coalesced(self):
+        twilio = DummyTwilioApi()
+        channel = self._channel(twilio, self.window)
+
+        for i in range(3):
+            channel.alert_major(self.alert)
+
+        self.assertEqual(len(self.numbers), len(twilio.dialed))
+        self.assertEqual(2, channel.coalesced_alerts)
+
+    def test_alert_major_dials_again_if_no_window(self):
+        twilio = DummyTwilioApi()
+        channel = self._channel(twilio, timedelta())
+
+        channel.alert_major(self.alert)
+        channel.alert_major(self.alert)
+
+        self.assertEqual(2 * len(self.numbers), len(twilio.dialed))
+
+    def test_alert_major_within_window_dials_again_on_virtual_clock(self):
+        twilio = DummyTwilioApi()
+        clock = VirtualClock()
+        channel = self._channel(twilio, self.window, clock)
+
+        channel.alert_major(self.alert)
+        clock.advance(self.window.total_seconds() + 1)
+        channel.alert_major(self.alert)
+
+        self.assertEqual(2 * len(self.numbers), len(twilio.dialed))
+        self.assertEqual(0, channel.coalesced_alerts)
+
+    def test_alert_major_alerts_backup_channels_once_per_failed_number(self):
+        twilio = DummyTwilioApi(fail=True)
+        channel = self._channel(twilio, self.window)
+
+        # The call round is retried, e.g. by the alert outbox
+        for _ in range(3):
+            self.assertRaises(DummyException, channel.alert_major,
+                              self.alert)
+
+        self.assertEqual(len(self.numbers), self.counter_channel.error_count)
+
+    def test_alert_major_failed_number_alerted_again_once_dialed(self):
+        twilio = DummyTwilioApi(fail=True)
+        channel = self._channel(twilio, timedelta())
+
+        self.assertRaises(DummyException, channel.alert_major, self.alert)
+        twilio.fail = False
+        channel.alert_major(self.alert)
+        twilio.fail = True
+        self.assertRaises(DummyException, channel.alert_major, self.alert)
+
+        self.assertEqual(2 * len(self.numbers),
+                         self.counter_channel.error_count)
+
+    def test_alert_major_raises_and_not_coalesced_if_no_number_dialed(self):
+        twilio = DummyTwilioApi(fail=True)
+        channel = self._channel(twilio, self.window)
+
+        self.assertRaises(DummyException, channel.alert_major, self.alert)
+        twilio.fail = False
+        channel.alert_major(self.alert)
+
+        self.assertEqual(len(self.numbers), len(twilio.dialed))
@@ -6,9 +6,12 @@ from redis import ConnectionError as RedisConnectionError
 
 from src.alerting.channels.channel import ChannelSet
 from src.alerting.periodic.periodic import PeriodicAliveReminder
+from src.utils.clock import VirtualClock
 from src.utils.redis_api import RedisApi
+from src.utils.state_store import MemoryStateStore, StateStore
 from test import TestInternalConf, TestUserConf
 from test.node.test_node import CounterChannel
+from test.test_helpers import DummyException
 
 
 class TestPeriodicWithoutRedis(unittest.TestCase):
@@ -31,8 +34,28 @@ class TestPeriodicWithoutRedis(unittest.TestCase):
         self.assertEqual(self.counter_channel.info_count, 1)
         self.assertEqual(self.counter_channel.error_count, 0)
 
+    def test_periodic_alive_reminder_sends_alert_every_interval(self):
+        class StoppingClock(VirtualClock):
+            # Stops the reminder after an hour
+            def sleep(self, seconds: float) -> None:
+                super().sleep(seconds)
+                if self.monotonic() > 3600:
+                    raise DummyException()
+
+        clock = StoppingClock()
+        par = PeriodicAliveReminder(timedelta(minutes=10), self.channel_set,
+                                    self.mute_key, None, clock)
+        self.counter_channel.reset()  # ignore previous alerts
+
+        self.assertRaises(DummyException, par.start)
+        self.assertEqual(self.counter_channel.info_count, 6)
+
 
 class TestPeriodicWithRedis(unittest.TestCase):
+    def _create_state_store(self) -> StateStore:
+        return RedisApi(self.logger, self.db, self.host, self.port,
+                        self.password)
+
     def setUp(self) -> None:
         self.alerter_name = 'testalerter'
         self.logger = logging.getLogger('dummy')
@@ -43,8 +66,7 @@ class TestPeriodicWithRedis(unittest.TestCase):
         self.host = TestUserConf.redis_host
         self.port = TestUserConf.redis_port
         self.password = TestUserConf.redis_password
-        self.redis = RedisApi(self.logger, self.db, self.host,
-                              self.port, self.password)
+        self.redis = self._create_state_store()
         self.redis.delete_all_unsafe()
 
         try:
@@ -76,3 +98,10 @@ class TestPeriodicWithRedis(unittest.TestCase):
         self.assertEqual(self.counter_channel.major_count, 0)
         self.assertEqual(self.counter_channel.info_count, 0)
         self.assertEqual(self.counter_channel.error_count, 0)
+
+
+class TestPeriodicWithMemoryStateStore(TestPeriodicWithRedis):
+    # The same tests, run in-process against the memory state store
+
+    def _create_state_store(self) -> StateStore:
+        return MemoryStateStore(self.logger)
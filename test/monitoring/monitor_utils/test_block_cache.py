@@ -0,0 +1,146 @@
+import logging
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from src.monitoring.monitor_utils.block_cache import BlockCache, \
+    BlockSummary, summarise_block
+
+
+def dummy_summary(height: int, signers=None) -> BlockSummary:
+    signers = {'AAAA', 'BBBB'} if signers is None else signers
+    return BlockSummary(height, datetime(2020, 1, 1, 0, 0, height % 60),
+                        'AB' * 20, set(signers), 10, 10 - len(signers))
+
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, 'cache.bin')
+        self.capacity = 10
+        self.max_validators = 16
+        self.cache = self._cache()
+
+    def tearDown(self) -> None:
+        self.cache.close()
+        self.directory.cleanup()
+
+    def _cache(self, max_validators: int = None) -> BlockCache:
+        return BlockCache(self.file, self.capacity,
+                          max_validators or self.max_validators, self.logger)
+
+    def test_get_returns_none_if_height_not_cached(self):
+        self.assertIsNone(self.cache.get(5))
+
+    def test_get_returns_summary_put_in_cache(self):
+        summary = dummy_summary(5)
+        self.assertTrue(self.cache.put(summary))
+        self.assertEqual(summary, self.cache.get(5))
+
+    def test_validators_hash_kept_in_cache(self):
+        summary = dummy_summary(5)._replace(validators_hash='CD' * 32)
+        self.cache.put(summary)
+        self.assertEqual(summary, self.cache.get(5))
+
+    def test_block_time_kept_to_the_microsecond(self):
+        # Far enough from the epoch for a double to lose the microseconds
+        summary = dummy_summary(5)._replace(
+            time=datetime(2262, 4, 11, 23, 47, 16, 854775))
+        self.cache.put(summary)
+        self.assertEqual(summary.time, self.cache.get(5).time)
+
+    def test_old_heights_are_overwritten_once_capacity_reached(self):
+        self.cache.put(dummy_summary(5))
+        self.cache.put(dummy_summary(5 + self.capacity))
+
+        self.assertIsNone(self.cache.get(5))
+        self.assertIsNotNone(self.cache.get(5 + self.capacity))
+
+    def test_summaries_are_kept_after_reopening(self):
+        summary = dummy_summary(5, {'CCCC'})
+        self.cache.put(summary)
+        self.cache.close()
+
+        self.cache = self._cache()
+        self.assertEqual(summary, self.cache.get(5))
+
+    def test_cache_is_cleared_if_reopened_with_different_layout(self):
+        self.cache.put(dummy_summary(5))
+        self.cache.close()
+
+        self.cache = self._cache(max_validators=self.max_validators * 2)
+        self.assertIsNone(self.cache.get(5))
+
+    def test_block_not_cached_if_too_many_signers(self):
+        signers = {'{:04X}'.format(i) for i in range(self.max_validators + 1)}
+        self.assertFalse(self.cache.put(dummy_summary(5, signers)))
+        self.assertIsNone(self.cache.get(5))
+
+    def test_summaries_skip_heights_not_cached(self):
+        for height in [3, 4, 6]:
+            self.cache.put(dummy_summary(height))
+
+        self.assertEqual([3, 4, 6],
+                         [s.height for s in self.cache.summaries(1, 7)])
+
+    def test_latest_height_is_none_if_nothing_cached(self):
+        self.assertIsNone(self.cache.latest_height)
+
+    def test_latest_height_is_highest_height_cached(self):
+        for height in [3, 12, 6]:
+            self.cache.put(dummy_summary(height))
+
+        self.assertEqual(12, self.cache.latest_height)
+
+    def test_latest_height_is_kept_after_reopening(self):
+        for height in [3, 12, 6]:
+            self.cache.put(dummy_summary(height))
+        self.cache.close()
+
+        self.cache = self._cache()
+        self.assertEqual(12, self.cache.latest_height)
+
+    def test_layout_is_that_of_existing_cache(self):
+        self.assertEqual((self.capacity, self.max_validators),
+                         BlockCache.layout(self.file))
+
+    def test_layout_is_none_if_no_cache(self):
+        self.assertIsNone(BlockCache.layout(self.file + '.missing'))
+
+
+class TestSummariseBlock(unittest.TestCase):
+
+    def test_signers_are_validators_with_signatures(self):
+        block = {'block': {
+            'header': {'time': '2020-01-01T00:00:05.123456789Z',
+                       'proposer_address': 'AAAA'},
+            'last_commit': {'signatures': [
+                {'validator_address': 'AAAA', 'signature': 'sig'},
+                {'validator_address': 'BBBB', 'signature': 'sig'},
+                {'validator_address': '', 'signature': None}]}}}
+
+        self.assertEqual(
+            BlockSummary(5, datetime(2020, 1, 1, 0, 0, 5, 123456), 'AAAA',
+                         {'AAAA', 'BBBB'}, 3, 1),
+            summarise_block(5, block))
+
+    def test_validators_hash_is_that_in_header(self):
+        block = {'block': {
+            'header': {'time': '2020-01-01T00:00:05Z',
+                       'validators_hash': 'CD' * 32},
+            'last_commit': {'signatures': []}}}
+
+        self.assertEqual('CD' * 32, summarise_block(5, block).validators_hash)
+
+    def test_signers_are_validators_with_precommits(self):
+        block = {'block': {
+            'header': {'time': '2020-01-01T00:00:05Z'},
+            'last_commit': {'precommits': [
+                {'validator_address': 'AAAA'}, None]}}}
+
+        summary = summarise_block(5, block)
+        self.assertEqual({'AAAA'}, summary.signers)
+        self.assertEqual(1, summary.missing)
@@ -0,0 +1,128 @@
+import logging
+import random
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.monitoring.monitor_utils.block_pipeline import BlockPipeline
+from src.utils.metrics import BLOCK_PIPELINE_QUEUE_DEPTH
+from test.test_helpers import DummyException
+
+
+def dummy_summary(height: int) -> BlockSummary:
+    return BlockSummary(height, datetime(2020, 1, 1), 'AAAA', {'AAAA'}, 1, 0)
+
+
+class TestBlockPipeline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.monitor_name = 'testmonitor'
+        self.fetch_workers = 4
+        self.queue_size = 8
+
+        self.lock = threading.Lock()
+        self.fetched = []
+        self.evaluated = []
+        self.max_ahead = 0
+        self.failing_height = None
+        self.delays = random.Random(0)
+        self.pipelines = []
+
+    def tearDown(self) -> None:
+        for pipeline in self.pipelines:
+            pipeline.close()
+
+    def _fetch(self, height: int) -> bytes:
+        # Blocks take a random time to fetch, so they arrive out of order
+        with self.lock:
+            delay = self.delays.uniform(0, 0.005)
+            self.fetched.append(height)
+            self.max_ahead = max(self.max_ahead,
+                                 len(self.fetched) - len(self.evaluated))
+        time.sleep(delay)
+        if height == self.failing_height:
+            raise DummyException()
+        return str(height).encode()
+
+    def _decode(self, height: int, fetched: bytes) -> BlockSummary:
+        self.assertEqual(str(height).encode(), fetched)
+        return dummy_summary(height)
+
+    def _evaluate(self, summary: BlockSummary) -> None:
+        with self.lock:
+            self.evaluated.append(summary.height)
+
+    def _fail(self) -> None:
+        raise DummyException()
+
+    def _pipeline(self, fetch=None) -> BlockPipeline:
+        pipeline = BlockPipeline(self.monitor_name, fetch or self._fetch,
+                                 self._decode, self.fetch_workers,
+                                 self.queue_size, self.logger)
+        self.pipelines.append(pipeline)
+        return pipeline
+
+    def _pipeline_threads(self):
+        return [t for t in threading.enumerate()
+                if t.name.startswith(self.monitor_name + ' pipeline')]
+
+    def test_blocks_evaluated_in_order_of_height(self):
+        self._pipeline().run(1, 50, self._evaluate)
+
+        self.assertEqual(list(range(1, 51)), self.evaluated)
+        self.assertEqual(set(range(1, 51)), set(self.fetched))
+
+    def test_blocks_fetched_concurrently(self):
+        # Each fetch waits until as many blocks as workers are being fetched
+        barrier = threading.Barrier(self.fetch_workers, timeout=5)
+
+        def fetch(height):
+            barrier.wait()
+            return str(height).encode()
+
+        self._pipeline(fetch).run(1, self.fetch_workers * 3, self._evaluate)
+
+        self.assertEqual(list(range(1, self.fetch_workers * 3 + 1)),
+                         self.evaluated)
+
+    def test_no_more_than_queue_size_blocks_fetched_ahead(self):
+        self._pipeline().run(1, 100, self._evaluate)
+
+        self.assertLessEqual(self.max_ahead, self.queue_size)
+
+    def test_blocks_before_failed_block_evaluated_and_error_raised(self):
+        self.failing_height = 20
+
+        self.assertRaises(DummyException, self._pipeline().run, 1, 50,
+                          self._evaluate)
+        self.assertEqual(list(range(1, 20)), self.evaluated)
+
+    def test_error_raised_by_evaluation_stops_pipeline(self):
+        def evaluate(summary):
+            if summary.height == 10:
+                raise DummyException()
+            self._evaluate(summary)
+
+        self.assertRaises(DummyException, self._pipeline().run, 1, 1000,
+                          evaluate)
+        self.assertEqual(list(range(1, 10)), self.evaluated)
+        self.assertLess(len(self.fetched), 1000)
+
+    def test_queue_depths_are_zero_once_done(self):
+        self._pipeline().run(1, 20, self._evaluate)
+
+        for stage in ['fetch', 'decode', 'evaluate']:
+            self.assertEqual(0, BLOCK_PIPELINE_QUEUE_DEPTH.labels(
+                self.monitor_name, stage).value)
+
+    def test_no_threads_left_once_closed(self):
+        pipeline = self._pipeline()
+        pipeline.run(1, 20, self._evaluate)
+        self.assertRaises(DummyException, pipeline.run, 1, 1000,
+                          lambda summary: self._fail())
+        pipeline.close()
+
+        self.assertEqual([], self._pipeline_threads())
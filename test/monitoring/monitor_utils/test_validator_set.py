@@ -0,0 +1,99 @@
+import logging
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.monitoring.monitor_utils.validator_set import ValidatorSetCache, \
+    get_validator_set
+
+GET_COSMOS_JSON_FUNCTION = \
+    'src.monitoring.monitor_utils.validator_set.get_cosmos_json'
+
+
+def dummy_summary(height: int, validators_hash: str) -> BlockSummary:
+    return BlockSummary(height, datetime(2020, 1, 1), 'AAAA', {'AAAA'}, 1, 0,
+                        validators_hash)
+
+
+def dummy_page(addresses, total=None):
+    result = {'validators': [{'address': a} for a in addresses]}
+    if total is not None:
+        result['total'] = str(total)
+    return result
+
+
+class TestGetValidatorSet(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+
+    def test_all_pages_fetched(self):
+        pages = [dummy_page(['A', 'B'], 5), dummy_page(['C', 'D'], 5),
+                 dummy_page(['E'], 5)]
+        with patch(GET_COSMOS_JSON_FUNCTION, side_effect=pages) as get:
+            addresses = get_validator_set('rpc', 10, 2, self.logger)
+
+        self.assertEqual(['A', 'B', 'C', 'D', 'E'], addresses)
+        get.assert_called_with('rpc/validators?height=10&page=3&per_page=2',
+                               self.logger)
+
+    def test_single_fetch_if_validators_not_paginated(self):
+        with patch(GET_COSMOS_JSON_FUNCTION,
+                   return_value=dummy_page(['A', 'B', 'C'])) as get:
+            addresses = get_validator_set('rpc', 10, 2, self.logger)
+
+        self.assertEqual(['A', 'B', 'C'], addresses)
+        self.assertEqual(1, get.call_count)
+
+
+class TestValidatorSetCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.fetched = []
+        self.validator_sets = {}
+        self.cache = ValidatorSetCache(self._fetch, self.logger)
+
+    def _fetch(self, height):
+        self.fetched.append(height)
+        return self.validator_sets.get(height, ['A', 'B'])
+
+    def test_validators_fetched_for_height_of_last_commit(self):
+        validators, changed = self.cache.validators_of_last_commit(
+            dummy_summary(10, 'H1'))
+
+        self.assertEqual(['A', 'B'], validators)
+        self.assertTrue(changed)
+        self.assertEqual([9], self.fetched)
+
+    def test_validators_not_fetched_again_while_hash_unchanged(self):
+        self.cache.validators_of_last_commit(dummy_summary(10, 'H1'))
+        for height in range(11, 20):
+            self.cache.validators_of_last_commit(dummy_summary(height, 'H1'))
+
+        # Once more to learn the hash of the fetched set
+        self.assertEqual([9, 10], self.fetched)
+
+    def test_validators_fetched_again_once_hash_changes(self):
+        for height in range(10, 13):
+            self.cache.validators_of_last_commit(dummy_summary(height, 'H1'))
+        self.validator_sets[13] = ['A', 'B', 'C']
+        self.cache.validators_of_last_commit(dummy_summary(13, 'H2'))
+
+        # The new set only signs the commit of the block after it
+        validators, changed = self.cache.validators_of_last_commit(
+            dummy_summary(14, 'H2'))
+
+        self.assertEqual(['A', 'B', 'C'], validators)
+        self.assertTrue(changed)
+        self.assertEqual([9, 10, 13], self.fetched)
+
+    def test_validators_fetched_again_if_heights_skipped(self):
+        self.cache.validators_of_last_commit(dummy_summary(10, 'H1'))
+        self.cache.validators_of_last_commit(dummy_summary(11, 'H1'))
+        _, changed = self.cache.validators_of_last_commit(
+            dummy_summary(20, 'H1'))
+
+        self.assertFalse(changed)
+        self.assertEqual([9, 10, 19], self.fetched)
@@ -7,6 +7,7 @@ from redis import ConnectionError as RedisConnectionError
 from src.alerting.channels.channel import ChannelSet
 from src.monitoring.monitors.github import GitHubMonitor
 from src.utils.redis_api import RedisApi
+from src.utils.state_store import MemoryStateStore, StateStore
 from test import TestInternalConf, TestUserConf
 from test.test_helpers import CounterChannel
 
@@ -87,6 +88,10 @@ class TestGitHubMonitorWithRedis(unittest.TestCase):
         except RedisConnectionError:
             raise Exception('Redis is not online.')
 
+    def _create_state_store(self) -> StateStore:
+        return RedisApi(self.logger, self.db, self.host, self.port,
+                        self.password)
+
     def setUp(self) -> None:
         self.logger = logging.getLogger('dummy')
         self.monitor_name = 'testmonitor'
@@ -100,8 +105,7 @@ class TestGitHubMonitorWithRedis(unittest.TestCase):
         self.host = TestUserConf.redis_host
         self.port = TestUserConf.redis_port
         self.password = TestUserConf.redis_password
-        self.redis = RedisApi(self.logger, self.db, self.host,
-                              self.port, self.password)
+        self.redis = self._create_state_store()
         self.redis.delete_all_unsafe()
 
         try:
@@ -148,3 +152,14 @@ class TestGitHubMonitorWithRedis(unittest.TestCase):
         # Assert
         key = self.redis_prefix + self.repo_name
         self.assertIsNone(self.redis.get_int(key))
+
+
+class TestGitHubMonitorWithMemoryStateStore(TestGitHubMonitorWithRedis):
+    # The same tests, run in-process against the memory state store
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        pass
+
+    def _create_state_store(self) -> StateStore:
+        return MemoryStateStore(self.logger)
@@ -0,0 +1,67 @@
+import logging
+import threading
+import unittest
+from datetime import datetime
+
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.monitors.monitor_starters import start_network_monitor
+from src.utils.clock import VirtualClock
+from src.utils.metrics import MONITOR_LOOP_OVERRUNS
+
+
+class DummyNetworkMonitor:
+
+    def __init__(self, clock: VirtualClock, round_seconds: float,
+                 rounds: int, stop_event: threading.Event) -> None:
+        self.monitor_name = 'testmonitorstarters'
+        self.channels = ChannelSet([])
+        self.round_times = []
+        self.saved_times = []
+        self._clock = clock
+        self._round_seconds = round_seconds
+        self._rounds = rounds
+        self._stop_event = stop_event
+
+    def monitor(self) -> None:
+        self.round_times.append(self._clock.now())
+        self._clock.advance(self._round_seconds)
+        if len(self.round_times) == self._rounds:
+            self._stop_event.set()
+
+    def save_state(self) -> None:
+        self.saved_times.append(self._clock.now())
+
+    def is_syncing(self) -> bool:
+        return False
+
+
+class TestMonitorStarters(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.clock = VirtualClock(datetime(2020, 1, 1))
+        self.stop_event = threading.Event()
+        self.period = 10
+
+    def test_rounds_are_a_period_apart_on_virtual_clock(self):
+        monitor = DummyNetworkMonitor(self.clock, 2, 3, self.stop_event)
+        start_network_monitor(monitor, self.period, self.logger,
+                              self.stop_event, self.clock)
+
+        self.assertEqual([datetime(2020, 1, 1, 0, 0, 0),
+                          datetime(2020, 1, 1, 0, 0, 12),
+                          datetime(2020, 1, 1, 0, 0, 24)],
+                         monitor.round_times)
+        self.assertEqual(datetime(2020, 1, 1, 0, 0, 26),
+                         monitor.saved_times[-1])
+
+    def test_overrun_measured_on_virtual_clock(self):
+        overruns = MONITOR_LOOP_OVERRUNS.labels('testmonitorstarters')
+        before = overruns.value
+
+        monitor = DummyNetworkMonitor(self.clock, self.period + 1, 2,
+                                      self.stop_event)
+        start_network_monitor(monitor, self.period, self.logger,
+                              self.stop_event, self.clock)
+
+        self.assertEqual(before + 2, overruns.value)
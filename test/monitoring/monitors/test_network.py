@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.monitor_utils.block_cache import BlockCache
+from src.monitoring.monitors.network import NetworkMonitor
+from src.node.node import Node, NodeType
+from src.utils.clock import VirtualClock
+from src.utils.state_encoding import decode_monitor_state
+from src.utils.state_store import MemoryStateStore
+from test import TestInternalConf
+from test.test_helpers import CounterChannel, DummyException
+
+GET_COSMOS_JSON_FUNCTION = \
+    'src.monitoring.monitors.network.get_cosmos_json'
+GET_CONTENT_FUNCTION = 'src.monitoring.monitors.network.get_content'
+LIVE_CHECK_FUNCTION = 'src.monitoring.monitors.network.live_check'
+GET_VALIDATOR_SET_FUNCTION = \
+    'src.monitoring.monitors.network.get_validator_set'
+DUMMY_BLOCK_TIME = '2020-01-01T00:00:00.123456789Z'
+
+
+def dummy_block(signers, total, validators_hash=''):
+    signatures = [{'validator_address': a, 'signature': 'sig'}
+                  for a in signers]
+    signatures += [{'validator_address': '', 'signature': None}
+                   for _ in range(total - len(signers))]
+    return json.dumps({'jsonrpc': '2.0', 'id': -1, 'result': {'block': {
+        'header': {'time': DUMMY_BLOCK_TIME,
+                   'validators_hash': validators_hash},
+        'last_commit': {'signatures': signatures}
+    }}}).encode('UTF-8')
+
+
+class TestNetworkMonitor(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.monitor_name = 'testnetworkmonitor'
+        self.counter_channel = CounterChannel(self.logger)
+        self.channel_set = ChannelSet([self.counter_channel])
+
+        self.full_node = Node('full_node', 'dummy.rpc.url',
+                              NodeType.NON_VALIDATOR_FULL_NODE, None,
+                              'network', None, TestInternalConf)
+        self.validators = [
+            Node('validator_{}'.format(i), None, NodeType.VALIDATOR_FULL_NODE,
+                 'address_{}'.format(i), 'network', None, TestInternalConf)
+            for i in range(3)]
+        self.others = ['other_{}'.format(i) for i in range(7)]
+
+        self.clock = VirtualClock()
+        self.monitor = NetworkMonitor(
+            self.monitor_name, self.channel_set, self.logger, 500, None,
+            [self.full_node], self.validators, TestInternalConf,
+            clock=self.clock)
+        self.monitor.last_full_node_used = self.full_node
+        self.no_new_blocks_alert_delay_with_error_margin = \
+            TestInternalConf.no_new_blocks_alert_delay.total_seconds() + 0.5
+
+    def tearDown(self) -> None:
+        self.monitor.close()
+
+    def _check_block(self, signers, total):
+        with patch(GET_CONTENT_FUNCTION,
+                   return_value=dummy_block(signers, total)), \
+                patch(LIVE_CHECK_FUNCTION, return_value=True):
+            self.monitor._check_block(100)
+
+    def test_no_incident_if_few_validators_missing(self):
+        signers = self.others + ['address_1', 'address_2']
+        self._check_block(signers, 10)
+
+        self.assertFalse(self.monitor.in_network_wide_incident)
+        self.assertTrue(self.counter_channel.no_alerts())
+
+    def test_single_incident_alert_if_many_validators_missing(self):
+        signers = self.others[:3]
+        for i in range(20):
+            self._check_block(signers, 10)
+
+        self.assertTrue(self.monitor.in_network_wide_incident)
+        self.assertEqual(1, self.counter_channel.major_count)
+        self.assertEqual(0, self.counter_channel.minor_count)
+        self.assertEqual(0, self.counter_channel.info_count)
+
+    def test_minor_incident_alert_if_own_validators_not_missing(self):
+        signers = ['address_0', 'address_1', 'address_2']
+        self._check_block(signers, 10)
+
+        self.assertTrue(self.monitor.in_network_wide_incident)
+        self.assertEqual(1, self.counter_channel.minor_count)
+        self.assertEqual(0, self.counter_channel.major_count)
+
+    def test_validators_keep_counting_missed_blocks_during_incident(self):
+        signers = self.others[:3]
+        for i in range(3):
+            self._check_block(signers, 10)
+
+        for v in self.validators:
+            self.assertEqual(3, v.consecutive_blocks_missed_so_far)
+
+    def test_info_alert_when_incident_is_over(self):
+        self._check_block(self.others[:3], 10)
+        self.counter_channel.reset()
+
+        self._check_block(self.others + ['address_0', 'address_1',
+                                         'address_2'], 10)
+
+        self.assertFalse(self.monitor.in_network_wide_incident)
+        self.assertEqual(1, self.counter_channel.info_count)
+        self.assertEqual(0, self.counter_channel.major_count)
+
+    def test_no_clear_alerts_for_blocks_missed_during_incident(self):
+        for i in range(5):
+            self._check_block(self.others[:3], 10)
+        self.counter_channel.reset()
+
+        self._check_block(self.others + ['address_0', 'address_1',
+                                         'address_2'], 10)
+
+        # Only the alert that the incident is over
+        self.assertEqual(1, self.counter_channel.info_count)
+        for v in self.validators:
+            self.assertFalse(v.is_missing_blocks)
+
+    def test_clear_alert_if_missing_blocks_before_incident(self):
+        for i in range(3):
+            self._check_block(self.others + ['address_1', 'address_2'], 10)
+        for i in range(5):
+            self._check_block(self.others[:3], 10)
+        self.counter_channel.reset()
+
+        self._check_block(self.others + ['address_0', 'address_1',
+                                         'address_2'], 10)
+
+        # The incident is over and validator_0 is no longer missing blocks
+        self.assertEqual(2, self.counter_channel.info_count)
+
+    def test_missed_blocks_counted_from_scratch_after_incident(self):
+        for i in range(5):
+            self._check_block(self.others[:3], 10)
+
+        self._check_block(self.others + ['address_1', 'address_2'], 10)
+
+        self.assertEqual(
+            1, self.validators[0].consecutive_blocks_missed_so_far)
+        self.assertFalse(self.validators[1].is_missing_blocks)
+
+    def test_no_new_blocks_alert_if_chain_height_does_not_change(self):
+        self.monitor._check_chain_height(100)
+        self.monitor._check_chain_height(100)
+        self.assertTrue(self.counter_channel.no_alerts())
+
+        self.clock.sleep(self.no_new_blocks_alert_delay_with_error_margin)
+        self.monitor._check_chain_height(100)
+        self.monitor._check_chain_height(100)
+        self.assertEqual(1, self.counter_channel.major_count)
+
+    def test_new_blocks_again_alert_if_chain_height_changes_after_alert(self):
+        self.monitor._check_chain_height(100)
+        self.clock.sleep(self.no_new_blocks_alert_delay_with_error_margin)
+        self.monitor._check_chain_height(100)
+        self.counter_channel.reset()
+
+        self.monitor._check_chain_height(101)
+        self.assertEqual(1, self.counter_channel.info_count)
+
+    def _check_chain_height_with_other_node(self, other_node_status):
+        other_node = Node('other_full_node', 'other.rpc.url',
+                          NodeType.NON_VALIDATOR_FULL_NODE, None, 'network',
+                          None, TestInternalConf)
+        self.monitor._all_full_nodes.append(other_node)
+        with patch(GET_COSMOS_JSON_FUNCTION,
+                   side_effect=other_node_status) as get_cosmos_json, \
+                patch(LIVE_CHECK_FUNCTION, return_value=True):
+            self.monitor._check_chain_height(100)
+            self.clock.sleep(self.no_new_blocks_alert_delay_with_error_margin)
+            self.monitor._check_chain_height(100)
+        return get_cosmos_json
+
+    def test_no_new_blocks_alert_if_other_full_nodes_at_same_height(self):
+        get_cosmos_json = self._check_chain_height_with_other_node(
+            [{'sync_info': {'latest_block_height': '100'}}])
+
+        get_cosmos_json.assert_called_once_with('other.rpc.url/status',
+                                                self.logger)
+        self.assertEqual(1, self.counter_channel.major_count)
+
+    def test_no_new_blocks_alert_if_other_full_nodes_not_reachable(self):
+        self._check_chain_height_with_other_node(DummyException())
+
+        self.assertEqual(1, self.counter_channel.major_count)
+
+    def test_no_alert_if_other_full_node_is_ahead_of_node_used(self):
+        self._check_chain_height_with_other_node(
+            [{'sync_info': {'latest_block_height': '105'}}])
+
+        self.assertTrue(self.counter_channel.no_alerts())
+
+    def test_cached_block_is_not_fetched_again(self):
+        directory = tempfile.TemporaryDirectory()
+        cache = BlockCache(os.path.join(directory.name, 'cache.bin'), 100,
+                           16, self.logger)
+        monitor = NetworkMonitor(
+            self.monitor_name, self.channel_set, self.logger, 500, None,
+            [self.full_node], self.validators, TestInternalConf,
+            block_cache=cache)
+        signers = self.others + ['address_0', 'address_1', 'address_2']
+
+        with patch(GET_CONTENT_FUNCTION,
+                   return_value=dummy_block(signers, 10)) as get_content, \
+                patch(LIVE_CHECK_FUNCTION, return_value=True):
+            monitor._check_block(100)
+            monitor._check_block(100)
+
+        self.assertEqual(1, get_content.call_count)
+        self.assertEqual(set(signers), cache.get(100).signers)
+        cache.close()
+        directory.cleanup()
+
+    def _monitor(self, chain_height, signers_by_height):
+        status = {'sync_info': {'latest_block_height': str(chain_height)}}
+
+        def get_content(endpoint, _):
+            height = int(endpoint.split('=')[1])
+            return dummy_block(signers_by_height(height), 10)
+
+        with patch(GET_COSMOS_JSON_FUNCTION, return_value=status), \
+                patch(GET_CONTENT_FUNCTION, side_effect=get_content), \
+                patch(LIVE_CHECK_FUNCTION, return_value=True):
+            self.monitor.monitor()
+
+    def test_monitor_checks_single_block_if_one_block_behind(self):
+        self.monitor._last_height_checked = 99
+        with patch.object(self.monitor._block_pipeline, 'run') as run:
+            self._monitor(100, lambda _: self.others)
+
+        run.assert_not_called()
+        self.assertEqual(100, self.monitor._last_height_checked)
+
+    def test_monitor_checks_blocks_behind_using_pipeline(self):
+        signers = self.others + ['address_0', 'address_1', 'address_2']
+        self.monitor._last_height_checked = 10
+        self._monitor(50, lambda h: signers if h % 10 != 0
+                      else signers[:-1])
+
+        self.monitor._validator_table.flush_signed_blocks()
+        self.assertEqual(50, self.monitor._last_height_checked)
+        self.assertEqual(40, self.validators[0].signing_window.signed_count)
+        self.assertEqual(36, self.validators[2].signing_window.signed_count)
+        self.assertTrue(self.validators[2].is_missing_blocks)
+
+    def test_monitor_checks_up_to_max_blocks_per_round(self):
+        max_blocks = TestInternalConf.block_pipeline_max_blocks_per_round
+        self.monitor._last_height_checked = 0
+        self._monitor(max_blocks * 3, lambda _: self.others)
+
+        self.assertEqual(max_blocks, self.monitor._last_height_checked)
+        self.assertTrue(self.monitor.is_syncing())
+
+    def test_monitor_keeps_blocks_checked_before_failed_block(self):
+        def signers_by_height(height):
+            if height == 16:
+                raise DummyException()
+            return self.others
+
+        self.monitor._last_height_checked = 10
+        self.assertRaises(DummyException, self._monitor, 50,
+                          signers_by_height)
+
+        self.assertEqual(15, self.monitor._last_height_checked)
+
+    def test_last_height_checked_restored_from_saved_state(self):
+        redis = MemoryStateStore(self.logger)
+        monitor = NetworkMonitor(
+            self.monitor_name, self.channel_set, self.logger, 500, redis,
+            [self.full_node], [], TestInternalConf)
+        monitor._last_height_checked = 123
+        monitor.save_state()
+
+        restored = NetworkMonitor(
+            self.monitor_name, self.channel_set, self.logger, 500, redis,
+            [self.full_node], [], TestInternalConf)
+        self.assertEqual(123, restored._last_height_checked)
+
+    def test_alive_state_saved_at_time_of_clock(self):
+        redis = MemoryStateStore(self.logger)
+        self.clock.advance(3600)
+        monitor = NetworkMonitor(
+            self.monitor_name, self.channel_set, self.logger, 500, redis,
+            [self.full_node], [], TestInternalConf, clock=self.clock)
+        monitor.save_state()
+
+        state = decode_monitor_state(redis.get(
+            TestInternalConf.redis_network_monitor_alive_key_prefix +
+            self.monitor_name))
+        self.assertEqual(self.clock.now(), state.alive_at)
+
+    def test_last_height_checked_outlives_alive_key(self):
+        clock = VirtualClock()
+        redis = MemoryStateStore(self.logger, clock=clock)
+        alive_key = \
+            TestInternalConf.redis_network_monitor_alive_key_prefix + \
+            self.monitor_name
+        with patch.object(TestInternalConf,
+                          'redis_network_monitor_alive_key_timeout', 10), \
+                patch.object(TestInternalConf,
+                             'redis_network_monitor_last_height_key_timeout',
+                             100):
+            monitor = NetworkMonitor(
+                self.monitor_name, self.channel_set, self.logger, 500, redis,
+                [self.full_node], [], TestInternalConf)
+            monitor._last_height_checked = 123
+            monitor.save_state()
+            clock.advance(50)
+
+            restored = NetworkMonitor(
+                self.monitor_name, self.channel_set, self.logger, 500, redis,
+                [self.full_node], [], TestInternalConf)
+
+        self.assertFalse(redis.exists_unsafe(alive_key))
+        self.assertEqual(123, restored._last_height_checked)
+
+
+class TestNetworkMonitorWithValidatorDiscovery(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.counter_channel = CounterChannel(self.logger)
+        self.channel_set = ChannelSet([self.counter_channel])
+
+        self.full_node = Node('full_node', 'dummy.rpc.url',
+                              NodeType.NON_VALIDATOR_FULL_NODE, None,
+                              'network', None, TestInternalConf)
+        self.validator = Node('validator', None, NodeType.VALIDATOR_FULL_NODE,
+                              'address_0', 'network', None, TestInternalConf)
+        self.validator_set = ['address_{}'.format(i) for i in range(10)]
+
+        with patch.object(TestInternalConf, 'validator_discovery_enabled',
+                          True):
+            self.monitor = NetworkMonitor(
+                'testnetworkmonitor', self.channel_set, self.logger, 500,
+                None, [self.full_node], [self.validator], TestInternalConf)
+
+    def _check_blocks(self, heights, signers):
+        with patch(GET_CONTENT_FUNCTION, return_value=dummy_block(
+                signers, len(self.validator_set), 'AB' * 32)), \
+                patch(GET_VALIDATOR_SET_FUNCTION,
+                      return_value=self.validator_set) as get_validator_set, \
+                patch(LIVE_CHECK_FUNCTION, return_value=True):
+            for height in heights:
+                self.monitor._check_block(height)
+        return get_validator_set.call_count
+
+    def test_signing_tracked_for_every_active_validator(self):
+        self._check_blocks(range(100, 110), self.validator_set[:-1])
+
+        discovered = self.monitor._discovered_validators
+        self.assertEqual(set(self.validator_set[1:]), set(discovered))
+        self.assertEqual(10, discovered['address_9'].signing_window
+                         .observed_count)
+        self.assertEqual(0, discovered['address_9'].signing_window
+                         .signed_count)
+        self.assertEqual(10, discovered['address_1'].signing_window
+                         .signed_count)
+
+    def test_validator_set_fetched_again_only_once_hash_known(self):
+        self.assertEqual(2, self._check_blocks(range(100, 110),
+                                               self.validator_set))
+
+    def test_alerts_of_discovered_validators_only_logged(self):
+        self._check_blocks(range(100, 110), self.validator_set[:-1])
+
+        self.assertTrue(self.counter_channel.no_alerts())
+        self.assertTrue(self.monitor._discovered_validators['address_9']
+                        .is_missing_blocks)
+
+    def test_alerts_of_monitored_validators_still_sent(self):
+        self._check_blocks(range(100, 110), self.validator_set[1:])
+
+        self.assertFalse(self.counter_channel.no_alerts())
+        self.assertNotIn('address_0', self.monitor._discovered_validators)
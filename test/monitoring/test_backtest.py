@@ -0,0 +1,171 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from src.alerting.alerts.alerts import CannotAccessNodeAlert, \
+    MissedBlocksAlert, PeersDecreasedAlert
+from src.monitoring.backtest import BacktestData, NodeSnapshot, \
+    read_capture, run_backtest
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from test import TestInternalConf
+
+VALIDATOR = 'AAAA'
+OTHER = 'BBBB'
+RPC_URL = 'http://node:26657'
+
+
+def dummy_blocks(missed_heights, count=20):
+    # Few enough validators miss each block for it not to be network-wide
+    start = datetime(2020, 1, 1)
+    others = {OTHER + str(i) for i in range(9)}
+    return [BlockSummary(h, start + timedelta(seconds=h), OTHER,
+                         others if h in missed_heights
+                         else others | {VALIDATOR},
+                         10, 1 if h in missed_heights else 0)
+            for h in range(1, count + 1)]
+
+
+def dummy_snapshot(at, no_of_peers, is_up=True):
+    return NodeSnapshot(at, RPC_URL, is_up, VALIDATOR, 10, False,
+                        no_of_peers) if is_up \
+        else NodeSnapshot(at, RPC_URL, False)
+
+
+def capture_record(t, url, result=None, error=None):
+    record = {'t': t, 'm': 'GET', 'u': url, 'e': 0.001}
+    if error is not None:
+        record['x'] = error
+    else:
+        record['s'] = 200
+        record['b'] = json.dumps({'jsonrpc': '2.0', 'id': -1,
+                                  'result': result})
+    return record
+
+
+class TestBacktest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+
+    def _alerts_of_type(self, result, alert_type):
+        return [a for _, a in result.alerts if isinstance(a, alert_type)]
+
+    def test_no_alerts_if_no_blocks_missed(self):
+        result = run_backtest('test', TestInternalConf,
+                              BacktestData(dummy_blocks([]), []), [VALIDATOR],
+                              self.logger)
+
+        self.assertEqual([], result.alerts)
+        self.assertEqual(20, result.blocks)
+
+    def test_missed_blocks_alerted_on(self):
+        result = run_backtest('test', TestInternalConf,
+                              BacktestData(dummy_blocks(range(5, 10)), []),
+                              [VALIDATOR], self.logger)
+
+        self.assertEqual(4, len(self._alerts_of_type(result,
+                                                     MissedBlocksAlert)))
+
+    def test_threshold_sets_do_not_share_state(self):
+        data = BacktestData(dummy_blocks(range(5, 10)), [])
+        first = run_backtest('first', TestInternalConf, data, [VALIDATOR],
+                             self.logger)
+        second = run_backtest('second', TestInternalConf, data, [VALIDATOR],
+                              self.logger)
+
+        self.assertEqual(first.counts(), second.counts())
+
+    def test_only_given_validators_alerted_on(self):
+        result = run_backtest('test', TestInternalConf,
+                              BacktestData(dummy_blocks(range(5, 10)), []),
+                              [OTHER + '0'], self.logger)
+
+        self.assertEqual([], result.alerts)
+
+    def test_validators_not_discovered_even_if_discovery_enabled(self):
+        with patch.object(TestInternalConf, 'validator_discovery_enabled',
+                          True):
+            result = run_backtest(
+                'test', TestInternalConf,
+                BacktestData(dummy_blocks(range(5, 10)), []), [VALIDATOR],
+                self.logger)
+
+        self.assertEqual(4, len(self._alerts_of_type(result,
+                                                     MissedBlocksAlert)))
+        self.assertEqual(20, result.blocks)
+
+    def test_node_snapshots_alerted_on(self):
+        snapshots = [dummy_snapshot(0, 10), dummy_snapshot(10, 1)]
+        result = run_backtest('test', TestInternalConf,
+                              BacktestData([], snapshots), [VALIDATOR],
+                              self.logger)
+
+        self.assertEqual(1, len(self._alerts_of_type(result,
+                                                     PeersDecreasedAlert)))
+        self.assertEqual([('PeersDecreasedAlert', 'major')],
+                         list(result.counts()))
+
+    def test_downtime_alerted_on_using_snapshot_times(self):
+        # The node is down for a minute, without any waiting
+        delay = TestInternalConf.downtime_initial_alert_delay.total_seconds()
+        snapshots = [dummy_snapshot(0, 10)]
+        snapshots += [dummy_snapshot(t, 0, is_up=False)
+                      for t in range(1, 61)]
+        result = run_backtest('test', TestInternalConf,
+                              BacktestData([], snapshots), [VALIDATOR],
+                              self.logger)
+
+        alerts = self._alerts_of_type(result, CannotAccessNodeAlert)
+        self.assertEqual(1, len(alerts))
+        self.assertLess(result.duration, delay)
+
+
+class TestReadCapture(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, 'capture.jsonl.gz')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _write(self, records):
+        with gzip.open(self.file, 'wt', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+    def test_blocks_and_snapshots_read_from_capture(self):
+        status = {'validator_info': {'address': VALIDATOR,
+                                     'voting_power': '10'},
+                  'sync_info': {'catching_up': False}}
+        block = {'block': {
+            'header': {'time': '2020-01-01T00:00:05Z'},
+            'last_commit': {'signatures': [
+                {'validator_address': VALIDATOR, 'signature': 'sig'}]}}}
+        self._write([
+            capture_record(0.1, RPC_URL + '/status', status),
+            capture_record(0.2, RPC_URL + '/net_info', {'n_peers': '7'}),
+            capture_record(0.3, RPC_URL + '/block?height=5', block),
+            capture_record(0.4, RPC_URL + '/status', error='ReadTimeout'),
+        ])
+
+        data = read_capture(self.file)
+
+        self.assertEqual([5], [b.height for b in data.blocks])
+        self.assertEqual({VALIDATOR}, data.blocks[0].signers)
+        self.assertEqual([NodeSnapshot(0.2, RPC_URL, True, VALIDATOR, 10,
+                                       False, 7),
+                          NodeSnapshot(0.4, RPC_URL, False)], data.snapshots)
+
+    def test_capture_cut_short_is_read_up_to_where_it_was_cut(self):
+        with gzip.open(self.file, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(capture_record(
+                0.1, RPC_URL + '/status', error='ConnectionError')) + '\n')
+            f.write('{"t": 0.2, "m"')
+
+        self.assertEqual(1, len(read_capture(self.file).snapshots))
@@ -1,16 +1,18 @@
 import logging
 import unittest
 from datetime import datetime, timedelta
-from time import sleep
+from unittest.mock import patch
 
-import dateutil.parser
 from redis import ConnectionError as RedisConnectionError
 
 from src.alerting.alerts.alerts import VotingPowerDecreasedByAlert, \
     VotingPowerIncreasedByAlert
 from src.alerting.channels.channel import ChannelSet
-from src.node.node import Node, NodeType
+from src.node.node import Node, NodeType, REDIS_STATE_KEY_SUFFIX
+from src.utils.clock import VirtualClock
 from src.utils.redis_api import RedisApi
+from src.utils.state_encoding import NodeState, decode_node_state
+from src.utils.state_store import MemoryStateStore, StateStore
 from test import TestInternalConf, TestUserConf
 from test.test_helpers import CounterChannel, DummyException
 
@@ -42,15 +44,18 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.voting_power_threshold = \
             TestInternalConf.change_in_voting_power_threshold
 
+        self.clock = VirtualClock()
         self.full_node = Node(name=self.node_name, rpc_url=None,
                               node_type=NodeType.NON_VALIDATOR_FULL_NODE,
                               pubkey=None, network='', redis=None,
-                              internal_conf=TestInternalConf)
+                              internal_conf=TestInternalConf,
+                              clock=self.clock)
 
         self.validator = Node(name=self.node_name, rpc_url=None,
                               node_type=NodeType.VALIDATOR_FULL_NODE,
                               pubkey=None, network='', redis=None,
-                              internal_conf=TestInternalConf)
+                              internal_conf=TestInternalConf,
+                              clock=self.clock)
 
         self.counter_channel = CounterChannel(self.logger)
         self.channel_set = ChannelSet([self.counter_channel])
@@ -86,6 +91,9 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.peers_more_than_full_node_danger_boundary = \
             self.peers_full_node_danger_boundary + 2
 
+    def _wait(self, time_interval: timedelta) -> None:
+        self.clock.sleep(time_interval.total_seconds())
+
     def test_is_validator_true_if_is_validator(self):
         self.assertTrue(self.validator.is_validator)
 
@@ -146,7 +154,7 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.counter_channel.reset()
 
         # ...if enough time passed for an initial alert, a major alert is sent
-        sleep(self.downtime_initial_alert_delay_with_error_margin.seconds)
+        self._wait(self.downtime_initial_alert_delay_with_error_margin)
         NODE.set_as_down(self.channel_set, self.logger)
         self.assertEqual(self.counter_channel.major_count, 1)
         self.assertTrue(NODE.is_down)
@@ -162,7 +170,7 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.counter_channel.reset()
 
         # ...if enough time passed for a reminder, a major alert is sent again
-        sleep(self.downtime_reminder_alert_interval_with_error_margin.seconds)
+        self._wait(self.downtime_reminder_alert_interval_with_error_margin)
         NODE.set_as_down(self.channel_set, self.logger)
         self.assertEqual(self.counter_channel.major_count, 1)
         self.assertTrue(NODE.is_down)
@@ -196,7 +204,7 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.counter_channel.reset()
 
         # ...if enough time passed for an initial alert, a minor alert is sent
-        sleep(self.downtime_initial_alert_delay_with_error_margin.seconds)
+        self._wait(self.downtime_initial_alert_delay_with_error_margin)
         NODE.set_as_down(self.channel_set, self.logger)
         self.assertEqual(self.counter_channel.minor_count, 1)
         self.assertTrue(NODE.is_down)
@@ -212,7 +220,7 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.counter_channel.reset()
 
         # ...if enough time passed for a reminder, a minor alert is sent again
-        sleep(self.downtime_reminder_alert_interval_with_error_margin.seconds)
+        self._wait(self.downtime_reminder_alert_interval_with_error_margin)
         NODE.set_as_down(self.channel_set, self.logger)
         self.assertEqual(self.counter_channel.minor_count, 1)
         self.assertTrue(NODE.is_down)
@@ -256,7 +264,7 @@ class TestNodeWithoutRedis(unittest.TestCase):
     def test_set_as_up_resets_initial_downtime_alert_timing(self):
         self.validator.set_as_down(self.channel_set, self.logger)
         self.validator.set_as_down(self.channel_set, self.logger)
-        sleep(self.downtime_initial_alert_delay_with_error_margin.seconds)
+        self._wait(self.downtime_initial_alert_delay_with_error_margin)
         self.validator.set_as_up(self.channel_set, self.logger)
 
         self.counter_channel.reset()  # ignore previous alerts
@@ -271,7 +279,7 @@ class TestNodeWithoutRedis(unittest.TestCase):
 
         self.validator.set_as_down(self.channel_set, self.logger)
         self.validator.set_as_down(self.channel_set, self.logger)
-        sleep(self.downtime_initial_alert_delay_with_error_margin.seconds)
+        self._wait(self.downtime_initial_alert_delay_with_error_margin)
         # self.validator.set_as_up(self.channel_set, self.logger) # !!
 
         self.counter_channel.reset()  # ignore previous alerts
@@ -283,9 +291,9 @@ class TestNodeWithoutRedis(unittest.TestCase):
     def test_set_as_up_resets_downtime_reminder_alert_timing(self):
         self.validator.set_as_down(self.channel_set, self.logger)
         self.validator.set_as_down(self.channel_set, self.logger)
-        sleep(self.downtime_initial_alert_delay_with_error_margin.seconds)
+        self._wait(self.downtime_initial_alert_delay_with_error_margin)
         self.validator.set_as_down(self.channel_set, self.logger)
-        sleep(self.downtime_reminder_alert_interval_with_error_margin.seconds)
+        self._wait(self.downtime_reminder_alert_interval_with_error_margin)
         self.validator.set_as_up(self.channel_set, self.logger)
 
         self.counter_channel.reset()  # ignore previous alerts
@@ -300,9 +308,9 @@ class TestNodeWithoutRedis(unittest.TestCase):
 
         self.validator.set_as_down(self.channel_set, self.logger)
         self.validator.set_as_down(self.channel_set, self.logger)
-        sleep(self.downtime_initial_alert_delay_with_error_margin.seconds)
+        self._wait(self.downtime_initial_alert_delay_with_error_margin)
         self.validator.set_as_down(self.channel_set, self.logger)
-        sleep(self.downtime_reminder_alert_interval_with_error_margin.seconds)
+        self._wait(self.downtime_reminder_alert_interval_with_error_margin)
         # self.validator.set_as_up(self.channel_set, self.logger) # !!
 
         self.counter_channel.reset()  # ignore previous alerts
@@ -781,6 +789,36 @@ class TestNodeWithoutRedis(unittest.TestCase):
         self.assertEqual(self.counter_channel.info_count, 1)
         self.assertEqual(self.counter_channel.error_count, 0)
 
+    def test_record_signing_raises_no_alert_if_too_few_blocks(self):
+        for height in range(TestInternalConf.signing_window_min_blocks - 1):
+            self.validator.record_signing(height, False, self.channel_set,
+                                          self.logger)
+
+        self.assertTrue(self.counter_channel.no_alerts())
+
+    def test_record_signing_raises_minor_alert_once_if_uptime_low(self):
+        for height in range(TestInternalConf.signing_window_min_blocks * 2):
+            self.validator.record_signing(height, False, self.channel_set,
+                                          self.logger)
+
+        self.assertEqual(self.counter_channel.minor_count, 1)
+        self.assertEqual(self.counter_channel.major_count, 0)
+        self.assertEqual(self.counter_channel.info_count, 0)
+
+    def test_record_signing_raises_info_alert_if_uptime_back_above_danger(
+            self):
+        window_blocks = TestInternalConf.signing_window_blocks
+        for height in range(window_blocks):
+            self.validator.record_signing(height, False, self.channel_set,
+                                          self.logger)
+        self.counter_channel.reset()  # ignore previous alerts
+        for height in range(window_blocks, window_blocks * 2):
+            self.validator.record_signing(height, True, self.channel_set,
+                                          self.logger)
+
+        self.assertEqual(self.counter_channel.minor_count, 0)
+        self.assertEqual(self.counter_channel.info_count, 1)
+
 
 class TestNodeWithRedis(unittest.TestCase):
 
@@ -800,6 +838,10 @@ class TestNodeWithRedis(unittest.TestCase):
         except RedisConnectionError:
             raise Exception('Redis is not online.')
 
+    def _create_state_store(self) -> StateStore:
+        return RedisApi(self.logger, self.db, self.host, self.port,
+                        self.password)
+
     def setUp(self) -> None:
         self.node_name = 'testnode'
         self.network_name = 'testnetwork'
@@ -811,8 +853,7 @@ class TestNodeWithRedis(unittest.TestCase):
         self.host = TestUserConf.redis_host
         self.port = TestUserConf.redis_port
         self.password = TestUserConf.redis_password
-        self.redis = RedisApi(self.logger, self.db, self.host,
-                              self.port, self.password)
+        self.redis = self._create_state_store()
         self.redis.delete_all_unsafe()
 
         try:
@@ -884,14 +925,96 @@ class TestNodeWithRedis(unittest.TestCase):
 
         # Assert
         self.assertEqual(
-            dateutil.parser.parse(self.redis.get_unsafe(
-                self.redis_prefix + '_went_down_at')), self.date)
-        self.assertEqual(
-            self.redis.get_int_unsafe(
-                self.redis_prefix + '_consecutive_blocks_missed'), 123)
-        self.assertEqual(
-            self.redis.get_int_unsafe(self.redis_prefix + '_voting_power'), 456)
-        self.assertTrue(
-            self.redis.get_bool_unsafe(self.redis_prefix + '_catching_up'))
-        self.assertEqual(
-            self.redis.get_int_unsafe(self.redis_prefix + '_no_of_peers'), 789)
+            decode_node_state(self.redis.get_unsafe(
+                self.redis_prefix + REDIS_STATE_KEY_SUFFIX)),
+            NodeState(self.date, 123, 456, True, 789))
+
+    def test_load_state_restores_saved_state(self):
+        self.validator._went_down_at = self.date
+        self.validator._consecutive_blocks_missed = 123
+        self.validator._no_of_peers = 789
+        self.validator.save_state(self.logger)
+
+        restored = Node(name=self.node_name, rpc_url=None,
+                        node_type=NodeType.VALIDATOR_FULL_NODE,
+                        pubkey=None, network=self.network_name,
+                        redis=self.redis, internal_conf=TestInternalConf)
+        restored.load_state(self.logger)
+
+        self.assertEqual(restored._went_down_at, self.date)
+        self.assertEqual(restored.consecutive_blocks_missed_so_far, 123)
+        self.assertIsNone(restored.voting_power)
+        self.assertFalse(restored.catching_up)
+        self.assertEqual(restored.no_of_peers, 789)
+
+    def test_save_state_removes_legacy_state_once_loaded(self):
+        self.redis.set_unsafe(self.redis_prefix + '_voting_power', 456)
+        self.validator.load_state(self.logger)
+        self.validator.save_state(self.logger)
+
+        self.assertEqual([self.redis_prefix + REDIS_STATE_KEY_SUFFIX],
+                         self.redis.get_keys_unsafe())
+        self.assertEqual(self.validator.voting_power, 456)
+
+    def test_load_signing_window_restores_saved_signing_window(self):
+        for height in range(50):
+            self.validator.record_signing(height, height % 2 == 0,
+                                          ChannelSet([]), self.logger)
+        self.validator.save_signing_window(self.logger)
+        self.validator.record_signing(50, True, ChannelSet([]), self.logger)
+        self.validator.save_signing_window(self.logger)
+
+        restored = Node(name=self.node_name, rpc_url=None,
+                        node_type=NodeType.VALIDATOR_FULL_NODE,
+                        pubkey=None, network=self.network_name,
+                        redis=self.redis, internal_conf=TestInternalConf)
+        restored.load_signing_window(self.logger)
+
+        self.assertEqual(restored.signing_window.last_height, 50)
+        self.assertEqual(restored.signing_window.observed_count, 51)
+        self.assertEqual(restored.signing_window.signed_count, 26)
+
+    def test_signing_windows_of_nodes_saved_in_one_write(self):
+        validators = [Node(name='{}_{}'.format(self.node_name, i),
+                           rpc_url=None,
+                           node_type=NodeType.VALIDATOR_FULL_NODE,
+                           pubkey=None, network=self.network_name,
+                           redis=self.redis, internal_conf=TestInternalConf)
+                      for i in range(3)]
+        for v in validators:
+            v.save_signing_window(self.logger)
+        for i, v in enumerate(validators):
+            for height in range(10):
+                v.record_signing(height, height >= i, ChannelSet([]),
+                                 self.logger)
+
+        with patch.object(self.redis, 'set_bits',
+                          wraps=self.redis.set_bits) as set_bits:
+            Node.save_signing_windows(validators, self.logger)
+
+        self.assertEqual(1, set_bits.call_count)
+        for i, v in enumerate(validators):
+            restored = Node(name=v.name, rpc_url=None,
+                            node_type=NodeType.VALIDATOR_FULL_NODE,
+                            pubkey=None, network=self.network_name,
+                            redis=self.redis, internal_conf=TestInternalConf)
+            restored.load_signing_window(self.logger)
+            self.assertEqual(10, restored.signing_window.observed_count)
+            self.assertEqual(10 - i, restored.signing_window.signed_count)
+
+    def test_load_signing_window_changes_nothing_if_nothing_saved(self):
+        self.validator.load_signing_window(self.logger)
+
+        self.assertIsNone(self.validator.signing_window.last_height)
+        self.assertEqual(self.validator.signing_window.observed_count, 0)
+
+
+class TestNodeWithMemoryStateStore(TestNodeWithRedis):
+    # The same tests, run in-process against the memory state store
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        pass
+
+    def _create_state_store(self) -> StateStore:
+        return MemoryStateStore(self.logger)
@@ -0,0 +1,119 @@
+import unittest
+
+from src.node.signing_window import SigningWindow
+
+
+class TestSigningWindow(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.size = 20
+        self.window = SigningWindow(self.size)
+
+    def test_uptime_is_none_if_nothing_recorded(self):
+        self.assertIsNone(self.window.uptime)
+
+    def test_uptime_is_fraction_of_signed_blocks(self):
+        for height in range(10):
+            self.window.record(height, height % 4 != 0)
+
+        self.assertEqual(10, self.window.observed_count)
+        self.assertEqual(7, self.window.signed_count)
+        self.assertEqual(70, self.window.uptime)
+
+    def test_only_last_size_blocks_are_counted(self):
+        for height in range(self.size):
+            self.window.record(height, False)
+        for height in range(self.size, self.size + 5):
+            self.window.record(height, True)
+
+        self.assertEqual(self.size, self.window.observed_count)
+        self.assertEqual(5, self.window.signed_count)
+
+    def test_skipped_heights_are_not_observed(self):
+        for height in range(self.size):
+            self.window.record(height, True)
+        self.window.record(self.size + 4, True)
+
+        self.assertEqual(self.size - 4, self.window.observed_count)
+        self.assertEqual(self.size - 4, self.window.signed_count)
+
+    def test_window_is_cleared_if_more_than_size_heights_skipped(self):
+        for height in range(self.size):
+            self.window.record(height, True)
+        self.window.record(self.size * 3, False)
+
+        self.assertEqual(1, self.window.observed_count)
+        self.assertEqual(0, self.window.signed_count)
+        self.assertIsNone(self.window.take_changes())
+
+    def test_recording_same_height_twice_overwrites_it(self):
+        self.window.record(1, False)
+        self.window.record(1, True)
+
+        self.assertEqual(1, self.window.observed_count)
+        self.assertEqual(1, self.window.signed_count)
+
+    def test_heights_older_than_window_are_ignored(self):
+        self.window.record(self.size * 2, True)
+        self.window.record(self.size - 1, False)
+
+        self.assertEqual(1, self.window.observed_count)
+        self.assertEqual(self.size * 2, self.window.last_height)
+
+    def test_take_changes_returns_changed_bits_once(self):
+        self.window.record(1, True)
+        self.window.record(2, False)
+
+        self.assertEqual({1: (1, 1), 2: (0, 1)}, self.window.take_changes())
+        self.assertEqual({}, self.window.take_changes())
+
+    def test_restore_gives_same_window(self):
+        for height in range(30):
+            self.window.record(height, height % 3 == 0)
+
+        restored = SigningWindow.restore(
+            self.size, self.window.signed_bitmap,
+            self.window.observed_bitmap, self.window.last_height)
+
+        self.assertEqual(self.window.signed_count, restored.signed_count)
+        self.assertEqual(self.window.observed_count, restored.observed_count)
+        self.assertEqual(self.window.last_height, restored.last_height)
+
+    def test_restore_accepts_bitmaps_shorter_than_window(self):
+        restored = SigningWindow.restore(self.size, b'\x80', b'\xc0', 1)
+
+        self.assertEqual(1, restored.signed_count)
+        self.assertEqual(2, restored.observed_count)
+
+    def test_restore_gives_empty_window_if_bitmaps_too_long(self):
+        restored = SigningWindow.restore(self.size, b'\xff' * 10,
+                                         b'\xff' * 10, 1)
+
+        self.assertEqual(0, restored.observed_count)
+        self.assertIsNone(restored.last_height)
+
+    def test_record_signed_same_as_recording_each_height(self):
+        # Windows that are not a whole number of bytes, and ranges that wrap
+        # around the end of the bitmaps or are longer than the window
+        for size in [13, 20, 64]:
+            for start, end in [(5, 9), (7, 30), (15, 100), (3, 3)]:
+                window = SigningWindow(size)
+                bulk_window = SigningWindow(size)
+                for height in range(5):
+                    window.record(height, height % 2 == 0)
+                    bulk_window.record(height, height % 2 == 0)
+
+                for height in range(start, end + 1):
+                    window.record(height, True)
+                bulk_window.record_signed(start, end)
+
+                self.assertEqual(window.signed_bitmap,
+                                 bulk_window.signed_bitmap)
+                self.assertEqual(window.observed_bitmap,
+                                 bulk_window.observed_bitmap)
+                self.assertEqual(window.signed_count,
+                                 bulk_window.signed_count)
+                self.assertEqual(window.observed_count,
+                                 bulk_window.observed_count)
+                self.assertEqual(window.take_changes(),
+                                 bulk_window.take_changes())
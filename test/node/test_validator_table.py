@@ -0,0 +1,168 @@
+import collections
+import logging
+import random
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from src.alerting.alerts.alerts import LowUptimeAlert
+from src.alerting.channels.channel import ChannelSet
+from src.monitoring.backtest import BacktestChannel
+from src.monitoring.monitor_utils.block_cache import BlockSummary
+from src.node.node import Node, NodeType
+from src.node.validator_table import ValidatorTable
+from src.utils.clock import VirtualClock
+from test import TestInternalConf
+
+START = datetime(2020, 1, 1)
+
+
+def dummy_validator(address, clock):
+    return Node(address, None, NodeType.VALIDATOR_FULL_NODE, address, '',
+                None, TestInternalConf, clock)
+
+
+def dummy_summary(height, signers, total):
+    return BlockSummary(height, START + timedelta(seconds=height), 'X',
+                        set(signers), total, total - len(signers))
+
+
+class TestValidatorTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.clock = VirtualClock(START)
+        self.addresses = ['V' + str(i) for i in range(10)]
+
+        self.channel = BacktestChannel(self.logger)
+        self.channels = ChannelSet([self.channel])
+        self.validators = [dummy_validator(a, self.clock)
+                           for a in self.addresses]
+        self.table = ValidatorTable(self.validators)
+
+    def _evaluate(self, height, signers):
+        self.clock.advance_to(START + timedelta(seconds=height))
+        self.table.evaluate_block(height, dummy_summary(
+            height, signers, len(self.addresses)), self.channels, self.logger)
+
+    def _alert_counts(self, alerts):
+        return collections.Counter(
+            (type(a).__name__, s, str(a)) for s, a in alerts)
+
+    def test_alerts_same_as_evaluating_validators_one_by_one(self):
+        rand = random.Random(1)
+        blocks = [[a for a in self.addresses if rand.random() > 0.2]
+                  for _ in range(300)]
+
+        clock = VirtualClock(START)
+        channel = BacktestChannel(self.logger)
+        channels = ChannelSet([channel])
+        validators = [dummy_validator(a, clock) for a in self.addresses]
+        for height, signers in enumerate(blocks, start=1):
+            clock.advance_to(START + timedelta(seconds=height))
+            summary = dummy_summary(height, signers, len(self.addresses))
+            for v in validators:
+                v.record_signing(height, v.pubkey in signers, channels,
+                                 self.logger)
+                if v.pubkey not in signers:
+                    v.add_missed_block(height, summary.time, summary.missing,
+                                       channels, self.logger)
+                else:
+                    v.clear_missed_blocks(channels, self.logger)
+
+        for height, signers in enumerate(blocks, start=1):
+            self._evaluate(height, signers)
+
+        self.table.flush_signed_blocks()
+
+        self.assertNotEqual(0, len(channel.alerts))
+        self.assertEqual(self._alert_counts(channel.alerts),
+                         self._alert_counts(self.channel.alerts))
+        for v, table_v in zip(validators, self.validators):
+            self.assertEqual(v.signing_window.signed_bitmap,
+                             table_v.signing_window.signed_bitmap)
+            self.assertEqual(v.signing_window.observed_bitmap,
+                             table_v.signing_window.observed_bitmap)
+
+    def test_only_validators_that_missed_or_stopped_missing_evaluated(self):
+        for height in range(1, 21):
+            self._evaluate(height, self.addresses)
+        self._evaluate(21, self.addresses[1:])
+
+        with patch.object(Node, 'add_missed_block') as add_missed_block, \
+                patch.object(Node, 'clear_missed_blocks') as clear_missed:
+            self._evaluate(22, self.addresses[:1] + self.addresses[3:])
+
+        self.assertEqual(2, add_missed_block.call_count)
+        self.assertEqual(1, clear_missed.call_count)
+
+    def test_blocks_signed_recorded_in_bulk(self):
+        min_blocks = TestInternalConf.signing_window_min_blocks
+        for height in range(1, min_blocks + 1):
+            self._evaluate(height, self.addresses)
+
+        with patch.object(Node, 'record_signing') as record_signing:
+            for height in range(min_blocks + 1, min_blocks + 11):
+                self._evaluate(height, self.addresses[1:])
+        window = self.validators[1].signing_window
+        last_height = window.last_height
+        self.table.flush_signed_blocks()
+
+        # Only the validator that missed the blocks was evaluated
+        self.assertEqual(10, record_signing.call_count)
+        self.assertEqual(min_blocks, last_height)
+        self.assertEqual(min_blocks + 10, window.last_height)
+        self.assertEqual(min_blocks + 10, window.signed_count)
+
+    def test_uptime_only_checked_while_it_could_cross_boundary(self):
+        min_blocks = TestInternalConf.signing_window_min_blocks
+        for height in range(1, min_blocks + 1):
+            self._evaluate(height, self.addresses)
+
+        with patch.object(Node, 'check_uptime') as check_uptime:
+            self._evaluate(min_blocks + 1, self.addresses[1:])
+            self._evaluate(min_blocks + 3, self.addresses)
+
+        # The validator that missed the block, then all validators since
+        # a height was skipped
+        self.assertEqual(1 + len(self.addresses), check_uptime.call_count)
+
+    def test_low_uptime_alerted_on_for_validator_not_signing(self):
+        for height in range(1, 41):
+            self._evaluate(height, self.addresses[1:])
+
+        self.table.flush_signed_blocks()
+
+        alerts = [a for _, a in self.channel.alerts
+                  if isinstance(a, LowUptimeAlert)]
+        self.assertEqual(1, len(alerts))
+        self.assertEqual(40, self.validators[0].signing_window.observed_count)
+        self.assertEqual(40, self.validators[1].signing_window.signed_count)
+
+    def test_validators_with_same_address_share_signatures(self):
+        self.validators.append(dummy_validator(self.addresses[0],
+                                               self.clock))
+        self.table = ValidatorTable(self.validators)
+
+        self._evaluate(1, self.addresses[1:])
+
+        self.assertEqual(2, self.table.missed_count(self.addresses[1:]))
+        self.assertTrue(self.validators[0].is_missing_blocks)
+        self.assertTrue(self.validators[-1].is_missing_blocks)
+
+    def test_missed_blocks_cleared_only_if_not_alerted_on_before(self):
+        # V0 misses 3 blocks and V1 misses 1 block, then with V2 all three
+        # miss the last 5 blocks
+        self._evaluate(1, self.addresses[1:])
+        self._evaluate(2, self.addresses[1:])
+        self._evaluate(3, self.addresses[2:])
+        for height in range(4, 9):
+            self._evaluate(height, self.addresses[3:])
+        self.channel.alerts.clear()
+
+        self.table.clear_missed_blocks_since(5, ChannelSet([]), self.logger)
+        self._evaluate(9, self.addresses)
+
+        # Only V0 had been alerted on before the last 5 blocks
+        self.assertEqual(1, len(self.channel.alerts))
+        self.assertTrue(str(self.channel.alerts[0][1]).startswith('V0'))
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 from src.utils.config_parsers.internal import InternalConfig
@@ -7,3 +9,15 @@ class TestInternalConfig(unittest.TestCase):
 
     def test_internal_config_values_loaded_successfully(self) -> None:
         InternalConfig('test/test_internal_config.ini')
+
+    def test_override_files_replace_internal_config_values(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            override_file = os.path.join(directory, 'override.ini')
+            with open(override_file, 'w') as f:
+                f.write('[alert_intervals_and_limits]\n'
+                        'missed_blocks_danger_boundary = 42\n')
+
+            config = InternalConfig('test/test_internal_config.ini',
+                                    [override_file])
+
+        self.assertEqual(42, config.missed_blocks_danger_boundary)
@@ -0,0 +1,50 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from src.utils.clock import VirtualClock
+
+
+class TestVirtualClock(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.start = datetime(2020, 1, 1)
+        self.clock = VirtualClock(self.start)
+
+    def test_clock_starts_at_start_time(self):
+        self.assertEqual(self.start, self.clock.now())
+        self.assertEqual(0, self.clock.monotonic())
+
+    def test_advance_moves_both_times(self):
+        self.clock.advance(90)
+        self.assertEqual(self.start + timedelta(seconds=90), self.clock.now())
+        self.assertEqual(90, self.clock.monotonic())
+
+    def test_sleep_advances_clock(self):
+        self.clock.sleep(5)
+        self.assertEqual(5, self.clock.monotonic())
+
+    def test_cannot_advance_back_in_time(self):
+        self.assertRaises(ValueError, self.clock.advance, -1)
+
+    def test_advance_to_moves_clock_to_time(self):
+        self.clock.advance_to(self.start + timedelta(minutes=2))
+        self.assertEqual(self.start + timedelta(minutes=2), self.clock.now())
+        self.assertEqual(120, self.clock.monotonic())
+
+    def test_advance_to_earlier_time_leaves_clock_as_it_is(self):
+        self.clock.advance(10)
+        self.clock.advance_to(self.start)
+        self.assertEqual(self.start + timedelta(seconds=10), self.clock.now())
+        self.assertEqual(10, self.clock.monotonic())
+
+    def test_wait_advances_clock_if_event_not_set(self):
+        event = threading.Event()
+        self.assertFalse(self.clock.wait(event, 5))
+        self.assertEqual(5, self.clock.monotonic())
+
+    def test_wait_returns_immediately_if_event_set(self):
+        event = threading.Event()
+        event.set()
+        self.assertTrue(self.clock.wait(event, 5))
+        self.assertEqual(0, self.clock.monotonic())
@@ -0,0 +1,54 @@
+import unittest
+
+from src.utils.config_parsers.config_diff import diff_configs, \
+    node_config_key, repo_config_key
+from src.utils.config_parsers.user import NodeConfig, RepoConfig
+
+
+def dummy_node_config(name: str, is_validator: bool = False) -> NodeConfig:
+    return NodeConfig(name, 'http://' + name, is_validator, True, True)
+
+
+class TestConfigDiff(unittest.TestCase):
+
+    def test_diff_with_nothing_running_adds_everything(self):
+        configs = [dummy_node_config('a'), dummy_node_config('b')]
+        diff = diff_configs([], configs, node_config_key)
+
+        self.assertEqual(['a', 'b'],
+                         [c.node_name for c in diff.added.values()])
+        self.assertEqual([], diff.removed)
+
+    def test_diff_leaves_unchanged_configs_alone(self):
+        a, b = dummy_node_config('a'), dummy_node_config('b')
+        running = [node_config_key(a), node_config_key(b)]
+        diff = diff_configs(running, [dummy_node_config('a'), b],
+                            node_config_key)
+
+        self.assertEqual({}, diff.added)
+        self.assertEqual([], diff.removed)
+
+    def test_diff_removes_configs_that_are_no_longer_listed(self):
+        a, b = dummy_node_config('a'), dummy_node_config('b')
+        running = [node_config_key(a), node_config_key(b)]
+        diff = diff_configs(running, [a], node_config_key)
+
+        self.assertEqual({}, diff.added)
+        self.assertEqual([node_config_key(b)], diff.removed)
+
+    def test_diff_replaces_changed_configs(self):
+        running = [node_config_key(dummy_node_config('a'))]
+        changed = dummy_node_config('a', is_validator=True)
+        diff = diff_configs(running, [changed], node_config_key)
+
+        self.assertEqual([changed], list(diff.added.values()))
+        self.assertEqual(running, diff.removed)
+
+    def test_diff_of_repos_uses_repo_key(self):
+        repo = RepoConfig('repo', 'owner/repo/', True)
+        diff = diff_configs([repo_config_key(repo)],
+                            [RepoConfig('repo', 'owner/other/', True)],
+                            repo_config_key)
+
+        self.assertEqual(1, len(diff.added))
+        self.assertEqual([repo_config_key(repo)], diff.removed)
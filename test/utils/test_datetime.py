@@ -1,7 +1,10 @@
 import unittest
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from src.utils.datetime import strfdelta
+import dateutil.parser
+
+from src.utils.datetime import parse_rfc3339, rfc3339_to_nanoseconds, \
+    strfdelta
 
 
 class TestDatetimeFunctions(unittest.TestCase):
@@ -57,3 +60,30 @@ class TestDatetimeFunctions(unittest.TestCase):
 
         self.assertEqual(str_date, '{}h {}m {}s'.format(
             expected_h, expected_m, expected_s))
+
+
+class TestParseRfc3339(unittest.TestCase):
+
+    def test_parse_rfc3339_same_as_dateutil(self):
+        for timestamp in ['2020-01-01T00:00:00.123456789Z',
+                          '2020-01-01T00:00:00.9999999Z',
+                          '2020-01-01T00:00:00.1Z',
+                          '2020-01-01T00:00:00Z',
+                          '2019-12-31T23:59:59.999999999+02:00',
+                          '2020-01-01 00:00:00.123456']:
+            self.assertEqual(
+                dateutil.parser.parse(timestamp, ignoretz=True),
+                parse_rfc3339(timestamp), timestamp)
+
+    def test_parse_rfc3339_falls_back_to_dateutil(self):
+        self.assertEqual(datetime(2020, 1, 2),
+                         parse_rfc3339('January 2, 2020'))
+        self.assertRaises(ValueError, parse_rfc3339, 'not a time')
+
+    def test_rfc3339_to_nanoseconds_exact_to_the_nanosecond(self):
+        self.assertEqual(1577836800123456789, rfc3339_to_nanoseconds(
+            '2020-01-01T00:00:00.123456789Z'))
+        self.assertEqual(1577836800000000001, rfc3339_to_nanoseconds(
+            '2020-01-01T00:00:00.000000001Z'))
+        self.assertEqual(1577836800100000000, rfc3339_to_nanoseconds(
+            '2020-01-01T00:00:00.1Z'))
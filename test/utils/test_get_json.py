@@ -5,7 +5,7 @@ from unittest.mock import patch
 from src.monitoring.monitor_utils.get_json import get_json, get_cosmos_json
 
 GET_JSON_FUNCTION = 'src.monitoring.monitor_utils.get_json.get_json'
-GET_FUNCTION = 'src.monitoring.monitor_utils.get_json.requests.get'
+GET_FUNCTION = 'src.monitoring.monitor_utils.rpc_transport.requests.get'
 LOGGER = logging.getLogger('dummy')
 
 ENDPOINT = 'the_endpoint'
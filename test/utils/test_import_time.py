@@ -0,0 +1,21 @@
+import unittest
+
+from src.utils.import_time import parse_import_times, ImportTime
+
+DUMMY_REPORT = '\n'.join([
+    'import time: self [us] | cumulative | imported package',
+    'import time:       120 |        120 |   _io',
+    'import time:        80 |        200 | io',
+    'some unrelated output',
+])
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_parse_import_times_parses_module_lines(self):
+        self.assertEqual([ImportTime('_io', 120, 120),
+                          ImportTime('io', 80, 200)],
+                         parse_import_times(DUMMY_REPORT))
+
+    def test_parse_import_times_of_empty_report_is_empty(self):
+        self.assertEqual([], parse_import_times(''))
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.utils.log_demux import MonitorLogDemultiplexer
+
+
+def dummy_line(monitor: str, node: str, message: str) -> str:
+    return json.dumps({'time': 'time', 'monitor': monitor, 'node': node,
+                       'level': 'INFO', 'message': message}) + '\n'
+
+
+class TestMonitorLogDemultiplexer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.demux = MonitorLogDemultiplexer(self.directory.name,
+                                             self._log_file_for,
+                                             max_open_files=2)
+
+    def tearDown(self) -> None:
+        self.demux.close()
+        self.directory.cleanup()
+
+    def _log_file_for(self, monitor: str, node: str):
+        if monitor != 'node_monitor':
+            return None
+        return os.path.join('logs', 'general', node + '.log')
+
+    def _path(self, node: str) -> str:
+        return os.path.join(self.directory.name, node + '.log')
+
+    def _lines(self, node: str):
+        with open(self._path(node)) as f:
+            return f.read().splitlines()
+
+    def test_records_are_split_by_node(self):
+        self.demux.write(dummy_line('node_monitor', 'a', 'a1'))
+        self.demux.write(dummy_line('node_monitor', 'b', 'b1'))
+        self.demux.write(dummy_line('node_monitor', 'a', 'a2'))
+        self.demux.close()
+
+        self.assertEqual(['time - a - INFO - a1', 'time - a - INFO - a2'],
+                         self._lines('a'))
+        self.assertEqual(['time - b - INFO - b1'], self._lines('b'))
+
+    def test_records_are_kept_when_files_are_reopened(self):
+        for node in ['a', 'b', 'c', 'a']:
+            self.demux.write(dummy_line('node_monitor', node, node))
+        self.demux.close()
+
+        self.assertEqual(2, len(self._lines('a')))
+
+    def test_files_only_written_to_output_directory(self):
+        self.demux.write(dummy_line('node_monitor', 'a', 'a1'))
+        self.demux.close()
+
+        self.assertEqual(['a.log'], os.listdir(self.directory.name))
+        self.assertFalse(os.path.exists(os.path.join('logs', 'general',
+                                                     'a.log')))
+
+    def test_invalid_and_unknown_records_are_skipped(self):
+        self.demux.write('not json\n')
+        self.demux.write(dummy_line('other_monitor', 'a', 'a1'))
+        self.demux.write(dummy_line('node_monitor', 'a', 'a1'))
+
+        self.assertEqual(2, self.demux.lines_skipped)
+        self.assertEqual(1, self.demux.lines_written)
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from time import sleep
+from unittest.mock import patch
+
+from src.utils import logging as logging_utils
+from src.utils.logging import create_logger, create_shared_monitor_logger
+
+
+class TestCreateLoggerAsynchronous(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, 'test.log')
+        self.writer = logging_utils._AsyncLogWriter(
+            timedelta(seconds=0.01), 100)
+        self.logger_names = []
+
+    def tearDown(self) -> None:
+        for name in self.logger_names:
+            logger = logging.getLogger(name)
+            for handler in logger.handlers:
+                handler.close()
+            logger.handlers.clear()
+        self.directory.cleanup()
+
+    def _create_logger(self, name: str, rotating: bool) -> logging.Logger:
+        self.logger_names.append(name)
+        with patch.object(logging_utils, '_async_writer', self.writer):
+            return create_logger(self.file, name, 'DEBUG', rotating=rotating)
+
+    def _lines(self):
+        with open(self.file) as f:
+            return f.read().splitlines()
+
+    def test_records_are_written_once_writer_is_stopped(self):
+        logger = self._create_logger('test_async', rotating=False)
+        for i in range(10):
+            logger.debug('record %s', i)
+        self.writer.stop()
+
+        lines = self._lines()
+        self.assertEqual(10, len(lines))
+        self.assertTrue(lines[-1].endswith('record 9'))
+
+    def test_records_are_flushed_without_stopping_writer(self):
+        logger = self._create_logger('test_async_flush', rotating=False)
+        logger.info('record')
+        sleep(0.2)
+
+        self.assertEqual(1, len(self._lines()))
+        self.writer.stop()
+
+    def test_rotating_logger_writes_all_records(self):
+        logger = self._create_logger('test_async_rotating', rotating=True)
+        for i in range(100):
+            logger.info('record %s', i)
+        self.writer.stop()
+
+        self.assertEqual(100, len(self._lines()))
+
+    def test_exception_traceback_is_written(self):
+        logger = self._create_logger('test_async_exception', rotating=False)
+        try:
+            raise ValueError('test error')
+        except ValueError:
+            logger.exception('failed')
+        self.writer.stop()
+
+        self.assertIn('ValueError: test error', self._lines())
+
+
+class TestBufferedRotatingFileHandler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, 'test.log')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_file_is_rotated_when_max_bytes_reached(self):
+        handler = logging_utils._BufferedRotatingFileHandler(
+            self.file, maxBytes=100, backupCount=1)
+        record = logging.LogRecord('test', logging.INFO, '', 0, 'x' * 59,
+                                   None, None)
+        handler.handle(record)
+        handler.handle(record)
+        handler.close()
+
+        self.assertTrue(os.path.isfile(self.file + '.1'))
+        self.assertEqual(60, os.path.getsize(self.file))
+
+
+class TestCreateSharedMonitorLogger(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, 'monitors.log')
+
+    def tearDown(self) -> None:
+        for name in [logging_utils.MONITORS_LOGGER_NAME,
+                     'monitors.node_monitor.node_1',
+                     'monitors.node_monitor.node_2']:
+            logger = logging.getLogger(name)
+            for handler in logger.handlers:
+                handler.close()
+            logger.handlers.clear()
+            logger.filters.clear()
+        self.directory.cleanup()
+
+    def test_monitors_share_one_handler_and_are_tagged(self):
+        logger_1 = create_shared_monitor_logger(
+            self.file, 'node_monitor', 'node_1', 'DEBUG')
+        logger_2 = create_shared_monitor_logger(
+            self.file, 'node_monitor', 'node_2', 'DEBUG')
+        logger_1.info('first')
+        logger_2.info('second')
+
+        shared = logging.getLogger(logging_utils.MONITORS_LOGGER_NAME)
+        self.assertEqual(1, len(shared.handlers))
+        self.assertEqual(0, len(logger_1.handlers))
+
+        shared.handlers[0].flush()
+        with open(self.file) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(
+            [('node_monitor', 'node_1', 'INFO', 'first'),
+             ('node_monitor', 'node_2', 'INFO', 'second')],
+            [(r['monitor'], r['node'], r['level'], r['message'])
+             for r in records])
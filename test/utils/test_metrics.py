@@ -0,0 +1,87 @@
+import unittest
+import urllib.request
+
+from src.utils.logging import DUMMY_LOGGER
+from src.utils.metrics import MetricsRegistry, start_metrics_server, \
+    _Metric
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+
+    def test_counter_renders_value_per_label(self):
+        counter = self.registry.counter('dummy_total', 'Dummy.', ['type'])
+        counter.labels('a').inc()
+        counter.labels('a').inc(2)
+        counter.labels('b').inc()
+
+        self.assertEqual('# HELP dummy_total Dummy.\n'
+                         '# TYPE dummy_total counter\n'
+                         'dummy_total{type="a"} 3\n'
+                         'dummy_total{type="b"} 1\n',
+                         self.registry.render())
+
+    def test_gauge_without_labels_renders_last_value(self):
+        gauge = self.registry.gauge('dummy', 'Dummy.')
+        gauge.labels().set(1)
+        gauge.labels().set(0.5)
+
+        self.assertIn('\ndummy 0.5\n', self.registry.render())
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = self.registry.histogram('dummy_seconds', 'Dummy.',
+                                            ['monitor'], buckets=[1, 2])
+        for value in [0.5, 1, 1.5, 3]:
+            histogram.labels('m').observe(value)
+
+        rendered = self.registry.render()
+        self.assertIn('dummy_seconds_bucket{monitor="m",le="1"} 2\n', rendered)
+        self.assertIn('dummy_seconds_bucket{monitor="m",le="2"} 3\n', rendered)
+        self.assertIn('dummy_seconds_bucket{monitor="m",le="+Inf"} 4\n',
+                      rendered)
+        self.assertIn('dummy_seconds_sum{monitor="m"} 6\n', rendered)
+        self.assertIn('dummy_seconds_count{monitor="m"} 4\n', rendered)
+
+    def test_label_values_are_escaped(self):
+        counter = self.registry.counter('dummy_total', 'Dummy.', ['name'])
+        counter.labels('a "b"').inc()
+
+        self.assertIn('dummy_total{name="a \\"b\\""} 1',
+                      self.registry.render())
+
+    def test_wrong_number_of_labels_raises_value_error(self):
+        counter = self.registry.counter('dummy_total', 'Dummy.', ['type'])
+        self.assertRaises(ValueError, counter.labels, 'a', 'b')
+
+    def test_registering_a_metric_twice_returns_the_same_metric(self):
+        first = self.registry.counter('dummy_total', 'Dummy.')
+        second = self.registry.counter('dummy_total', 'Dummy.')
+        self.assertIs(first, second)
+
+    def test_metric_without_children_cannot_be_created(self):
+        class IncompleteMetric(_Metric):
+            _type = 'untyped'
+
+        self.assertRaises(TypeError, IncompleteMetric, 'dummy', 'Dummy.')
+
+    def test_gauge_without_value_renders_no_sample(self):
+        self.registry.gauge('dummy_up', 'Dummy.')
+        self.assertEqual('# HELP dummy_up Dummy.\n# TYPE dummy_up gauge\n',
+                         self.registry.render())
+
+    def test_metrics_server_serves_rendered_metrics(self):
+        self.registry.counter('dummy_total', 'Dummy.').labels().inc()
+        server = start_metrics_server('127.0.0.1', 0, DUMMY_LOGGER,
+                                      self.registry)
+        try:
+            url = 'http://127.0.0.1:{}/metrics'.format(
+                server.server_address[1])
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(self.registry.render(), body)
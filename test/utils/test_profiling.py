@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+
+from src.utils.logging import DUMMY_LOGGER
+from src.utils.profiling import Profiler, fold_memory_snapshot, \
+    sample_stacks
+
+
+def dummy_busy_function(stop_event: threading.Event):
+    while not stop_event.is_set():
+        time.sleep(0.001)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=dummy_busy_function,
+                                       args=(self.stop_event,),
+                                       name='dummy_thread')
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.stop_event.set()
+        self.thread.join()
+
+    def test_sample_stacks_samples_other_threads_root_first(self):
+        samples = sample_stacks(0.05, 0.005)
+
+        stacks = [s for s in samples if s.startswith('dummy_thread;')]
+        self.assertTrue(len(stacks) > 0)
+        self.assertTrue(any('dummy_busy_function' in s.split(';')[-1]
+                            for s in stacks))
+
+    def test_sample_stacks_does_not_sample_calling_thread(self):
+        samples = sample_stacks(0.02, 0.005)
+        self.assertFalse(any('sample_stacks' in s for s in samples))
+
+    def test_fold_memory_snapshot_weights_stacks_by_size(self):
+        tracemalloc.start(5)
+        try:
+            data = [bytearray(1000) for _ in range(10)]
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+
+        stacks = fold_memory_snapshot(snapshot)
+        self.assertTrue(sum(stacks.values()) >= 10000)
+        self.assertEqual(10, len(data))
+
+    def test_profiler_writes_cpu_and_memory_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = Profiler(directory, 0.005, 1, DUMMY_LOGGER)
+            self.assertTrue(profiler.start(0.05))
+            self.assertFalse(profiler.start(0.05))  # Already profiling
+
+            deadline = time.monotonic() + 5
+            while len(os.listdir(directory)) < 2 \
+                    and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+
+            files = sorted(os.listdir(directory))
+            self.assertEqual(2, len(files))
+            self.assertTrue(files[0].endswith('_cpu.folded'))
+            self.assertTrue(files[1].endswith('_memory.folded'))
+            self.assertTrue(profiler.start(0.01))  # Done profiling
@@ -231,6 +231,32 @@ class TestRedisApiWithRedisOnline(unittest.TestCase):
         self.assertFalse(self.redis.exists_unsafe(self.key1))
         self.assertFalse(self.redis.exists_unsafe(self.key2))
 
+    def test_delete_namespace_unsafe_returns_0_if_no_keys_exist(self):
+        self.assertEqual(self.redis.delete_namespace_unsafe(), 0)
+
+    def test_delete_namespace_unsafe_removes_keys_in_batches(self):
+        keys = ['key_{}'.format(i) for i in range(25)]
+        self.redis.set_multiple_unsafe({k: self.val1 for k in keys})
+        progress = []
+
+        deleted = self.redis.delete_namespace_unsafe(10, progress.append)
+        self.assertEqual(deleted, 25)
+        self.assertEqual(progress[-1], 25)
+        self.assertListEqual(self.redis.get_keys_unsafe(), [])
+
+    def test_delete_namespace_unsafe_keeps_keys_of_other_namespaces(self):
+        other = RedisApi(self.logger, self.db, self.host, self.port,
+                         password=self.password, namespace='other*namespace')
+        other.set_unsafe(self.key1, self.val1)
+        self.redis.set_unsafe(self.key1, self.val1)
+
+        self.redis.delete_namespace_unsafe()
+        self.assertFalse(self.redis.exists_unsafe(self.key1))
+        self.assertTrue(other.exists_unsafe(self.key1))
+
+        other.delete_namespace_unsafe()
+        self.assertFalse(other.exists_unsafe(self.key1))
+
     def test_set_sets_the_specified_key_to_the_specified_value(self):
         self.redis.set(self.key1, self.val1)
         self.assertEqual(self.redis.get(self.key1), self.val1_bytes)
@@ -557,6 +583,14 @@ class TestRedisApiWithRedisOffline(unittest.TestCase):
         except RedisConnectionError:
             pass
 
+    def test_delete_namespace_unsafe_throws_connection_exception(self):
+
+        try:
+            self.redis.delete_namespace_unsafe()
+            self.fail('Expected RedisConnectionError exception to be thrown.')
+        except RedisConnectionError:
+            pass
+
     def test_set_returns_none(self):
         self.assertIsNone(self.redis.set(self.key, self.val))
 
@@ -600,6 +634,9 @@ class TestRedisApiWithRedisOffline(unittest.TestCase):
     def test_delete_all_returns_none(self):
         self.assertIsNone(self.redis.delete_all())
 
+    def test_delete_namespace_returns_none(self):
+        self.assertIsNone(self.redis.delete_namespace())
+
     def test_ping_unsafe_throws_connection_exception(self):
 
         try:
@@ -0,0 +1,93 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import requests
+from requests.exceptions import ConnectionError as ReqConnectionError, \
+    ReadTimeout
+
+from src.monitoring.monitor_utils.rpc_transport import RpcTransport, \
+    RecordingRpcTransport, ReplayRpcTransport
+
+ENDPOINT = 'http://node:26657/status'
+OTHER_ENDPOINT = 'http://node:26657/net_info'
+
+
+class DummyTransport(RpcTransport):
+
+    def __init__(self) -> None:
+        self.responses = []
+
+    def get(self, endpoint: str, timeout: float) -> requests.Response:
+        content = self.responses.pop(0)
+        if isinstance(content, Exception):
+            raise content
+        response = requests.Response()
+        response.status_code = 200
+        response._content = content
+        return response
+
+    def head(self, endpoint: str, timeout: float) -> requests.Response:
+        return self.get(endpoint, timeout)
+
+
+class TestRpcTransport(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.capture_file = os.path.join(self.directory.name, 'capture',
+                                         'rpc.jsonl.gz')
+        self.dummy = DummyTransport()
+        self.recorder = RecordingRpcTransport(self.capture_file, self.dummy)
+
+    def tearDown(self) -> None:
+        self.recorder.close()
+        self.directory.cleanup()
+
+    def test_recording_passes_responses_through(self):
+        self.dummy.responses = [b'{"a":1}']
+        self.assertEqual(b'{"a":1}',
+                         self.recorder.get(ENDPOINT, 10).content)
+
+    def test_replay_serves_responses_in_recorded_order_per_endpoint(self):
+        self.dummy.responses = [b'1', b'other', b'2']
+        self.recorder.get(ENDPOINT, 10)
+        self.recorder.get(OTHER_ENDPOINT, 10)
+        self.recorder.get(ENDPOINT, 10)
+        self.recorder.close()
+
+        replay = ReplayRpcTransport(self.capture_file)
+        self.assertEqual(3, replay.remaining)
+        self.assertEqual(b'1', replay.get(ENDPOINT, 10).content)
+        self.assertEqual(b'2', replay.get(ENDPOINT, 10).content)
+        self.assertFalse(replay.exhausted.is_set())
+        self.assertEqual(b'other', replay.get(OTHER_ENDPOINT, 10).content)
+        self.assertTrue(replay.exhausted.is_set())
+
+    def test_replay_of_unrecorded_request_raises_connection_error(self):
+        self.recorder.close()
+        replay = ReplayRpcTransport(self.capture_file)
+
+        self.assertTrue(replay.exhausted.is_set())
+        self.assertRaises(ReqConnectionError, replay.get, ENDPOINT, 10)
+        self.assertRaises(ReqConnectionError, replay.head, ENDPOINT, 10)
+
+    def test_recorded_errors_are_raised_again_when_replayed(self):
+        self.dummy.responses = [ReadTimeout(), ValueError()]
+        self.assertRaises(ReadTimeout, self.recorder.get, ENDPOINT, 10)
+        self.assertRaises(ValueError, self.recorder.get, ENDPOINT, 10)
+        self.recorder.close()
+
+        replay = ReplayRpcTransport(self.capture_file)
+        self.assertRaises(ReadTimeout, replay.get, ENDPOINT, 10)
+        self.assertRaises(ReqConnectionError, replay.get, ENDPOINT, 10)
+
+    def test_replay_of_recording_that_was_cut_short_keeps_full_records(self):
+        self.recorder.close()
+        with gzip.open(self.capture_file, 'wt') as f:
+            f.write('{"t":0,"m":"GET","u":"' + ENDPOINT + '","s":200,'
+                    '"b":"1","e":0.1}\n{"t":0,"m":"GET"')
+
+        replay = ReplayRpcTransport(self.capture_file)
+        self.assertEqual(1, replay.remaining)
@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime
+
+from src.utils.state_encoding import MonitorState, NodeState, \
+    STATE_VERSION, decode_monitor_state, decode_node_state, \
+    encode_monitor_state, encode_node_state
+
+
+class TestStateEncoding(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.time = datetime(2020, 8, 5, 12, 34, 56, 789012)
+
+    def test_node_state_decoded_as_encoded(self):
+        state = NodeState(self.time, 12, 2 ** 40, True, 30)
+        self.assertEqual(state, decode_node_state(encode_node_state(state)))
+
+    def test_node_state_none_values_decoded_as_none(self):
+        state = NodeState(None, 0, None, False, None)
+        self.assertEqual(state, decode_node_state(encode_node_state(state)))
+
+    def test_node_state_zero_values_not_decoded_as_none(self):
+        state = NodeState(datetime(1970, 1, 1), 0, 0, False, 0)
+        self.assertEqual(state, decode_node_state(encode_node_state(state)))
+
+    def test_monitor_state_decoded_as_encoded(self):
+        state = MonitorState(self.time)
+        self.assertEqual(state,
+                         decode_monitor_state(encode_monitor_state(state)))
+
+    def test_state_of_other_version_or_format_decoded_as_none(self):
+        encoded = bytearray(encode_monitor_state(MonitorState(self.time)))
+        encoded[0] = STATE_VERSION + 1
+
+        self.assertIsNone(decode_monitor_state(bytes(encoded)))
+        self.assertIsNone(decode_monitor_state(str(self.time).encode()))
+        self.assertIsNone(decode_node_state(None))
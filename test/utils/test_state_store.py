@@ -0,0 +1,213 @@
+import logging
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+
+from src.utils.clock import VirtualClock
+from src.utils.state_store import MemoryStateStore, SqliteStateStore, \
+    StateStore
+
+
+class StateStoreTests:
+    # The behaviour that every state store shares with Redis, run against
+    # each state store by the test cases below
+
+    def _create_store(self, namespace: str, clock: VirtualClock):
+        raise NotImplementedError()
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('dummy')
+        self.clock = VirtualClock()
+        self.namespace = 'testnamespace'
+        self.store = self._create_store(self.namespace, self.clock)
+
+        self.key1 = 'key1'
+        self.key2 = 'key2'
+        self.val1 = 'val1'
+        self.val1_bytes = bytes('val1', encoding='utf8')
+        self.val2 = 'val2'
+        self.val2_bytes = bytes('val2', encoding='utf8')
+        self.time = timedelta(seconds=3)
+        self.default_str = 'DEFAULT'
+
+    def test_set_unsafe_sets_the_specified_key_to_the_specified_value(self):
+        self.store.set_unsafe(self.key1, self.val1)
+        self.assertEqual(self.val1_bytes, self.store.get_unsafe(self.key1))
+
+    def test_set_unsafe_stores_numbers_as_bytes(self):
+        self.store.set_unsafe(self.key1, 123)
+        self.store.set_unsafe(self.key2, 1.5)
+        self.assertEqual(b'123', self.store.get_unsafe(self.key1))
+        self.assertEqual(b'1.5', self.store.get_unsafe(self.key2))
+        self.assertEqual(123, self.store.get_int_unsafe(self.key1))
+
+    def test_set_unsafe_throws_exception_if_invalid_type(self):
+        self.assertRaises(TypeError, self.store.set_unsafe, self.key1, True)
+
+    def test_set_returns_none_if_invalid_type(self):
+        self.assertIsNone(self.store.set(self.key1, True))
+
+    def test_set_multiple_unsafe_sets_multiple_key_value_pairs(self):
+        self.store.set_multiple_unsafe({self.key1: self.val1,
+                                        self.key2: None})
+        self.assertEqual(self.val1_bytes, self.store.get_unsafe(self.key1))
+        self.assertTrue(self.store.exists_unsafe(self.key2))
+        self.assertIsNone(self.store.get_unsafe(self.key2, self.default_str))
+
+    def test_set_for_unsafe_temporarily_sets_specified_key_value_pair(self):
+        self.store.set_for_unsafe(self.key1, self.val1, self.time)
+        self.assertEqual(self.val1_bytes, self.store.get_unsafe(self.key1))
+
+        self.clock.advance(self.time.total_seconds())
+        self.assertFalse(self.store.exists_unsafe(self.key1))
+        self.assertEqual(self.default_str,
+                         self.store.get_unsafe(self.key1, self.default_str))
+
+    def test_set_unsafe_removes_expiry_of_temporary_key(self):
+        self.store.set_for_unsafe(self.key1, self.val1, self.time)
+        self.store.set_unsafe(self.key1, self.val2)
+
+        self.clock.advance(self.time.total_seconds())
+        self.assertEqual(self.val2_bytes, self.store.get_unsafe(self.key1))
+
+    def test_get_unsafe_returns_default_for_unset_key(self):
+        self.assertEqual(self.default_str,
+                         self.store.get_unsafe(self.key1, self.default_str))
+
+    def test_get_unsafe_returns_none_for_none_string(self):
+        self.store.set_unsafe(self.key1, 'None')
+        self.assertIsNone(self.store.get_unsafe(self.key1, self.default_str))
+
+    def test_get_bool_unsafe_returns_set_boolean(self):
+        self.store.set_unsafe(self.key1, str(True))
+        self.assertTrue(self.store.get_bool_unsafe(self.key1))
+
+    def test_get_multiple_unsafe_returns_values_in_order_of_keys(self):
+        self.store.set_unsafe(self.key2, self.val2)
+        self.assertEqual([None, self.val2_bytes, self.val2_bytes],
+                         self.store.get_multiple_unsafe(
+                             [self.key1, self.key2, self.key2]))
+
+    def test_set_bits_unsafe_sets_bits_in_same_order_as_redis(self):
+        self.store.set_bits_unsafe({self.key1: {0: 1, 9: 1}})
+        self.assertEqual(b'\x80\x40', self.store.get_unsafe(self.key1))
+
+        self.store.set_bits_unsafe({self.key1: {0: 0, 1: 1}})
+        self.assertEqual(b'\x40\x40', self.store.get_unsafe(self.key1))
+
+    def test_bitcount_unsafe_counts_set_bits(self):
+        self.assertEqual(0, self.store.bitcount_unsafe(self.key1))
+        self.store.set_bits_unsafe({self.key1: {0: 1, 9: 1, 20: 1, 21: 0}})
+        self.assertEqual(3, self.store.bitcount_unsafe(self.key1))
+
+    def test_set_bits_unsafe_keeps_expiry_of_bitmap(self):
+        self.store.set_for_unsafe(self.key1, b'\x00', self.time)
+        self.store.set_bits_unsafe({self.key1: {0: 1}})
+
+        self.clock.advance(self.time.total_seconds())
+        self.assertFalse(self.store.exists_unsafe(self.key1))
+
+    def test_get_keys_unsafe_gets_only_keys_that_match_pattern(self):
+        self.store.set_unsafe('prefix_a', self.val1)
+        self.store.set_unsafe('prefix_b', self.val1)
+        self.store.set_unsafe('other', self.val1)
+        self.store.set_for_unsafe('prefix_c', self.val1, self.time)
+        self.clock.advance(self.time.total_seconds())
+
+        self.assertEqual(['prefix_a', 'prefix_b'],
+                         sorted(self.store.get_keys_unsafe('prefix_*')))
+        self.assertEqual(3, len(self.store.get_keys_unsafe()))
+
+    def test_remove_unsafe_returns_number_of_keys_removed(self):
+        self.store.set_unsafe(self.key1, self.val1)
+        self.assertEqual(1, self.store.remove_unsafe(self.key1, self.key2))
+        self.assertFalse(self.store.exists_unsafe(self.key1))
+
+    def test_delete_namespace_unsafe_removes_keys_in_batches(self):
+        for i in range(5):
+            self.store.set_unsafe('key' + str(i), self.val1)
+        progress = []
+
+        self.assertEqual(5, self.store.delete_namespace_unsafe(
+            batch_size=2, progress=progress.append))
+        self.assertEqual([2, 4, 5], progress)
+        self.assertEqual([], self.store.get_keys_unsafe())
+
+    def test_delete_all_unsafe_removes_all_keys(self):
+        self.store.set_unsafe(self.key1, self.val1)
+        self.store.delete_all_unsafe()
+        self.assertFalse(self.store.exists_unsafe(self.key1))
+
+    def test_ping_unsafe_returns_true(self):
+        self.assertTrue(self.store.ping_unsafe())
+
+
+class TestStateStore(unittest.TestCase):
+
+    def test_incomplete_state_store_cannot_be_created(self):
+        class IncompleteStateStore(StateStore):
+            def get_unsafe(self, key: str, default=None):
+                return default
+
+        self.assertRaises(TypeError, IncompleteStateStore,
+                          logging.getLogger('dummy'))
+
+
+class TestMemoryStateStore(StateStoreTests, unittest.TestCase):
+
+    def _create_store(self, namespace: str, clock: VirtualClock):
+        return MemoryStateStore(self.logger, namespace, clock)
+
+    def test_delete_namespace_unsafe_keeps_keys_of_other_namespaces(self):
+        self.store.set_unsafe(self.key1, self.val1)
+        self.store._values['other:' + self.key1] = self.val1_bytes
+
+        self.assertEqual(1, self.store.delete_namespace_unsafe())
+        self.assertEqual(['other:' + self.key1], list(self.store._values))
+
+
+class TestSqliteStateStore(StateStoreTests, unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, 'state',
+                                 'state.sqlite3')
+        self.stores = []
+        super().setUp()
+
+    def tearDown(self) -> None:
+        for store in self.stores:
+            store.close()
+        self.directory.cleanup()
+
+    def _create_store(self, namespace: str, clock: VirtualClock):
+        store = SqliteStateStore(self.file, self.logger, namespace, clock)
+        self.stores.append(store)
+        return store
+
+    def test_state_kept_across_restarts(self):
+        self.store.set_unsafe(self.key1, self.val1)
+        self.store.set_for_unsafe(self.key2, self.val2, self.time)
+        self.store.close()
+
+        restarted = self._create_store(self.namespace, self.clock)
+        self.assertEqual(self.val1_bytes, restarted.get_unsafe(self.key1))
+        self.assertEqual(self.val2_bytes, restarted.get_unsafe(self.key2))
+
+    def test_expired_keys_purged_when_opened(self):
+        self.store.set_for_unsafe(self.key1, self.val1, self.time)
+        self.store.close()
+        self.clock.advance(self.time.total_seconds())
+
+        restarted = self._create_store(self.namespace, self.clock)
+        self.assertEqual(0, restarted._db.execute(
+            'SELECT COUNT(*) FROM state').fetchone()[0])
+
+    def test_delete_namespace_unsafe_keeps_keys_of_other_namespaces(self):
+        other = self._create_store('other', self.clock)
+        self.store.set_unsafe(self.key1, self.val1)
+        other.set_unsafe(self.key1, self.val1)
+
+        self.assertEqual(1, self.store.delete_namespace_unsafe())
+        self.assertEqual([self.key1], other.get_keys_unsafe())
@@ -1,7 +1,7 @@
 import unittest
 from datetime import timedelta, datetime
-from time import sleep
 
+from src.utils.clock import VirtualClock
 from src.utils.datetime import strfdelta
 from src.utils.timing import TimedTaskLimiter, TimedOccurrenceTracker
 
@@ -11,7 +11,8 @@ class TestTimedTaskLimiter(unittest.TestCase):
     def setUp(self) -> None:
         self.interval_seconds = 2
         self.interval_timedelta = timedelta(seconds=self.interval_seconds)
-        self.ttl = TimedTaskLimiter(self.interval_timedelta)
+        self.clock = VirtualClock()
+        self.ttl = TimedTaskLimiter(self.interval_timedelta, self.clock)
 
     def test_time_interval_is_supplied_time_interval(self):
         self.assertEqual(self.ttl.time_interval, self.interval_timedelta)
@@ -23,7 +24,7 @@ class TestTimedTaskLimiter(unittest.TestCase):
         self.assertTrue(self.ttl.can_do_task())
 
     def test_can_do_task_if_not_done_before_and_wait_time_interval(self):
-        sleep(self.interval_seconds)
+        self.clock.sleep(self.interval_seconds)
         self.assertTrue(self.ttl.can_do_task())
 
     def test_cannot_do_task_if_check_within_time_interval(self):
@@ -32,9 +33,16 @@ class TestTimedTaskLimiter(unittest.TestCase):
 
     def test_cannot_do_task_if_check_after_time_interval(self):
         self.ttl.did_task()
-        sleep(self.interval_seconds)
+        self.clock.sleep(self.interval_seconds)
+        self.assertFalse(self.ttl.can_do_task())
+        self.clock.sleep(0.001)
         self.assertTrue(self.ttl.can_do_task())
 
+    def test_do_task_sets_last_time_that_did_task_to_clock_time(self):
+        self.clock.advance(10)
+        self.ttl.did_task()
+        self.assertEqual(self.ttl.last_time_that_did_task, self.clock.now())
+
     def test_do_task_updates_last_time_that_did_task_to_a_greater_time(self):
         before = self.ttl.last_time_that_did_task
         self.ttl.did_task()
@@ -57,6 +65,11 @@ class TestTimedTaskLimiter(unittest.TestCase):
         self.ttl.reset()
         self.assertEqual(self.ttl.last_time_that_did_task, datetime.min)
 
+    def test_can_do_task_after_reset_even_if_within_time_interval(self):
+        self.ttl.did_task()
+        self.ttl.reset()
+        self.assertTrue(self.ttl.can_do_task())
+
 
 class TestTimedOccurrenceTracker(unittest.TestCase):
 
@@ -64,8 +77,9 @@ class TestTimedOccurrenceTracker(unittest.TestCase):
         self.max_occurrences = 4
         self.interval_seconds = 3
         self.interval_timedelta = timedelta(seconds=self.interval_seconds)
+        self.clock = VirtualClock()
         self.ttl = TimedOccurrenceTracker(self.max_occurrences,
-                                          self.interval_timedelta)
+                                          self.interval_timedelta, self.clock)
 
     def test_max_occurrences_is_supplied_max_occurrences(self):
         self.assertEqual(self.ttl.max_occurrences, self.max_occurrences)
@@ -99,7 +113,7 @@ class TestTimedOccurrenceTracker(unittest.TestCase):
             self.ttl.action_happened()
 
         self.assertTrue(self.ttl.too_many_occurrences())
-        sleep(self.interval_seconds)
+        self.clock.sleep(self.interval_seconds)
         self.assertFalse(self.ttl.too_many_occurrences())
 
     def test_not_too_many_occurrences_if_reset(self):
@@ -113,3 +127,25 @@ class TestTimedOccurrenceTracker(unittest.TestCase):
         self.assertTrue(self.ttl.too_many_occurrences())
         self.ttl.reset()
         self.assertFalse(self.ttl.too_many_occurrences())
+
+    def test_too_many_occurrences_uses_only_last_max_occurrences(self):
+        start = datetime(2020, 1, 1)
+        later = start + self.interval_timedelta * 10
+        for i in range(self.max_occurrences):
+            self.ttl.action_happened(at_time=start)
+        for i in range(self.max_occurrences - 1):
+            self.ttl.action_happened(at_time=later)
+        self.assertFalse(self.ttl.too_many_occurrences(later))
+
+        self.ttl.action_happened(at_time=later)
+        self.assertTrue(self.ttl.too_many_occurrences(later))
+
+    def test_too_many_occurrences_with_supplied_times(self):
+        start = datetime(2020, 1, 1)
+        for i in range(self.max_occurrences):
+            self.ttl.action_happened(at_time=start + timedelta(seconds=i))
+
+        self.assertTrue(self.ttl.too_many_occurrences(
+            start + self.interval_timedelta - timedelta(microseconds=1)))
+        self.assertFalse(self.ttl.too_many_occurrences(
+            start + self.interval_timedelta))